@@ -1,12 +1,18 @@
 import asyncio
 
-from cit_parser import Authorities, invoke, organize
+import torch
 from wasabi import msg
 
+from src.benchmarking.cascade import CascadeStats, CascadeThresholds, cascade_extract
 from src.benchmarking.items import TEST_ITEMS
 from src.benchmarking.llm import llm_extract_citations_from_document
 from src.benchmarking.model import authorities_to_citation_extraction_result
 from src.benchmarking.types import BenchmarkResult, CitationExtractionResult
+from src.inference.assembly import Authorities, assemble_citations
+from src.inference.pool import TaggerPool
+from src.inference.tagger import CitationTagger
+
+HUB_MODEL = "ss108/legal-citation-bert"
 
 
 async def run_llm_extraction() -> BenchmarkResult:
@@ -37,12 +43,27 @@ async def llm_extract_citations_for_item(
     return benchmark_result
 
 
-def run_model_extraction() -> BenchmarkResult:
+def run_model_extraction(
+    tagger: CitationTagger | None = None, n_workers: int = 1
+) -> BenchmarkResult:
+    """
+    n_workers > 1 tags the documents in a forked TaggerPool instead of one
+    after the other.
+    """
+    tagger = tagger or CitationTagger.from_pretrained(
+        HUB_MODEL, device=torch.device("cpu") if n_workers > 1 else None
+    )
     benchmark_result = BenchmarkResult("BERT Model")
 
-    for text, correct_citation in TEST_ITEMS:
-        res = invoke(text)
-        auth: Authorities = organize(res)
+    texts = [text for text, _ in TEST_ITEMS]
+    if n_workers > 1:
+        with TaggerPool(tagger, n_workers=n_workers) as pool:
+            spans_per_text = [spans for _, spans in pool.map(texts)]
+    else:
+        spans_per_text = [tagger.tag_document(text) for text in texts]
+
+    for (text, correct_citation), spans in zip(TEST_ITEMS, spans_per_text):
+        auth: Authorities = assemble_citations(spans)
 
         formatted_result: CitationExtractionResult = (
             authorities_to_citation_extraction_result(auth)
@@ -60,6 +81,37 @@ def run_model_extraction() -> BenchmarkResult:
     return benchmark_result
 
 
+async def run_cascade_extraction(
+    tagger: CitationTagger | None = None,
+    thresholds: CascadeThresholds | None = None,
+    **kwargs,
+) -> BenchmarkResult:
+    """
+    The model on every sentence, the LLM only on the sentences it is unsure
+    of. kwargs go to cascade_extract (e.g. extract= a stub).
+    """
+    tagger = tagger or CitationTagger.from_pretrained(HUB_MODEL)
+    benchmark_result = BenchmarkResult("Cascade")
+    stats = CascadeStats()
+
+    for text, correct_citation in TEST_ITEMS:
+        res = await cascade_extract(text, tagger, thresholds, stats=stats, **kwargs)
+
+        err_count = correct_citation.err_count(res)
+        correct_count = (
+            sum(correct_citation.cases.values())
+            + sum(correct_citation.statutes.values())
+            - err_count
+        )
+        benchmark_result.add_result(text, correct_count, err_count)
+
+    msg.info(
+        f"Cascade sent {stats.n_escalated}/{stats.n_chunks} sentences "
+        f"({100 * stats.escalation_rate:.1f}%) to the LLM"
+    )
+    return benchmark_result
+
+
 if __name__ == "__main__":
     msg.info("Running LLM extraction...")
     llm_res = asyncio.run(run_llm_extraction())
@@ -73,6 +125,10 @@ if __name__ == "__main__":
     # llm_res.log_individual_results()
     llm_res.log_overall_results()
 
+    msg.info("Running cascade extraction...")
+    cascade_res = asyncio.run(run_cascade_extraction())
+    cascade_res.log_overall_results()
+
     # relevant_item, c = TEST_ITEMS[-1]
     # res = asyncio.run(llm_extract_citations_for_item(relevant_item, c))
     # print(res)
@@ -1,61 +1,18 @@
 import asyncio
+import json
+import os
+import subprocess
+import sys
 import time
-from typing import List
-import torch
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 import typer
-
-from datasets import Dataset
-from transformers import BertTokenizerFast
-from transformers import (
-    AutoModelForTokenClassification,
-    BertTokenizerFast,
-)
-
-from wasabi import msg
-from cit_parser import invoke, organize, Authorities
-
-
-from src.data.generate import (
-    Sentence,
-    generate_prose_statute_citation,
-    generate_tags,
-    generate_unofficial_citation,
-)
-from src.data.prepare import (
-    RAW_DATA_DIR,
-    create_candidate_dataset,
-    do_sentences,
-    gather_wrapper,
-    load_candidate_ds,
-    load_for_training,
-    load_raw_cl_docket_entries_ds,
-    process_cl_doc,
-    save_cl_docket_entries_ds,
-    save_data_to_file,
-    sents_to_data,
-    split_and_save,
-)
-from src.data.types import CIT_FORM, CIT_TYPE, DataGenerationArgs
-from src.training.model import (
-    ALL_LABELS,
-    MODEL_NAME,
-    get_tokenizer,
-    load_model_from_checkpoint,
-    split_text,
-    get_labels,
-)
-from src.training.train import test_predict, train_model
-import asyncio
-
-from cit_parser import Authorities, invoke, organize
 from wasabi import msg
 
-from src.benchmarking.items import TEST_ITEMS
-from src.benchmarking.llm import llm_extract_citations_from_document
-from src.benchmarking.model import authorities_to_citation_extraction_result
-from src.benchmarking.types import BenchmarkResult, CitationExtractionResult
-
+# Heavy dependencies (torch, transformers, datasets, spaCy, cit_parser, pandas)
+# are imported inside the commands that use them, so that `--help` and the
+# lightweight commands start quickly. `import-times` keeps an eye on this.
 
 app = typer.Typer()
 
@@ -76,6 +33,9 @@ def gen_sentences():
 
 
 async def gen_prose_statute_data():
+    from src.data.generate import generate_prose_statute_citation
+    from src.data.prepare import RAW_DATA_DIR, save_data_to_file, sents_to_data
+
     res = await generate_prose_statute_citation(2)
 
     data = await sents_to_data(res)
@@ -85,23 +45,31 @@ async def gen_prose_statute_data():
 
 @app.command()
 def test_gen():
+    from src.data.generate import generate_unofficial_citation
+
     res = asyncio.run(generate_unofficial_citation(2))
     print(res)
 
 
 @app.command()
 def prepare_candidate_dataset(version: str = "v0"):
+    from src.data.prepare import create_candidate_dataset
+
     create_candidate_dataset(version)
 
 
 @app.command()
 def save_hf_ds(version: str = "v0"):
+    from src.data.prepare import load_candidate_ds, split_and_save
+
     ds = load_candidate_ds(version)
     split_and_save(ds, version)
 
 
 @app.command()
 def create_and_save_ds(version: str = "v0"):
+    from src.data.prepare import create_candidate_dataset
+
     create_candidate_dataset(version)
     split_and_save_ds(version)
     # ds = load_candidate_ds(version)
@@ -110,25 +78,225 @@ def create_and_save_ds(version: str = "v0"):
 
 @app.command()
 def split_and_save_ds(version: str = "v0"):
+    from src.data.prepare import load_candidate_ds, split_and_save
+
     ds = load_candidate_ds(version)
     split_and_save(ds, version)
 
 
 @app.command()
-def train(version: str = "v0"):
+def train(
+    version: str = "v0",
+    cpu: bool = False,
+    nproc: int = 1,
+    grad_accum: int = 1,
+    bf16: bool = False,
+    output_dir: Optional[Path] = None,
+):
+    """
+    Fine-tunes and activates a new checkpoint. --cpu trains on the CPU even
+    if there is a GPU (--bf16 for bf16 autocast); --nproc N > 1 relaunches
+    this command as N data-parallel processes with torch.distributed.run,
+    each pinned to its share of the cores.
+    """
+    # Checked before the (long) training run rather than after it.
+    if bf16 and not cpu:
+        import torch
+
+        if torch.cuda.is_available():
+            msg.fail("--bf16 only applies to CPU training; add --cpu", exits=1)
+    if output_dir is not None:
+        from src.training.train import check_output_dir
+
+        try:
+            check_output_dir(output_dir)
+        except ValueError as e:
+            msg.fail(str(e), exits=1)
+
+    if nproc > 1 and "LOCAL_RANK" not in os.environ:
+        from src.data.prepare import load_for_training
+        from src.training.train import get_output_dir
+
+        # One output directory for all processes, picked before they start,
+        # and the tokenized splits cached once rather than by every process.
+        output_dir = output_dir or get_output_dir()
+        load_for_training(version)
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "torch.distributed.run",
+                "--standalone",
+                f"--nproc-per-node={nproc}",
+                __file__,
+                "train",
+                f"--version={version}",
+                "--cpu" if cpu else "--no-cpu",
+                f"--nproc={nproc}",
+                f"--grad-accum={grad_accum}",
+                "--bf16" if bf16 else "--no-bf16",
+                f"--output-dir={output_dir}",
+            ],
+            check=True,
+        )
+        return
+
+    from src.data.prepare import load_for_training
+    from src.training.model import activate_checkpoint
+    from src.training.train import test_predict, train_model
+
     ds = load_for_training(version)
-    _, trainer = train_model(ds)
+    _, trainer = train_model(
+        ds,
+        use_cpu=cpu,
+        gradient_accumulation_steps=grad_accum,
+        bf16=bf16,
+        output_dir=output_dir,
+    )
     test_predict(trainer, ds["test"])
 
+    if trainer.is_world_process_zero():
+        # The new version becomes the one loaded by default.
+        manifest = activate_checkpoint(Path(trainer.args.output_dir).name[1:])
+        msg.good(f"Active checkpoint: {manifest.checkpoint}")
+
+
+@app.command()
+def cache_training_data(
+    version: str = "v0",
+    max_length: int = 512,
+    num_proc: Optional[int] = None,
+    rebuild: bool = False,
+):
+    """
+    Tokenizes the splits of a dataset version into the Arrow cache that
+    `train` and `distill` load from. Happens on first use anyway; --rebuild
+    replaces an existing copy.
+    """
+    from src.data.prepare import load_for_training
+
+    print(load_for_training(version, max_length, num_proc=num_proc, rebuild=rebuild))
+
+
+@app.command()
+def distill(
+    version: str = "v1",
+    checkpoint: Optional[str] = None,
+    n_layers: int = 6,
+    temperature: float = 2.0,
+    alpha: float = 0.5,
+    epochs: int = 20,
+):
+    """
+    Distills the fine-tuned checkpoint into an n_layers student initialized
+    from alternating layers of the base model, then compares the two on the
+    test split: token error rate, size and CPU latency.
+    """
+    import torch
+    from transformers import Trainer
+
+    from src.data.prepare import load_for_training
+    from src.inference.compare import compare_taggers
+    from src.inference.tagger import CitationTagger
+    from src.training.distill import distill_model
+    from src.training.evaluation import argmax_logits
+    from src.training.model import load_model_from_checkpoint
+    from src.training.train import count_errors
+
+    ds = load_for_training(version)
+    teacher = load_model_from_checkpoint(checkpoint)
+
+    student, trainer = distill_model(
+        ds,
+        teacher,  # pyright: ignore
+        n_layers=n_layers,
+        temperature=temperature,
+        alpha=alpha,
+        num_train_epochs=epochs,
+    )
+
+    rows = []
+    for name, model in (("teacher", teacher), ("student", student)):
+        errors = count_errors(
+            Trainer(
+                model=model,
+                args=trainer.args,
+                data_collator=trainer.data_collator,
+                preprocess_logits_for_metrics=argmax_logits,
+            ).predict(ds["test"])
+        )  # pyright: ignore
+        n_params = sum(p.numel() for p in model.parameters())  # pyright: ignore
+        rows.append(
+            (
+                name,
+                model.config.num_hidden_layers,  # pyright: ignore
+                f"{n_params / 1e6:.1f}",
+                f"{errors['error_percentage']:.2f}",
+            )
+        )
+    msg.table(
+        rows, header=("Model", "Layers", "Params (M)", "Token error %"), divider=True
+    )
+
+    cpu = torch.device("cpu")
+    report = compare_taggers(
+        CitationTagger(teacher, device=cpu),  # pyright: ignore
+        CitationTagger(student, device=cpu),
+        ds["test"]["text"],
+    )
+    report.log("teacher", "student")
+
+
+@app.command()
+def padding_benchmark(version: str = "v1", steps: int = 20, batch_size: int = 2):
+    """
+    Times training steps with every row padded to 512 tokens against
+    per-batch padding over length-grouped batches, from the same base model.
+    """
+    from src.data.prepare import load_for_training
+    from src.training.model import get_base_model
+    from src.training.train import time_training_steps
+
+    train_ds = load_for_training(version)["train"]
+    lengths = train_ds["length"]
+    msg.info(
+        f"{len(lengths)} rows, mean length {sum(lengths) / len(lengths):.0f}, "
+        f"max {max(lengths)}: {100 * (1 - sum(lengths) / (512 * len(lengths))):.0f}% "
+        "of a 512-padded batch is padding"
+    )
+
+    fixed = time_training_steps(
+        get_base_model(), train_ds, steps, batch_size, dynamic_padding=False
+    )
+    dynamic = time_training_steps(
+        get_base_model(), train_ds, steps, batch_size, dynamic_padding=True
+    )
+    msg.table(
+        [
+            ("Padded to 512", f"{fixed:.2f}", ""),
+            ("Per batch, grouped", f"{dynamic:.2f}", f"{fixed / dynamic:.2f}x"),
+        ],
+        header=("Padding", "Seconds", "Speedup"),
+        divider=True,
+    )
+
 
 @app.command()
 def download_cl():
+    from src.data.prepare import save_cl_docket_entries_ds
+
     save_cl_docket_entries_ds()
 
 
 @app.command()
 def process_cl_docs():
-    docs: Dataset = load_raw_cl_docket_entries_ds()
+    from src.data.prepare import (
+        gather_wrapper,
+        load_raw_cl_docket_entries_ds,
+        process_cl_doc,
+    )
+
+    docs = load_raw_cl_docket_entries_ds()
     print(docs.column_names)
     subset = docs.select(range(57, 59))
 
@@ -156,6 +324,10 @@ def process_cl_docs():
 
 @app.command()
 def push_to_hub():
+    from transformers import BertTokenizerFast
+
+    from src.training.model import MODEL_NAME, load_model_from_checkpoint
+
     model = load_model_from_checkpoint()
     model.push_to_hub("ss108/legal-citation-bert", use_temp_dir=True)  # pyright: ignore
 
@@ -165,27 +337,716 @@ def push_to_hub():
 
 @app.command()
 def inspect_data():
+    from src.data.prepare import load_candidate_ds
+
     ds = load_candidate_ds(version="v1")
     print(f"Dataset length: {len(ds)}")
 
 
 @app.command()
 def test_from_hub():
+    from src.inference.tagger import CitationTagger
+
     # Load model and tokenizer from Hugging Face Hub
-    model = AutoModelForTokenClassification.from_pretrained("ss108/legal-citation-bert")
+    tagger = CitationTagger.from_pretrained("ss108/legal-citation-bert")
 
     # Test with a sample input
     test_text = "Fexler v. Hock, 123 U.S. 456, 499 (2021)"  # Sample text
-    sentences = split_text(test_text)
-    for s in sentences:
-        res = get_labels(s, model)
-        print(res)
+    res = tagger.tag(test_text)
+    for i in range(len(res)):
+        print(list(zip(res.tokens(i), res.labels(i))))
+        print(res.spans(i))
 
     return
 
 
+@app.command()
+def compare_quantized(version: str = "v1", checkpoint: Optional[str] = None):
+    """
+    Compares the dynamic int8 model against fp32 on the test split: latency,
+    weight memory and per-label agreement.
+    """
+    import torch
+
+    from src.data.prepare import load_splits
+    from src.inference.compare import compare_taggers
+    from src.inference.quantize import model_size_bytes
+    from src.inference.tagger import CitationTagger
+
+    sentences: List[str] = load_splits(version)["test"]["text"]
+
+    fp32 = CitationTagger.from_checkpoint(checkpoint, device=torch.device("cpu"))
+    int8 = CitationTagger.from_checkpoint(checkpoint, quantized=True)
+
+    fp32_mb = model_size_bytes(fp32.model) / 1e6
+    int8_mb = model_size_bytes(int8.model) / 1e6
+    msg.info(f"Weights: fp32 {fp32_mb:.1f} MB | int8 {int8_mb:.1f} MB")
+
+    report = compare_taggers(fp32, int8, sentences)
+    report.log("fp32", "int8")
+
+
+@app.command()
+def compare_bf16(
+    version: str = "v1",
+    checkpoint: Optional[str] = None,
+    min_agreement: float = 0.999,
+    force: bool = False,
+):
+    """
+    Runs the bf16 verification on the test split: CPU bf16 support, latency
+    and per-label agreement with fp32. --force compares even on CPUs without
+    native bf16, where it is emulated and slow.
+    """
+    import torch
+
+    from src.data.prepare import load_splits
+    from src.inference.precision import cpu_supports_bf16, enable_bf16
+    from src.inference.tagger import CitationTagger
+
+    sentences: List[str] = load_splits(version)["test"]["text"]
+    fp32 = CitationTagger.from_checkpoint(checkpoint, device=torch.device("cpu"))
+
+    msg.info(f"Native bf16: {cpu_supports_bf16()}")
+    _, report = enable_bf16(fp32, sentences, min_agreement, force=force)
+    if report is not None:
+        report.log("fp32", "bf16")
+
+
+@app.command()
+def export_onnx(
+    output_dir: Path = Path("onnx_output"), checkpoint: Optional[str] = None
+):
+    from src.inference.onnx_backend import export_onnx as _export_onnx
+    from src.training.model import get_tokenizer, load_model_from_checkpoint
+
+    model = load_model_from_checkpoint(checkpoint)
+    _export_onnx(model, get_tokenizer(), output_dir)  # pyright: ignore
+
+
+@app.command()
+def onnx_parity(
+    onnx_dir: Path = Path("onnx_output"),
+    version: str = "v1",
+    checkpoint: Optional[str] = None,
+):
+    """
+    Compares argmax labels of the ONNX backend against PyTorch on the
+    candidate dataset.
+    """
+    import torch
+
+    from src.data.prepare import load_candidate_ds
+    from src.inference.compare import compare_taggers
+    from src.inference.onnx_backend import OnnxTokenClassifier
+    from src.inference.tagger import CitationTagger
+
+    sentences: List[str] = load_candidate_ds(version)["text"]
+
+    cpu = torch.device("cpu")
+    torch_tagger = CitationTagger.from_checkpoint(checkpoint, device=cpu)
+    onnx_tagger = CitationTagger(OnnxTokenClassifier(onnx_dir), device=cpu)  # pyright: ignore
+
+    report = compare_taggers(torch_tagger, onnx_tagger, sentences)
+    report.log("PyTorch", "ONNX Runtime")
+
+
+@app.command()
+def prefilter_recall(version: str = "v1", show_missed: bool = True):
+    """
+    Checks that the citation prefilter flags every candidate sentence that
+    has at least one non-O label.
+    """
+    from src.data.prepare import load_candidate_ds
+    from src.inference.prefilter import evaluate_prefilter
+
+    ds = load_candidate_ds(version)
+    has_citation = [any(label != "O" for _, label in tags) for tags in ds["tags"]]
+
+    report = evaluate_prefilter(ds["text"], has_citation)
+
+    msg.info(
+        f"{report.n_sentences} sentences, {report.n_with_citations} with citations, "
+        f"{report.n_flagged} flagged"
+    )
+    msg.info(f"Model calls skipped: {100 * report.skip_rate:.2f}%")
+    if show_missed:
+        for s in report.missed:
+            msg.warn(f"Missed: {s[:200]}")
+
+    if report.n_missed:
+        msg.fail(f"Recall: {100 * report.recall:.2f}% ({report.n_missed} missed)")
+    else:
+        msg.good("Recall: 100.00%")
+
+
+@app.command()
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    checkpoint: Optional[str] = None,
+    max_batch_size: int = 32,
+    max_wait_ms: float = 10.0,
+    max_queue_size: int = 256,
+    prefilter: bool = False,
+    cache_mb: int = 64,
+    cache_path: Optional[Path] = None,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+    cpus: Optional[str] = None,
+    bf16: bool = False,
+    bf16_version: str = "v1",
+):
+    """
+    Serves the tagger over HTTP (POST /tag, GET /health), coalescing
+    concurrent requests into micro-batches. Predictions are cached per
+    sentence in memory (--cache-mb 0 disables this) and, with --cache-path,
+    in an SQLite file that survives restarts. --cpus pins the server to a
+    cpulist such as "0-7" (e.g. one NUMA node). --bf16 switches to bf16 if
+    the CPU supports it and it matches fp32 on the test split of
+    --bf16-version.
+    """
+    from src.inference.cache import PredictionCache
+    from src.inference.server import serve as _serve
+    from src.inference.tagger import CitationTagger
+    from src.inference.threads import ThreadConfig, parse_cpulist
+
+    ThreadConfig(
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads,
+        cpus=parse_cpulist(cpus) if cpus else None,
+    ).apply()
+
+    cache = None
+    if cache_mb > 0 or cache_path is not None:
+        cache = PredictionCache(max_bytes=cache_mb * 1024 * 1024, path=cache_path)
+
+    tagger = CitationTagger.from_checkpoint(
+        checkpoint, prefilter=prefilter, cache=cache
+    )
+    if bf16:
+        from src.data.prepare import load_splits
+        from src.inference.precision import enable_bf16
+
+        tagger, _ = enable_bf16(tagger, load_splits(bf16_version)["test"]["text"])
+    _serve(tagger, host, port, max_batch_size, max_wait_ms, max_queue_size)
+
+
+@app.command()
+def profile_stages(
+    version: str = "v1",
+    checkpoint: Optional[str] = None,
+    sentences_per_doc: int = 20,
+    prefilter: bool = False,
+    prometheus: Optional[Path] = None,
+    json_lines: Optional[Path] = None,
+):
+    """
+    Tags pseudo-documents built from the test split and breaks the time down
+    by inference stage (split, tokenize, collate, transfer, forward, argmax,
+    decode, ...). --prometheus and --json-lines also write the metrics out.
+    """
+    from src.data.prepare import load_splits
+    from src.inference.metrics import METRICS
+    from src.inference.tagger import CitationTagger
+
+    sentences: List[str] = load_splits(version)["test"]["text"]
+    docs = [
+        " ".join(sentences[i : i + sentences_per_doc])
+        for i in range(0, len(sentences), sentences_per_doc)
+    ]
+
+    tagger = CitationTagger.from_checkpoint(checkpoint, prefilter=prefilter)
+    tagger.tag(docs[0])  # warm-up, not measured
+    METRICS.reset()
+
+    start = time.perf_counter()
+    for doc in docs:
+        tagger.tag(doc).all_spans()
+    elapsed = time.perf_counter() - start
+
+    totals = METRICS.stage_totals()
+    rows = [
+        (
+            stage,
+            calls,
+            f"{seconds:.3f}",
+            f"{1000 * seconds / calls:.2f}",
+            f"{100 * seconds / elapsed:.1f}%",
+        )
+        for stage, (calls, seconds) in sorted(totals.items(), key=lambda t: -t[1][1])
+    ]
+    msg.table(
+        rows,
+        header=("Stage", "Calls", "Total s", "Mean ms", "Share"),
+        divider=True,
+    )
+    unaccounted = elapsed - sum(seconds for _, seconds in totals.values())
+    msg.info(f"{len(docs)} documents in {elapsed:.2f}s ({unaccounted:.2f}s untimed)")
+
+    if prometheus is not None:
+        prometheus.write_text(METRICS.to_prometheus())
+        msg.good(f"Wrote {prometheus}")
+    if json_lines is not None:
+        METRICS.write_json_lines(json_lines)
+        msg.good(f"Appended to {json_lines}")
+
+
+@app.command()
+def packing_benchmark(
+    version: str = "v1",
+    checkpoint: Optional[str] = None,
+    sentences_per_doc: int = 20,
+    max_length: int = 512,
+):
+    """
+    Compares one-sequence-per-sentence tagging against packing consecutive
+    sentences into shared windows, on pseudo-documents from the test split.
+    """
+    import numpy as np
+
+    from src.data.prepare import load_splits
+    from src.inference.tagger import CitationTagger
+
+    sentences: List[str] = load_splits(version)["test"]["text"]
+    docs = [
+        " ".join(s.strip() for s in sentences[i : i + sentences_per_doc])
+        for i in range(0, len(sentences), sentences_per_doc)
+    ]
+
+    tagger = CitationTagger.from_checkpoint(checkpoint)
+    tagger.tag_many(docs[:2])  # warmup
+
+    start = time.perf_counter()
+    unpacked = tagger.tag_many(docs)
+    unpacked_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    packed = tagger.tag_packed(docs, max_length=max_length)
+    packed_seconds = time.perf_counter() - start
+
+    # Packed rows have no [CLS]/[SEP]; compare the remaining tokens.
+    same = total = 0
+    for a, b in zip(unpacked, packed):
+        content = a.offsets[:, 1] > a.offsets[:, 0]
+        if content.sum() != len(b.label_ids):
+            continue
+        same += int(np.sum(a.label_ids[content] == b.label_ids))
+        total += len(b.label_ids)
+
+    msg.table(
+        [
+            ("Sentence per sequence", f"{unpacked_seconds:.2f}", ""),
+            (
+                "Packed",
+                f"{packed_seconds:.2f}",
+                f"{unpacked_seconds / packed_seconds:.2f}x",
+            ),
+        ],
+        header=("Mode", "Seconds", "Speedup"),
+        divider=True,
+    )
+    msg.info(f"Token label agreement: {100 * same / max(total, 1):.2f}%")
+
+
+def _pool_seconds(tagger, docs: List[str], n_workers: int, **kwargs) -> float:
+    from src.inference.pool import TaggerPool
+
+    with TaggerPool(tagger, n_workers=n_workers, **kwargs) as pool:
+        start = time.perf_counter()
+        for _ in pool.map(docs, ordered=False):
+            pass
+        return time.perf_counter() - start
+
+
+@app.command()
+def pool_throughput(
+    workers: List[int] = typer.Option([1, 2, 4, 8], "--workers"),
+    threads_per_worker: int = 1,
+    pin: bool = False,
+    version: str = "v1",
+    checkpoint: Optional[str] = None,
+    sentences_per_doc: int = 20,
+):
+    """
+    Measures documents/second of the forked TaggerPool for each worker count,
+    on pseudo-documents built from the test split.
+    """
+    import torch
+
+    from src.data.prepare import load_splits
+    from src.inference.tagger import CitationTagger
+
+    sentences: List[str] = load_splits(version)["test"]["text"]
+    docs = [
+        " ".join(sentences[i : i + sentences_per_doc])
+        for i in range(0, len(sentences), sentences_per_doc)
+    ]
+
+    tagger = CitationTagger.from_checkpoint(checkpoint, device=torch.device("cpu"))
+
+    rows = []
+    baseline = None
+    for n in workers:
+        elapsed = _pool_seconds(
+            tagger, docs, n, threads_per_worker=threads_per_worker, pin=pin
+        )
+        throughput = len(docs) / elapsed
+        baseline = baseline or throughput
+        rows.append(
+            (n, f"{elapsed:.2f}", f"{throughput:.2f}", f"{throughput / baseline:.2f}x")
+        )
+
+    msg.table(
+        rows,
+        header=("Workers", "Seconds", "Docs/s", "Scaling"),
+        divider=True,
+    )
+
+
+@app.command()
+def plan_threads(
+    version: str = "v1",
+    checkpoint: Optional[str] = None,
+    sentences_per_doc: int = 20,
+    pin: bool = True,
+):
+    """
+    Benchmarks every "N workers x M threads" layout that uses all available
+    cores once (8x1, 4x2, 2x4, 1x8 on 8 cores), with workers pinned within
+    NUMA nodes, and recommends the fastest.
+    """
+    import torch
+
+    from src.data.prepare import load_splits
+    from src.inference.tagger import CitationTagger
+    from src.inference.threads import candidate_layouts, numa_nodes
+
+    sentences: List[str] = load_splits(version)["test"]["text"]
+    docs = [
+        " ".join(sentences[i : i + sentences_per_doc])
+        for i in range(0, len(sentences), sentences_per_doc)
+    ]
+
+    nodes = numa_nodes()
+    msg.info(
+        f"{len(nodes)} NUMA node(s) with {', '.join(str(len(n)) for n in nodes)} "
+        "available cores"
+    )
+
+    tagger = CitationTagger.from_checkpoint(checkpoint, device=torch.device("cpu"))
+
+    results = []
+    for n, m in candidate_layouts():
+        try:
+            elapsed = _pool_seconds(tagger, docs, n, threads_per_worker=m, pin=pin)
+        except ValueError as e:
+            msg.warn(f"Skipping {n}x{m}: {e}")
+            continue
+        results.append((n, m, len(docs) / elapsed))
+
+    results.sort(key=lambda r: -r[2])
+    msg.table(
+        [(n, m, f"{throughput:.2f}") for n, m, throughput in results],
+        header=("Workers", "Threads/worker", "Docs/s"),
+        divider=True,
+    )
+    if results:
+        n, m, _ = results[0]
+        msg.good(
+            f"Fastest: TaggerPool(n_workers={n}, threads_per_worker={m}, pin={pin})"
+        )
+
+
+@app.command()
+def segmenter_benchmark(
+    backends: List[str] = typer.Option(
+        ["parser", "senter", "sentencizer", "regex"], "--backend"
+    ),
+    reference: str = "parser",
+):
+    """
+    Times each sentence segmenter on the benchmark documents and scores its
+    boundaries against the reference backend.
+    """
+    from src.benchmarking.items import TEST_ITEMS
+    from src.inference.segmenter import boundary_agreement, get_segmenter
+
+    texts = [text for text, _ in TEST_ITEMS]
+    n_chars = sum(len(t) for t in texts)
+
+    spans: Dict[str, list] = {}
+    seconds: Dict[str, float] = {}
+    for name in dict.fromkeys([reference, *backends]):
+        try:
+            segmenter = get_segmenter(name)
+        except OSError as e:
+            msg.warn(f"Skipping {name}: {e}")
+            continue
+        segmenter.spans(texts[0])  # warmup
+
+        start = time.perf_counter()
+        spans[name] = [segmenter.spans(t) for t in texts]
+        seconds[name] = time.perf_counter() - start
+
+    rows = []
+    for name in backends:
+        if name not in spans:
+            continue
+        row = [
+            name,
+            sum(len(s) for s in spans[name]),
+            f"{seconds[name] * 1000:.1f}",
+            f"{n_chars / seconds[name] / 1e6:.2f}",
+        ]
+        if reference in spans:
+            p, r, f1 = boundary_agreement(spans[reference], spans[name])
+            row += [f"{p:.3f}", f"{r:.3f}", f"{f1:.3f}"]
+        rows.append(row)
+
+    msg.table(
+        rows,
+        header=("Backend", "Sentences", "ms", "M chars/s", "P", "R", "F1")[
+            : len(rows[0]) if rows else 4
+        ],
+        divider=True,
+    )
+    if reference in spans:
+        msg.info(f"P/R/F1 are boundary agreement with {reference}")
+
+
+@app.command()
+def tune_cascade(
+    checkpoint: Optional[str] = None,
+    no_llm: bool = False,
+    top: int = 10,
+):
+    """
+    Grid-searches the cascade thresholds on TEST_ITEMS, reporting citation
+    accuracy against the share of sentences sent to the LLM. --no-llm
+    replaces the LLM with a stub that finds nothing, which gives the
+    escalation rates (and a lower bound on accuracy) without any API calls.
+    """
+    from src.benchmarking.cascade import bert_only, threshold_grid, tune_thresholds
+    from src.benchmarking.items import TEST_ITEMS
+    from src.inference.tagger import CitationTagger
+
+    tagger = (
+        CitationTagger.from_checkpoint(checkpoint)
+        if checkpoint
+        else CitationTagger.from_pretrained("ss108/legal-citation-bert")
+    )
+
+    kwargs = {"extract": bert_only} if no_llm else {}
+    results = asyncio.run(
+        tune_thresholds(tagger, TEST_ITEMS, threshold_grid(), **kwargs)
+    )
+    results.sort(key=lambda r: (-r.accuracy, r.escalation_rate))
+
+    rows = [
+        (
+            r.thresholds.min_span_confidence,
+            f"{r.thresholds.max_span_entropy:.2f}",
+            f"{r.accuracy:.2f}%",
+            f"{100 * r.escalation_rate:.1f}%",
+        )
+        for r in results[:top]
+    ]
+    msg.table(
+        rows,
+        header=("Min confidence", "Max entropy", "Accuracy", "Sent to LLM"),
+        divider=True,
+    )
+
+
+# Modules whose import cost `import-times` reports by default: the CLI itself,
+# its heavy dependencies and the src modules that pull them in.
+IMPORT_TIME_MODULES = [
+    "commands",
+    "torch",
+    "transformers",
+    "datasets",
+    "spacy",
+    "pandas",
+    "cit_parser",
+    "src.training.model",
+    "src.data.prepare",
+    "src.inference.tagger",
+]
+
+
+def _import_times(statement: str) -> List[Tuple[int, str, int]]:
+    """
+    Runs `statement` in a fresh interpreter under `-X importtime` and returns
+    (nesting depth, module, cumulative microseconds) for every import it made.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Nested imports are indented by two spaces per level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((depth, name.strip(), int(cumulative)))
+    return times
+
+
+@app.command()
+def import_times(
+    modules: Optional[List[str]] = typer.Option(None, "--module"),
+    repeats: int = 3,
+    budget_ms: Optional[float] = None,
+):
+    """
+    Reports the import cost of each module in a fresh interpreter (best of
+    `repeats`), with the dependencies that dominate it. With --budget-ms, exits
+    non-zero if importing the CLI (`commands`) takes longer than that.
+    """
+    startup = {name for _, name, _ in _import_times("pass")}
+
+    rows = []
+    totals: Dict[str, float] = {}
+    for module in modules or IMPORT_TIME_MODULES:
+        try:
+            runs = [
+                [t for t in _import_times(f"import {module}") if t[1] not in startup]
+                for _ in range(repeats)
+            ]
+        except RuntimeError as e:
+            msg.warn(f"{module}: {e}")
+            continue
+
+        best = min(runs, key=lambda run: sum(us for d, _, us in run if d == 0))
+        totals[module] = sum(us for d, _, us in best if d == 0) / 1000
+
+        # Direct dependencies of whatever `import module` pulled in.
+        dependencies = [(name, us) for d, name, us in best if d == 1]
+        heaviest = sorted(dependencies, key=lambda kv: kv[1], reverse=True)[:3]
+        rows.append(
+            (
+                module,
+                f"{totals[module]:.0f}",
+                ", ".join(f"{k} {v / 1000:.0f}" for k, v in heaviest),
+            )
+        )
+
+    msg.table(
+        rows,
+        header=("Module", "Import ms", "Heaviest dependencies (ms)"),
+        divider=True,
+    )
+
+    if budget_ms is not None and "commands" in totals:
+        if totals["commands"] > budget_ms:
+            msg.fail(
+                f"Importing commands took {totals['commands']:.0f} ms "
+                f"(budget {budget_ms:.0f} ms)",
+                exits=1,
+            )
+        msg.good(f"Importing commands is within the {budget_ms:.0f} ms budget")
+
+
+@app.command()
+def activate_checkpoint(version: Optional[str] = None):
+    """
+    Records a version (default: the most recently trained) in the checkpoint
+    manifest, so that loading without a version skips the directory scan,
+    and converts its weights to safetensors if they are not already.
+    """
+    from src.training.model import activate_checkpoint as _activate_checkpoint
+
+    manifest = _activate_checkpoint(version)
+    msg.good(f"Active checkpoint: {manifest.checkpoint}")
+
+
+# Run in a fresh interpreter by `cold-start`; the last line printed is JSON.
+COLD_START_SCRIPT = """
+import json, resource, time
+start = time.perf_counter()
+import torch
+from src.inference.tagger import CitationTagger
+from src.training.model import load_model_from_checkpoint
+imported = time.perf_counter()
+model = load_model_from_checkpoint({version!r}, use_safetensors={use_safetensors!r})
+loaded = time.perf_counter()
+tagger = CitationTagger(model, device=torch.device("cpu"))
+tagger.tag_sentences(["Fexler v. Hock, 123 U.S. 456, 499 (2021)."])
+done = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "load": loaded - imported,
+    "first_batch": done - loaded,
+    "total": done - start,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+@app.command()
+def cold_start(version: Optional[str] = None, repeats: int = 3):
+    """
+    Times a worker's cold start in a fresh interpreter: imports, checkpoint
+    load and the first batch (median of `repeats`). Memory-mapped safetensors
+    are compared with the pytorch_model.bin they were converted from, where
+    the checkpoint still has one. The OS page cache is not dropped, so after
+    the first run the weights are read from memory.
+    """
+    import statistics
+
+    rows = []
+    for use_safetensors in (True, False):
+        script = COLD_START_SCRIPT.format(
+            version=version, use_safetensors=use_safetensors
+        )
+        runs = []
+        for _ in range(repeats):
+            result = subprocess.run(
+                [sys.executable, "-c", script],
+                capture_output=True,
+                text=True,
+                cwd=Path(__file__).resolve().parent,
+            )
+            if result.returncode != 0:
+                msg.warn(result.stderr.strip().splitlines()[-1])
+                break
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        if not runs:
+            continue
+
+        median = {k: statistics.median(run[k] for run in runs) for k in runs[0]}
+        rows.append(
+            (
+                "model.safetensors" if use_safetensors else "pytorch_model.bin",
+                *(
+                    f"{median[k]:.2f}"
+                    for k in ("import", "load", "first_batch", "total")
+                ),
+                f"{median['peak_rss_mb']:.0f}",
+            )
+        )
+
+    msg.table(
+        rows,
+        header=("Weights", "Import s", "Load s", "First batch s", "Total s", "RSS MB"),
+        divider=True,
+    )
+
+
 @app.command()
 def test_lib():
+    from cit_parser import invoke, organize
+
     text = """ See Niz-Chavez v. Garland, 141 S. Ct. 1474, 1478, 1486 (2021) (statute requires Notice to Appear to be “a single document containing all the information an individual needs to know
 about his removal [proceeding]”).
 In addition, if the time or place of the hearing is altered after the issuance of a Notice to Appear, DHS or
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.benchmarking.model import authorities_to_citation_extraction_result
+from src.benchmarking.types import CitationExtractionResult, TestItem
+from src.inference.assembly import assemble_citations
+from src.inference.results import TaggedBatch
+from src.inference.tagger import CitationTagger
+from src.inference.types import EntitySpan
+from src.training.constants import LABEL_MAP
+
+# Extracts citations from one chunk of text, e.g. with an LLM. The second
+# argument is the text just before the chunk, which the extractor may read
+# (to resolve "Id." or "supra") but should not count citations in.
+ChunkExtractor = Callable[[str, str], Awaitable[CitationExtractionResult]]
+
+# How many preceding sentences go with an escalated sentence as its context.
+CONTEXT_SENTENCES = 3
+
+
+class CascadeThresholds(BaseModel):
+    """
+    A chunk goes to the LLM if any citation span in it has a token whose
+    label probability is below min_span_confidence or whose label entropy is
+    above max_span_entropy, or if any O token has a probability below
+    min_o_confidence (a citation the model nearly tagged).
+    """
+
+    min_span_confidence: float = 0.9
+    max_span_entropy: float = 0.5
+    min_o_confidence: float = 0.9
+
+
+class SpanConfidence(BaseModel):
+    span: EntitySpan
+    # Lowest label probability and highest entropy among the span's tokens.
+    confidence: float
+    entropy: float
+
+
+class ChunkScore(BaseModel):
+    """What the thresholds are compared against, for one chunk (sentence)."""
+
+    spans: List[SpanConfidence]
+    min_o_confidence: float
+
+    def is_uncertain(self, thresholds: CascadeThresholds) -> bool:
+        return self.min_o_confidence < thresholds.min_o_confidence or any(
+            s.confidence < thresholds.min_span_confidence
+            or s.entropy > thresholds.max_span_entropy
+            for s in self.spans
+        )
+
+
+def score_chunk(tagged: TaggedBatch, i: int) -> ChunkScore:
+    """
+    Per-span confidence and entropy for row i of a tagged batch, plus the
+    least confident O token. Special tokens are ignored.
+    """
+    if tagged.entropies is None:
+        raise ValueError("Scoring chunks needs a TaggedBatch with entropies")
+
+    sl = tagged.row(i)
+    offsets = tagged.offsets[sl]
+    confidences = tagged.confidences[sl]
+    entropies = tagged.entropies[sl]
+    content = offsets[:, 1] > offsets[:, 0]
+
+    spans = []
+    for span in tagged.spans(i):
+        in_span = content & (offsets[:, 0] >= span.start) & (offsets[:, 1] <= span.end)
+        spans.append(
+            SpanConfidence(
+                span=span,
+                confidence=float(confidences[in_span].min(initial=1.0)),
+                entropy=float(entropies[in_span].max(initial=0.0)),
+            )
+        )
+
+    is_o = content & (tagged.label_ids[sl] == LABEL_MAP["O"])
+    min_o = float(confidences[is_o].min()) if is_o.any() else 1.0
+
+    return ChunkScore(spans=spans, min_o_confidence=min_o)
+
+
+class CascadeStats(BaseModel):
+    n_chunks: int = 0
+    n_escalated: int = 0
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.n_escalated / self.n_chunks if self.n_chunks else 0.0
+
+
+class ScoredDocument:
+    """
+    A document tagged sentence by sentence, with each sentence scored. The
+    expensive part of the cascade (the tagger) is done once here, so that
+    any number of thresholds can then be tried against it.
+    """
+
+    def __init__(self, text: str, tagger: CitationTagger):
+        self.text = text
+        self.sentence_spans = tagger.segmenter.spans(text)
+        self.tagged = tagger.tag_sentences(
+            [text[start:end] for start, end in self.sentence_spans]
+        )
+        self.scores = [score_chunk(self.tagged, i) for i in range(len(self.tagged))]
+
+    def context(self, i: int) -> str:
+        """The CONTEXT_SENTENCES sentences before sentence i, as in the text."""
+        start = self.sentence_spans[max(0, i - CONTEXT_SENTENCES)][0]
+        return self.text[start : self.sentence_spans[i][0]].strip()
+
+    def split(
+        self, thresholds: CascadeThresholds
+    ) -> Tuple[List[EntitySpan], List[Tuple[str, str]]]:
+        """
+        Returns the model's spans from the confident sentences (with
+        document offsets) and the text and context of the uncertain ones.
+        """
+        spans: List[EntitySpan] = []
+        uncertain: List[Tuple[str, str]] = []
+        for i, ((start, _), text, score) in enumerate(
+            zip(self.sentence_spans, self.tagged.texts, self.scores)
+        ):
+            if score.is_uncertain(thresholds):
+                uncertain.append((text, self.context(i)))
+                continue
+            for s in score.spans:
+                spans.append(
+                    s.span.model_copy(
+                        update={
+                            "start": s.span.start + start,
+                            "end": s.span.end + start,
+                        }
+                    )
+                )
+        return spans, uncertain
+
+
+async def _default_extractor(text: str, context: str) -> CitationExtractionResult:
+    # Imported here so the cascade (and its tests) never need the OpenAI
+    # client unless the real LLM is used.
+    from src.benchmarking.llm import _extract_citations_from_chunk
+
+    return await _extract_citations_from_chunk(text, context=context)
+
+
+async def bert_only(text: str, context: str) -> CitationExtractionResult:
+    """A stand-in extractor that finds nothing: measures the cascade without
+    spending on LLM calls."""
+    return CitationExtractionResult(cases={}, statutes={})
+
+
+async def resolve_document(
+    doc: ScoredDocument,
+    thresholds: CascadeThresholds,
+    extract: ChunkExtractor = _default_extractor,
+    stats: Optional[CascadeStats] = None,
+) -> CitationExtractionResult:
+    spans, uncertain = doc.split(thresholds)
+    if stats is not None:
+        stats.n_chunks += len(doc.scores)
+        stats.n_escalated += len(uncertain)
+
+    bert_result = authorities_to_citation_extraction_result(assemble_citations(spans))
+    llm_results = await asyncio.gather(
+        *(extract(chunk, context) for chunk, context in uncertain)
+    )
+    return CitationExtractionResult.combine([bert_result, *llm_results])
+
+
+async def cascade_extract(
+    text: str,
+    tagger: CitationTagger,
+    thresholds: Optional[CascadeThresholds] = None,
+    extract: ChunkExtractor = _default_extractor,
+    stats: Optional[CascadeStats] = None,
+) -> CitationExtractionResult:
+    """
+    Tags every sentence with the model and keeps its citations where it is
+    confident; only the sentences it is unsure about are sent to `extract`
+    (by default the LLM chunk extractor), each with the sentences before it
+    as context. The two are merged into one result.
+    """
+    return await resolve_document(
+        ScoredDocument(text, tagger), thresholds or CascadeThresholds(), extract, stats
+    )
+
+
+def _memoized(extract: ChunkExtractor) -> ChunkExtractor:
+    results: Dict[Tuple[str, str], CitationExtractionResult] = {}
+
+    async def wrapped(text: str, context: str) -> CitationExtractionResult:
+        if (text, context) not in results:
+            results[text, context] = await extract(text, context)
+        return results[text, context]
+
+    return wrapped
+
+
+class ThresholdResult(BaseModel):
+    thresholds: CascadeThresholds
+    accuracy: float
+    escalation_rate: float
+
+
+async def tune_thresholds(
+    tagger: CitationTagger,
+    items: Sequence[TestItem],
+    grid: Sequence[CascadeThresholds],
+    extract: ChunkExtractor = _default_extractor,
+) -> List[ThresholdResult]:
+    """
+    Scores every threshold setting on the test items: citation accuracy (as
+    in benchmark.py) and the share of sentences sent to the LLM. Each
+    document is tagged once and each sentence is sent to the LLM at most
+    once across the whole grid.
+    """
+    docs = [ScoredDocument(text, tagger) for text, _ in items]
+    extract = _memoized(extract)
+
+    results = []
+    for thresholds in grid:
+        stats = CascadeStats()
+        errors = total = 0
+        for doc, (_, correct) in zip(docs, items):
+            res = await resolve_document(doc, thresholds, extract, stats)
+            errors += correct.err_count(res)
+            total += sum(correct.cases.values()) + sum(correct.statutes.values())
+
+        results.append(
+            ThresholdResult(
+                thresholds=thresholds,
+                accuracy=100 * (total - errors) / total if total else 0.0,
+                escalation_rate=stats.escalation_rate,
+            )
+        )
+
+    return results
+
+
+def threshold_grid(
+    confidences: Sequence[float] = (0.5, 0.7, 0.8, 0.9, 0.95, 0.99),
+    entropies: Sequence[float] = (0.1, 0.3, 0.6, 1.0, np.log(21)),
+) -> List[CascadeThresholds]:
+    """
+    Grid over span confidence and entropy; the O-token threshold follows the
+    span confidence.
+    """
+    return [
+        CascadeThresholds(
+            min_span_confidence=c, max_span_entropy=float(e), min_o_confidence=c
+        )
+        for c in confidences
+        for e in entropies
+    ]
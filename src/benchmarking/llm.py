@@ -132,15 +132,22 @@ async def llm_extract_citations_from_document(doc: str) -> CitationExtractionRes
 
 
 async def _extract_citations_from_chunk(
-    text: str, previous_result: Dict = dict()
+    text: str, previous_result: Dict = dict(), context: str = ""
 ) -> CitationExtractionResult:
+    content = f"Input Text: {text}"
+    if context:
+        # Lets the model resolve "Id." and "supra" in the input text.
+        content = (
+            "Preceding Text (only for resolving short forms such as Id. or "
+            f"supra; do not count citations in it): {context}\n\n{content}"
+        )
     try:
         res = await chat(
             system_prompt=LLM_EXTRACTION_PROMPT.format(
                 current=str(previous_result),
                 schema=CitationExtractionResult.model_json_schema(),
             ),
-            messages=[{"role": "user", "content": f"Input Text: {text}"}],
+            messages=[{"role": "user", "content": content}],
         )
         return CitationExtractionResult.model_validate_json(res)
     except Exception as e:
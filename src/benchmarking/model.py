@@ -1,6 +1,6 @@
 from typing import Dict
 
-from cit_parser import Authorities
+from src.inference.assembly import Authorities
 
 from .types import CitationExtractionResult
 
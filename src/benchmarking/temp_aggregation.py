@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import re
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from src.inference.decoding import ENTITY_TYPES, span_boundaries
+from src.training.constants import LABEL_MAP
+
+SPECIAL_TOKENS = {"[CLS]", "[SEP]", "[PAD]"}
+
+# Punctuation after which the next token is glued on rather than spaced.
+JOINING_PUNCTUATION = {"-", "(", "'", "’", "/"}
+
+
+class LabelPrediction(NamedTuple):
+    token: str
+    label: str
+
+
+def _needs_space(prev: str, token: str) -> bool:
+    if not token or not prev or token.startswith("##"):
+        return False
+    if not token[0].isalnum() or prev in JOINING_PUNCTUATION:
+        return False
+    if prev == ".":
+        # "F . 3 ##d" -> "F.3d" and "U . S ." -> "U.S.", but "Inc . v ." -> "Inc. v."
+        return not (token[0].isdigit() or (len(token) == 1 and token.isupper()))
+    if len(prev) == 1 and prev.isalpha() and len(token) == 1 and token.isalpha():
+        return False
+    return True
+
+
+def join_tokens(tokens: Sequence[str]) -> str:
+    """
+    Rebuilds surface text from wordpieces: ## pieces are glued to the previous
+    token, punctuation attaches to its neighbours, words are space-separated.
+    """
+    text = ""
+    prev = ""
+    for token in tokens:
+        if _needs_space(prev, token):
+            text += " "
+        text += token[2:] if token.startswith("##") else token
+        prev = token
+    return text
+
+
+def aggregate_entities(
+    labels: Sequence[LabelPrediction | Tuple[str, str]],
+) -> List[LabelPrediction]:
+    """
+    Collapses token-level BIO predictions into one LabelPrediction per entity,
+    e.g. Lee/B-CASE_NAME ##gin/I-CASE_NAME -> Leegin/CASE_NAME.
+
+    Boundaries are found with NumPy over the label ids (see
+    src.inference.decoding.span_boundaries); only the per-entity string join
+    is done in Python. Special tokens never belong to an entity.
+    """
+    tokens = [token for token, _ in labels]
+    label_ids = np.array(
+        [
+            LABEL_MAP["O"]
+            if token in SPECIAL_TOKENS
+            else LABEL_MAP.get(label, LABEL_MAP["O"])
+            for token, label in labels
+        ],
+        dtype=np.int64,
+    )
+
+    starts, ends, type_ids = span_boundaries(label_ids)
+
+    return [
+        LabelPrediction(
+            token=join_tokens(tokens[start:end]), label=ENTITY_TYPES[type_id]
+        )
+        for start, end, type_id in zip(
+            starts.tolist(), ends.tolist(), type_ids.tolist()
+        )
+    ]
+
+
+def _parse_year(text: str) -> Optional[int]:
+    digits = re.sub(r"\D", "", text)
+    return int(digits) if len(digits) == 4 else None
+
+
+class CaselawCitation(BaseModel):
+    # Frozen so citations can key an authority index.
+    model_config = ConfigDict(frozen=True)
+
+    name: Optional[str] = None
+    volume: Optional[str] = None
+    reporter: Optional[str] = None
+    page: Optional[str] = None
+    pin: Optional[str] = None
+    court: Optional[str] = None
+    year: Optional[int] = None
+
+    @property
+    def guid(self) -> str:
+        """Volume-reporter-page identifier, e.g. "335 F.3d 141"."""
+        return " ".join(p for p in (self.volume, self.reporter, self.page) if p)
+
+    @property
+    def full_text(self) -> str:
+        text = ", ".join(p for p in (self.name, self.guid, self.pin) if p)
+        parenthetical = " ".join(p for p in (self.court, str(self.year or "")) if p)
+        return f"{text} ({parenthetical})" if parenthetical else text
+
+    @classmethod
+    def from_token_label_pairs(
+        cls, entities: Sequence[LabelPrediction]
+    ) -> Optional[CaselawCitation]:
+        """
+        Builds a citation from the first caselaw entities in an aggregated
+        sequence. Stops at a second case name once a reporter has been seen,
+        since that starts the next citation.
+        """
+        fields = {
+            "CASE_NAME": "name",
+            "VOLUME": "volume",
+            "REPORTER": "reporter",
+            "PAGE": "page",
+            "PIN": "pin",
+            "COURT": "court",
+        }
+        values: dict = {}
+
+        for token, label in entities:
+            if label == "CASE_NAME" and "reporter" in values:
+                break
+            if label == "YEAR":
+                values.setdefault("year", _parse_year(token))
+            elif label in fields:
+                values.setdefault(fields[label], token)
+
+        if "reporter" not in values:
+            return None
+
+        return cls(**values)
+
+
+SUBDIVISION_PATTERN = re.compile(r"^\(?([0-9A-Za-z]{1,4})\)$")
+
+
+class StatuteCitation(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    title: Optional[str] = None
+    code: Optional[str] = None
+    section: Optional[str] = None
+    year: Optional[int] = None
+
+    @property
+    def full_text(self) -> str:
+        """E.g. "18 U.S.C. § 1961(1)"."""
+        section = f"§ {self.section}" if self.section else None
+        return " ".join(p for p in (self.title, self.code, section) if p)
+
+    @classmethod
+    def from_token_label_pairs(
+        cls, entities: Sequence[LabelPrediction]
+    ) -> Optional[StatuteCitation]:
+        """
+        Builds a citation from the first statute entities in an aggregated
+        sequence. Subdivisions split off the section, e.g. "12940" then "j)",
+        are folded back in as "12940(j)"; any other later section starts the
+        next citation.
+        """
+        values: dict = {}
+        previous_label = None
+
+        for token, label in entities:
+            if label == "SECTION":
+                if "section" not in values:
+                    values["section"] = token
+                else:
+                    m = SUBDIVISION_PATTERN.match(token)
+                    if previous_label != "SECTION" or not m:
+                        break
+                    values["section"] += f"({m.group(1)})"
+            elif label == "TITLE":
+                values.setdefault("title", token)
+            elif label == "CODE":
+                values.setdefault("code", token)
+            elif label == "YEAR":
+                values.setdefault("year", _parse_year(token))
+
+            previous_label = label
+
+        if "section" not in values:
+            return None
+
+        return cls(**values)
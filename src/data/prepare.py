@@ -1,17 +1,21 @@
 import asyncio
 import glob
+import hashlib
+import json
+import os
 import shutil
+import tempfile
 import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import pandas as pd
-import spacy
 from datasets import Dataset, DatasetDict, load_dataset
 from wasabi import msg
 
+from src.inference.segmenter import get_segmenter
 from src.training.model import get_tokenizer
-from src.training.constants import LABEL_MAP
+from src.training.constants import ALL_LABELS, LABEL_MAP
 
 from .generate import generate, generate_tags
 from .manage_datasets import (
@@ -127,10 +131,9 @@ def _concat_sents(sents: List[str]) -> str:
 async def text_to_data(text: str) -> List[Datum]:
     tokenizer = get_tokenizer()
 
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp(text)
-
-    sentences: List[str] = [sent.text for sent in doc.sents]
+    # The full parser, as training data was always split with, so that new
+    # data keeps the sentence boundaries of the existing splits.
+    sentences: List[str] = get_segmenter("parser").split(text)
 
     tasks = []
 
@@ -238,47 +241,121 @@ def split_and_save(ds: Dataset, version: str = "v0"):
     final_splits.save_to_disk(output_dir / "ds")
 
 
-def load_for_training(version: str = "v0") -> DatasetDict:
-    path = Path(HF_CACHE_DIR) / version / "ds"
-    ds_dict = DatasetDict.load_from_disk(path)
+def load_splits(version: str = "v0") -> DatasetDict:
+    """Train/valid/test splits as saved by split_and_save, untokenized."""
+    return DatasetDict.load_from_disk(Path(HF_CACHE_DIR) / version / "ds")
+
+
+TRAINING_COLUMNS = ("input_ids", "attention_mask", "labels", "length")
+
+
+def _align_labels(input_ids: List[int], tags: List, max_length: int, text: str) -> Dict:
+    n_tokens = len(input_ids) - 2
+    assert len(tags) == n_tokens, f"{len(tags)} tags for {n_tokens} tokens: {text!r}"
+
+    # Keep [CLS], the first tokens and [SEP].
+    keep = min(n_tokens, max_length - 2)
+    input_ids = input_ids[: keep + 1] + input_ids[-1:]
+    labels = [-100] + [LABEL_MAP[label] for _, label in tags[:keep]] + [-100]
+
+    return {
+        "input_ids": input_ids,
+        "attention_mask": [1] * len(input_ids),
+        "labels": labels,
+        # Read by the Trainer's length-grouped sampler (group_by_length).
+        "length": len(input_ids),
+    }
+
+
+def encode_for_training(row: Dict, tokenizer, max_length: int = 512) -> Dict:
+    """
+    Token ids and aligned labels for one row, unpadded: the collator pads
+    each batch to its own longest row. row["tags"] holds one (wordpiece,
+    label) pair per token; rows longer than max_length lose their last
+    tokens and those tokens' labels together. [CLS] and [SEP] are -100.
+    """
+    input_ids = tokenizer(row["text"], verbose=False)["input_ids"]
+    return _align_labels(input_ids, row["tags"], max_length, row["text"])
+
+
+def encode_batch_for_training(
+    batch: Dict[str, List], tokenizer, max_length: int = 512
+) -> Dict[str, List]:
+    """encode_for_training over a batch of rows, tokenized in one call."""
+    encodings = tokenizer(batch["text"], verbose=False)["input_ids"]
+    rows = [
+        _align_labels(input_ids, tags, max_length, text)
+        for input_ids, tags, text in zip(encodings, batch["tags"], batch["text"])
+    ]
+    return {column: [row[column] for row in rows] for column in TRAINING_COLUMNS}
+
+
+def training_fingerprint(
+    ds_dict: DatasetDict, version: str, tokenizer_name: str, max_length: int
+) -> str:
+    """
+    Identifies a tokenized copy of the splits: it changes with the dataset
+    version, the tokenizer, the label set and max_length, and also when the
+    splits of a version are regenerated (each split's own fingerprint).
+    """
+    key = {
+        "version": version,
+        "tokenizer": tokenizer_name,
+        "labels": ALL_LABELS,
+        "max_length": max_length,
+        "splits": {name: split._fingerprint for name, split in ds_dict.items()},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_for_training(
+    version: str = "v0",
+    max_length: int = 512,
+    num_proc: Optional[int] = None,
+    rebuild: bool = False,
+) -> DatasetDict:
+    """
+    The splits with token ids and aligned labels (see encode_for_training),
+    cached as Arrow under HF_CACHE_DIR/<version>/training/<fingerprint>: a
+    cached copy is memory-mapped rather than re-tokenized. A missing one is
+    built in batches over num_proc processes (default: every core).
+    """
+    ds_dict = load_splits(version)
     tokenizer = get_tokenizer()
 
-    def tokenize_and_align_labels(row):
-        # Tokenize the input text
-        encoding = tokenizer.encode_plus(
-            row["text"],
-            add_special_tokens=True,
-            truncation=True,
-            padding="max_length",
-            max_length=512,
-            return_attention_mask=True,
-            return_tensors="pt",
-        )
-
-        input_ids = encoding["input_ids"].squeeze()  # pyright: ignore
-        attention_mask = encoding["attention_mask"].squeeze()  # pyright: ignore
-
-        # Map labels and apply the same padding/truncation
-        labels = [-100] + [LABEL_MAP[label] for _, label in row["tags"]] + [-100]
-        padding_length = len(input_ids) - len(labels)
-        labels += [-100] * padding_length
-
-        token_label_pairs = [
-            (tokenizer.decode([id]), label) for id, label in zip(input_ids, labels)
-        ]
-
-        for token, label in token_label_pairs:
-            if token in ["[CLS]", "[SEP]", "[PAD]"]:
-                assert label == -100
+    fingerprint = training_fingerprint(
+        ds_dict, version, tokenizer.name_or_path, max_length
+    )
+    cache_root = Path(HF_CACHE_DIR) / version / "training"
+    cache_dir = cache_root / fingerprint
+    if cache_dir.exists() and not rebuild:
+        msg.info(f"Loading tokenized splits from {cache_dir}")
+        return DatasetDict.load_from_disk(cache_dir)
+
+    encoded = ds_dict.map(
+        encode_batch_for_training,
+        fn_kwargs={"tokenizer": tokenizer, "max_length": max_length},
+        batched=True,
+        num_proc=num_proc or os.cpu_count(),
+        # The Arrow copy below is the cache.
+        load_from_cache_file=False,
+    )
 
-        return {
-            "input_ids": input_ids,
-            "attention_mask": attention_mask,
-            "labels": labels,
-        }
+    # Saved next to the final location and renamed into place, so that
+    # concurrent runs (e.g. `train --nproc`) never load a partial copy.
+    cache_root.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=cache_root, prefix=".tmp-"))
+    encoded.save_to_disk(tmp_dir)
+    if rebuild:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    try:
+        tmp_dir.rename(cache_dir)
+    except OSError:
+        # Another run got there first with the same contents.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    msg.good(f"Cached tokenized splits in {cache_dir}")
 
-    ds_dict = ds_dict.map(tokenize_and_align_labels, batched=False)
-    return ds_dict
+    return DatasetDict.load_from_disk(cache_dir)
 
 
 def load_final_splits():
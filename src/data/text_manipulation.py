@@ -2,7 +2,7 @@ import os
 import re
 from typing import Dict, List
 
-import nltk
+from src.inference.segmenter import get_segmenter
 
 
 def remove_multiple_newlines(text: str) -> str:
@@ -58,5 +58,5 @@ def get_law_sections() -> List[str]:
 
 
 def split_sentences(text: str) -> List[str]:
-    sentences = nltk.sent_tokenize(text)
+    sentences = get_segmenter().split(text)
     return sentences
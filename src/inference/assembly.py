@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.benchmarking.temp_aggregation import (
+    SUBDIVISION_PATTERN,
+    CaselawCitation,
+    StatuteCitation,
+)
+from src.inference.types import EntitySpan
+
+CASE_FIELDS = {
+    "CASE_NAME": "name",
+    "VOLUME": "volume",
+    "REPORTER": "reporter",
+    "PAGE": "page",
+    "PIN": "pin",
+    "COURT": "court",
+    "YEAR": "year",
+}
+
+STATUTE_FIELDS = {"TITLE": "title", "CODE": "code", "SECTION": "section"}
+
+
+class Reference(BaseModel):
+    """One place in the document where an authority is cited."""
+
+    form: Literal["full", "short", "id", "supra"]
+    start: int
+    end: int
+    pin: Optional[str] = None
+
+
+Authority = CaselawCitation | StatuteCitation
+
+
+class Authorities:
+    """
+    Every authority cited in a document with each place it was cited, in the
+    same shape as cit_parser's Authorities (full citation -> references).
+    """
+
+    def __init__(self):
+        self.caselaw: Dict[CaselawCitation, List[Reference]] = {}
+        self.statutes: Dict[StatuteCitation, List[Reference]] = {}
+        # Short forms, Id. and supra with no earlier full citation to point at.
+        self.unresolved: List[Reference] = []
+
+    def add(self, authority: Authority, reference: Reference):
+        if isinstance(authority, CaselawCitation):
+            self.caselaw.setdefault(authority, []).append(reference)
+        else:
+            self.statutes.setdefault(authority, []).append(reference)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", text.lower()).strip()
+
+
+def _name_keys(name: str) -> List[str]:
+    """
+    Keys under which a case name is indexed: the whole name and each party,
+    so "Fux v. Hock" can later be found as "Fux" or "Hock".
+    """
+    full = _normalize(name)
+    parties = [p.strip() for p in re.split(r"\bv\b", full) if p.strip()]
+    return [full] + parties
+
+
+def _volume_reporter_key(volume: str, reporter: str) -> Tuple[str, str]:
+    return volume.strip(), re.sub(r"\s", "", reporter)
+
+
+class _Group:
+    """Entities seen since the last flush, plus where they sit in the text."""
+
+    def __init__(self, start: int):
+        self.fields: Dict[str, str] = {}
+        self.start = start
+        self.end = start
+        self.is_supra = False
+
+
+class CitationAssembler:
+    """
+    Assembles decoded spans into citations in a single pass.
+
+    Full caselaw citations are indexed by case name (and each party name) and
+    by volume-reporter as they are seen, and the last cited authority is kept,
+    so short forms, supra and Id. resolve with dictionary lookups instead of
+    rescanning earlier results. The whole pass is O(number of spans).
+    """
+
+    def __init__(self):
+        self.authorities = Authorities()
+        self.by_name: Dict[str, CaselawCitation] = {}
+        self.by_volume_reporter: Dict[Tuple[str, str], CaselawCitation] = {}
+        self.last: Optional[Authority] = None
+
+        self._case: Optional[_Group] = None
+        self._statute: Optional[_Group] = None
+        self._id: Optional[Reference] = None
+        self._previous_label: Optional[str] = None
+
+    def feed(self, span: EntitySpan):
+        label = span.label
+
+        if label == "ID":
+            self._flush_all()
+            self._id = Reference(form="id", start=span.start, end=span.end)
+        elif label == "PIN" and self._id is not None and self._case is None:
+            # "Id. at 12"
+            self._id.pin = self._id.pin or span.text
+            self._id.end = span.end
+        elif label == "SUPRA":
+            if self._case is None:
+                self._flush_all()
+                self._case = _Group(span.start)
+            self._case.is_supra = True
+            self._case.end = span.end
+        elif label == "YEAR" and self._case is None and self._statute is not None:
+            # Statute years, e.g. "(Stats. 2003)", are labelled YEAR as well.
+            self._statute.fields.setdefault("year", span.text)
+            self._statute.end = span.end
+        elif label in CASE_FIELDS:
+            self._feed_case(span)
+        elif label in STATUTE_FIELDS:
+            self._feed_statute(span)
+
+        self._previous_label = label
+
+    def finish(self) -> Authorities:
+        self._flush_all()
+        return self.authorities
+
+    def _feed_case(self, span: EntitySpan):
+        self._flush_id()
+        self._flush_statute()
+
+        field = CASE_FIELDS[span.label]
+        group = self._case
+
+        # A field that is already filled in (other than the repeatable pin and
+        # court), or a name after a reporter, belongs to the next citation.
+        if (
+            group is None
+            or (field in group.fields and field not in ("pin", "court"))
+            or (field == "name" and "reporter" in group.fields)
+        ):
+            self._flush_case()
+            group = self._case = _Group(span.start)
+
+        group.fields.setdefault(field, span.text)
+        group.end = span.end
+
+    def _feed_statute(self, span: EntitySpan):
+        self._flush_id()
+        self._flush_case()
+
+        field = STATUTE_FIELDS[span.label]
+        group = self._statute
+
+        if group is not None and "section" in group.fields:
+            m = SUBDIVISION_PATTERN.match(span.text)
+            if field == "section" and self._previous_label == "SECTION" and m:
+                # "12940" followed by "j)" -> "12940(j)"
+                group.fields["section"] += f"({m.group(1)})"
+                group.end = span.end
+                return
+
+            # "18 U.S.C. §§ 1961, 1962": a bare new section keeps title and code.
+            carried = {k: v for k, v in group.fields.items() if k in ("title", "code")}
+            self._flush_statute()
+            group = self._statute = _Group(span.start)
+            if field == "section":
+                group.fields.update(carried)
+        elif group is None or field in group.fields:
+            self._flush_statute()
+            group = self._statute = _Group(span.start)
+
+        group.fields.setdefault(field, span.text)
+        group.end = span.end
+
+    def _flush_all(self):
+        self._flush_id()
+        self._flush_case()
+        self._flush_statute()
+
+    def _flush_id(self):
+        if self._id is not None:
+            self._resolve(self.last, self._id)
+            self._id = None
+
+    def _flush_case(self):
+        if self._case is not None:
+            self._assemble_case(self._case)
+            self._case = None
+
+    def _flush_statute(self):
+        if self._statute is not None:
+            self._assemble_statute(self._statute)
+            self._statute = None
+
+    def _resolve(self, authority: Optional[Authority], reference: Reference):
+        if authority is None:
+            self.authorities.unresolved.append(reference)
+            return
+        self.authorities.add(authority, reference)
+        self.last = authority
+
+    def _assemble_case(self, group: _Group):
+        fields = group.fields
+        volume, reporter = fields.get("volume"), fields.get("reporter")
+        vr_key = _volume_reporter_key(volume, reporter) if volume and reporter else None
+
+        if vr_key and "page" in fields and not group.is_supra:
+            year = fields.get("year")
+            citation = CaselawCitation(
+                name=fields.get("name"),
+                volume=volume,
+                reporter=reporter,
+                page=fields["page"],
+                pin=fields.get("pin"),
+                court=fields.get("court"),
+                year=int(year) if year and year.isdigit() else None,
+            )
+            # Later full citations to the same case reuse the first one as key.
+            citation = self.by_volume_reporter.get(vr_key, citation)
+            self.by_volume_reporter[vr_key] = citation
+            for name in {citation.name, fields.get("name")} - {None}:
+                for key in _name_keys(name):  # pyright: ignore
+                    self.by_name[key] = citation
+
+            self._resolve(
+                citation,
+                Reference(
+                    form="full", start=group.start, end=group.end, pin=fields.get("pin")
+                ),
+            )
+            return
+
+        target: Optional[CaselawCitation] = None
+        if vr_key:
+            target = self.by_volume_reporter.get(vr_key)
+        if target is None and "name" in fields:
+            target = self.by_name.get(_normalize(fields["name"]))
+
+        if target is None and not vr_key and "name" not in fields:
+            # Stray court/year/pin fragments; nothing to cite.
+            return
+
+        self._resolve(
+            target,
+            Reference(
+                form="supra" if group.is_supra else "short",
+                start=group.start,
+                end=group.end,
+                pin=fields.get("pin"),
+            ),
+        )
+
+    def _assemble_statute(self, group: _Group):
+        fields = group.fields
+        if "section" not in fields:
+            return
+
+        year = fields.get("year")
+        citation = StatuteCitation(
+            title=fields.get("title"),
+            code=fields.get("code"),
+            section=fields["section"],
+            year=int(year) if year and year.isdigit() else None,
+        )
+        self._resolve(
+            citation, Reference(form="full", start=group.start, end=group.end)
+        )
+
+
+def assemble_citations(spans: Iterable[EntitySpan]) -> Authorities:
+    """
+    Turns a document's decoded spans, in document order, into its cited
+    authorities with Id., supra and short forms resolved.
+    """
+    assembler = CitationAssembler()
+    for span in spans:
+        assembler.feed(span)
+    return assembler.finish()
@@ -0,0 +1,60 @@
+from typing import List, Sequence, Tuple
+
+
+def bucket_by_length(lengths: Sequence[int], max_tokens: int) -> List[List[int]]:
+    """
+    Groups item indices into batches whose padded size (number of items times
+    the longest item) stays within max_tokens.
+
+    Items are sorted by length first, so each batch only pads up to its own
+    longest item. An item longer than max_tokens still gets a batch of its own.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    longest = 0
+
+    for i in order:
+        candidate_longest = max(longest, lengths[i])
+        if current and candidate_longest * (len(current) + 1) > max_tokens:
+            batches.append(current)
+            current = []
+            candidate_longest = lengths[i]
+
+        current.append(i)
+        longest = candidate_longest
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def pack_windows(lengths: Sequence[int], budget: int) -> List[Tuple[int, int]]:
+    """
+    Greedily packs consecutive items into windows of at most `budget` tokens.
+
+    lengths are the token counts of consecutive items (e.g. the sentences of
+    a document); windows are returned as [start, end) token ranges over their
+    concatenation. Items are never split unless one alone exceeds the budget,
+    in which case it is cut into budget-sized pieces.
+    """
+    windows: List[Tuple[int, int]] = []
+    start = end = 0
+
+    for length in lengths:
+        if end - start + length > budget and end > start:
+            windows.append((start, end))
+            start = end
+        end += length
+
+        # An oversize item is cut into full windows; its tail stays open.
+        while end - start > budget:
+            windows.append((start, start + budget))
+            start += budget
+
+    if end > start:
+        windows.append((start, end))
+
+    return windows
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+from wasabi import msg
+
+# Label ids, confidences and entropies for one sentence's tokens.
+Prediction = Tuple[np.ndarray, ...]
+PREDICTION_DTYPES = (np.int8, np.float32, np.float32)
+
+MAX_MEMORY_BYTES = 64 * 1024 * 1024
+MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+
+def normalize_sentence(sentence: str) -> str:
+    """
+    Whitespace differences do not change the wordpieces the model sees, so
+    "Rule  12(b)(6)\\n" and "Rule 12(b)(6)" share a cache entry. Case is kept;
+    the model is cased.
+    """
+    return re.sub(r"\s+", " ", sentence).strip()
+
+
+def _as_prediction(arrays) -> Prediction:
+    return tuple(np.array(a, dtype=t) for a, t in zip(arrays, PREDICTION_DTYPES))
+
+
+def _nbytes(prediction: Prediction) -> int:
+    return sum(a.nbytes for a in prediction)
+
+
+class CacheStats(BaseModel):
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _DiskTier:
+    """
+    SQLite-backed tier. Rows carry the checkpoint they were predicted with
+    and a last-used time; the least recently used rows are deleted once the
+    stored predictions exceed max_bytes.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS predictions (
+                key TEXT PRIMARY KEY,
+                checkpoint TEXT NOT NULL,
+                label_ids BLOB NOT NULL,
+                confidences BLOB NOT NULL,
+                entropies BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS predictions_last_used "
+            "ON predictions (last_used)"
+        )
+        self.conn.commit()
+        self.size = self._total_size()
+
+    def _total_size(self) -> int:
+        (size,) = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM predictions"
+        ).fetchone()
+        return size
+
+    def purge_other_checkpoints(self, checkpoint: str) -> int:
+        n = self.conn.execute(
+            "DELETE FROM predictions WHERE checkpoint != ?", (checkpoint,)
+        ).rowcount
+        self.conn.commit()
+        self.size = self._total_size()
+        return n
+
+    def get_many(self, keys: List[str]) -> dict[str, Prediction]:
+        found: dict[str, Prediction] = {}
+        # Stay well under SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = self.conn.execute(
+                "SELECT key, label_ids, confidences, entropies FROM predictions "
+                f"WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for key, *blobs in rows:
+                found[key] = tuple(
+                    np.frombuffer(b, dtype=t) for b, t in zip(blobs, PREDICTION_DTYPES)
+                )
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE predictions SET last_used = ? WHERE key = ?",
+                [(now, k) for k in found],
+            )
+            self.conn.commit()
+        return found
+
+    def put_many(self, checkpoint: str, items: List[Tuple[str, Prediction]]) -> int:
+        now = time.time()
+        for key, prediction in items:
+            blobs = [a.tobytes() for a in prediction]
+            size = sum(len(b) for b in blobs)
+            # Keys include the checkpoint, so an existing row already holds
+            # this exact prediction.
+            inserted = self.conn.execute(
+                "INSERT OR IGNORE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, checkpoint, *blobs, size, now),
+            ).rowcount
+            self.size += size * inserted
+
+        evicted = self._evict() if self.size > self.max_bytes else 0
+        self.conn.commit()
+        return evicted
+
+    def _evict(self) -> int:
+        # Drop least recently used rows down to 90% of the budget, so eviction
+        # does not run again on every subsequent insert.
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM predictions ORDER BY last_used"
+        ).fetchall():
+            if self.size <= target:
+                break
+            self.conn.execute("DELETE FROM predictions WHERE key = ?", (key,))
+            self.size -= size
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        self.conn.execute("DELETE FROM predictions")
+        self.conn.commit()
+        self.size = 0
+
+
+class PredictionCache:
+    """
+    Content-addressed cache of per-sentence predictions.
+
+    Entries are keyed by a hash of the normalized sentence and the id of the
+    checkpoint that produced them (src.training.model.checkpoint_id). The
+    in-process tier is an LRU bounded by max_bytes; with a path, misses fall
+    through to an SQLite tier bounded by max_disk_bytes, and new predictions
+    are written to both.
+
+    A cache serves one checkpoint at a time. bind() switches it, which drops
+    the in-memory entries and deletes the other checkpoints' rows on disk, so
+    loading a new version never serves (or keeps paying for) stale
+    predictions. The SQLite connection must not be shared across fork(); open
+    one cache per process.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = MAX_MEMORY_BYTES,
+        path: Optional[Path] = None,
+        max_disk_bytes: int = MAX_DISK_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.checkpoint: Optional[str] = None
+        self.stats = CacheStats()
+
+        self._memory: OrderedDict[str, Prediction] = OrderedDict()
+        self._disk = _DiskTier(path, max_disk_bytes) if path else None
+        self._lock = threading.Lock()
+
+    def bind(self, checkpoint: str):
+        with self._lock:
+            if checkpoint == self.checkpoint:
+                return
+            self._memory.clear()
+            self.size = 0
+            if self._disk is not None:
+                n = self._disk.purge_other_checkpoints(checkpoint)
+                if n:
+                    msg.info(f"Dropped {n} cached predictions from other checkpoints")
+            self.checkpoint = checkpoint
+
+    def key(self, sentence: str) -> str:
+        if self.checkpoint is None:
+            raise RuntimeError("PredictionCache is not bound to a checkpoint")
+        text = f"{self.checkpoint}\0{normalize_sentence(sentence)}"
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get_many(self, keys: List[str]) -> List[Optional[Prediction]]:
+        with self._lock:
+            results: List[Optional[Prediction]] = []
+            for key in keys:
+                prediction = self._memory.get(key)
+                if prediction is not None:
+                    self._memory.move_to_end(key)
+                results.append(prediction)
+
+            missing = [k for k, r in zip(keys, results) if r is None]
+            if self._disk is not None and missing:
+                found = self._disk.get_many(missing)
+                for i, key in enumerate(keys):
+                    if results[i] is None and key in found:
+                        results[i] = found[key]
+                        self._remember(key, found[key])
+                self.stats.disk_hits += len(found)
+
+            n_hits = sum(r is not None for r in results)
+            self.stats.hits += n_hits
+            self.stats.misses += len(keys) - n_hits
+            return results
+
+    def put_many(self, items: Iterable[Tuple[str, Prediction]]):
+        items = [(key, _as_prediction(prediction)) for key, prediction in items]
+        with self._lock:
+            for key, prediction in items:
+                self._remember(key, prediction)
+            if self._disk is not None and items:
+                assert self.checkpoint is not None
+                self.stats.evictions += self._disk.put_many(self.checkpoint, items)
+
+    def _remember(self, key: str, prediction: Prediction):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+
+        self._memory[key] = prediction
+        self.size += _nbytes(prediction)
+        while self.size > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self.size -= _nbytes(evicted)
+            self.stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.size = 0
+            if self._disk is not None:
+                self._disk.clear()
@@ -0,0 +1,76 @@
+import time
+from typing import Dict, List
+
+from pydantic import BaseModel
+from wasabi import msg
+
+from src.inference.tagger import CitationTagger
+from src.training.constants import ALL_LABELS
+
+
+class ComparisonReport(BaseModel):
+    n_sentences: int
+    n_tokens: int
+    reference_seconds: float
+    candidate_seconds: float
+    agreement: float
+    # For each label the reference predicted, the share of those tokens on
+    # which the candidate predicted the same label.
+    per_label_agreement: Dict[str, float]
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_seconds / self.candidate_seconds
+
+    def log(self, reference_name: str, candidate_name: str):
+        msg.info(
+            f"{self.n_sentences} sentences, {self.n_tokens} tokens\n"
+            f"{reference_name}: {self.reference_seconds:.2f}s | "
+            f"{candidate_name}: {self.candidate_seconds:.2f}s | "
+            f"speedup: {self.speedup:.2f}x"
+        )
+        msg.table(
+            [
+                (label, f"{100 * a:.2f}%")
+                for label, a in self.per_label_agreement.items()
+            ],
+            header=("Label", "Agreement"),
+        )
+        msg.good(f"Overall token agreement: {100 * self.agreement:.2f}%")
+
+
+def _timed_label_ids(tagger: CitationTagger, sentences: List[str]):
+    # Warm-up pass so one-off allocation costs don't count against either side.
+    tagger.tag_sentences(sentences[:8])
+
+    start = time.perf_counter()
+    label_ids = tagger.tag_sentences(sentences).label_ids
+    return label_ids, time.perf_counter() - start
+
+
+def compare_taggers(
+    reference: CitationTagger, candidate: CitationTagger, sentences: List[str]
+) -> ComparisonReport:
+    """
+    Runs both taggers over the same sentences and reports latency and how
+    often the candidate's argmax labels match the reference's.
+    """
+    reference_ids, reference_seconds = _timed_label_ids(reference, sentences)
+    candidate_ids, candidate_seconds = _timed_label_ids(candidate, sentences)
+
+    matches = reference_ids == candidate_ids
+
+    per_label: Dict[str, float] = {}
+    for label_id, label in enumerate(ALL_LABELS):
+        mask = reference_ids == label_id
+        if mask.any():
+            per_label[label] = float(matches[mask].mean())
+
+    return ComparisonReport(
+        n_sentences=len(sentences),
+        n_tokens=len(reference_ids),
+        reference_seconds=reference_seconds,
+        candidate_seconds=candidate_seconds,
+        agreement=float(matches.mean()) if len(matches) else 1.0,
+        per_label_agreement=per_label,
+    )
@@ -0,0 +1,111 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.inference.types import EntitySpan
+from src.training.constants import ALL_LABELS
+
+# Entity types in label order, e.g. CASE_NAME, VOLUME, ...
+ENTITY_TYPES = list(dict.fromkeys(l.split("-", 1)[1] for l in ALL_LABELS if l != "O"))
+
+# Lookup tables indexed by label id.
+LABEL_TYPE_IDS = np.array(
+    [ENTITY_TYPES.index(l.split("-", 1)[1]) if l != "O" else -1 for l in ALL_LABELS]
+)
+LABEL_IS_BEGIN = np.array([l.startswith("B-") for l in ALL_LABELS])
+
+
+def span_boundaries(
+    label_ids: np.ndarray, row_starts: np.ndarray | None = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds BIO entities in a flat array of label ids without a per-token loop.
+
+    An entity starts at a B- tag, at an I- tag whose type differs from the
+    previous token's, or at the first token of a row (row_starts, a boolean
+    mask, keeps entities from running across rows). It ends before the next
+    start or the next O. Returns token-index starts, exclusive ends and entity
+    type ids (indices into ENTITY_TYPES).
+    """
+    n = len(label_ids)
+    types = LABEL_TYPE_IDS[label_ids]
+    inside = types >= 0
+
+    prev_types = np.empty(n, dtype=types.dtype)
+    prev_types[:1] = -1
+    prev_types[1:] = types[:-1]
+
+    is_start = inside & (LABEL_IS_BEGIN[label_ids] | (types != prev_types))
+    if row_starts is not None:
+        is_start |= inside & row_starts
+
+    starts = np.flatnonzero(is_start)
+
+    breaks = is_start | ~inside
+    if row_starts is not None:
+        breaks |= row_starts
+    break_positions = np.append(np.flatnonzero(breaks), n)
+    ends = break_positions[np.searchsorted(break_positions, starts, side="right")]
+
+    return starts, ends, types[starts]
+
+
+def decode_spans(
+    text: str,
+    label_ids: Sequence[int] | np.ndarray,
+    starts: Sequence[int] | np.ndarray,
+    ends: Sequence[int] | np.ndarray,
+) -> List[EntitySpan]:
+    """
+    Collapses per-token BIO predictions for one text into character-offset
+    entity spans. starts/ends are the character offsets of each token.
+    """
+    # Explicit dtypes: np.asarray([]) is float64, which cannot index.
+    return decode_batch_spans(
+        [text],
+        np.asarray(label_ids, dtype=np.int64),
+        np.stack(
+            [np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)],
+            axis=-1,
+        ).reshape(-1, 2),
+        np.array([0, len(label_ids)]),
+    )[0]
+
+
+def decode_batch_spans(
+    texts: List[str],
+    label_ids: np.ndarray,
+    offsets: np.ndarray,
+    row_splits: np.ndarray,
+) -> List[List[EntitySpan]]:
+    """
+    Decodes entity spans for a whole batch of rows stored back to back.
+
+    Tokens with empty offsets (special tokens, padding) are treated as O.
+    """
+    label_ids = np.where(
+        offsets[:, 1] > offsets[:, 0], label_ids, ALL_LABELS.index("O")
+    )
+
+    row_starts = np.zeros(len(label_ids), dtype=bool)
+    row_starts[row_splits[:-1][row_splits[:-1] < len(label_ids)]] = True
+
+    starts, ends, type_ids = span_boundaries(label_ids, row_starts)
+    rows = np.searchsorted(row_splits, starts, side="right") - 1
+    char_starts = offsets[starts, 0]
+    char_ends = offsets[ends - 1, 1]
+
+    spans: List[List[EntitySpan]] = [[] for _ in texts]
+    for row, type_id, start, end in zip(
+        rows.tolist(), type_ids.tolist(), char_starts.tolist(), char_ends.tolist()
+    ):
+        spans[row].append(
+            EntitySpan(
+                label=ENTITY_TYPES[type_id],
+                start=start,
+                end=end,
+                text=texts[row][start:end],
+            )
+        )
+
+    return spans
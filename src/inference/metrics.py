@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds, in seconds, of the stage timing histograms.
+SECONDS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+    5.0, 10.0,
+)  # fmt: skip
+
+# Upper bounds, in tokens, of the input length histogram and of the `length`
+# label that per-batch stage timings carry.
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512)
+
+PREFIX = "citation_tagger"
+
+METRIC_HELP = {
+    "stage_seconds": "Time spent in each stage of the inference path.",
+    "sentence_tokens": "Tokens per input sentence, special tokens included.",
+    "sentences_total": "Sentences tagged.",
+    "tokens_total": "Tokens tagged.",
+    "forward_passes_total": "Forward passes run.",
+    "prefiltered_sentences_total": "Sentences the prefilter kept from the model.",
+    "batch_requests": "Requests coalesced into each server micro-batch.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def length_bucket(n_tokens: int) -> str:
+    """The `length` label for an input of n_tokens: its TOKEN_BUCKETS bound."""
+    i = bisect_left(TOKEN_BUCKETS, n_tokens)
+    return str(TOKEN_BUCKETS[i]) if i < len(TOKEN_BUCKETS) else "+Inf"
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # counts[i] is the number of observations in (buckets[i-1], buckets[i]];
+        # the last slot is everything above the largest bound.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs as Prometheus reports them, ending at +Inf."""
+        bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+        total = 0
+        cumulative = []
+        for bound, n in zip(bounds, self.counts):
+            total += n
+            cumulative.append((bound, total))
+        return cumulative
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms for the inference path, exportable as
+    Prometheus text or JSON lines.
+
+        with METRICS.time("forward", length="128"):
+            ...
+        METRICS.inc("sentences_total", len(sentences))
+
+    Thread-safe. Forked TaggerPool workers record into their own copy, which
+    the parent does not see.
+    """
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = SECONDS_BUCKETS,
+        **labels,
+    ):
+        self.observe_many(name, (value,), buckets, **labels)
+
+    def observe_many(
+        self,
+        name: str,
+        values: Sequence[float],
+        buckets: Sequence[float] = SECONDS_BUCKETS,
+        **labels,
+    ):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            for value in values:
+                histogram.observe(value)
+
+    @contextmanager
+    def time(self, stage: str, **labels) -> Iterator[None]:
+        """
+        Records the wall time of the block under stage_seconds. On GPU,
+        kernels run asynchronously, so their time shows up in whichever later
+        stage first waits for a result (the copy back to the CPU).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                "stage_seconds", time.perf_counter() - start, stage=stage, **labels
+            )
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def stage_totals(self) -> Dict[str, Tuple[int, float]]:
+        """(calls, total seconds) per stage, summed over the other labels."""
+        totals: Dict[str, Tuple[int, float]] = {}
+        with self._lock:
+            for (name, labels), h in self._histograms.items():
+                if name != "stage_seconds":
+                    continue
+                stage = dict(labels)["stage"]
+                count, seconds = totals.get(stage, (0, 0.0))
+                totals[stage] = (count + h.count, seconds + h.sum)
+        return totals
+
+    def to_prometheus(self) -> str:
+        """The text exposition format, as served on /metrics."""
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[0])
+
+            seen = set()
+            for (name, labels), value in counters:
+                full = f"{self.prefix}_{name}"
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {full} {METRIC_HELP.get(name, name)}")
+                    lines.append(f"# TYPE {full} counter")
+                lines.append(f"{full}{_format_labels(labels)} {value:g}")
+
+            for (name, labels), h in histograms:
+                full = f"{self.prefix}_{name}"
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {full} {METRIC_HELP.get(name, name)}")
+                    lines.append(f"# TYPE {full} histogram")
+                for le, count in h.cumulative():
+                    bucket_labels = labels + (("le", le),)
+                    lines.append(
+                        f"{full}_bucket{_format_labels(bucket_labels)} {count}"
+                    )
+                lines.append(f"{full}_sum{_format_labels(labels)} {h.sum:g}")
+                lines.append(f"{full}_count{_format_labels(labels)} {h.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self, timestamp: Optional[float] = None) -> str:
+        """One JSON object per series, stamped with the same time."""
+        ts = time.time() if timestamp is None else timestamp
+        records = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                records.append(
+                    {
+                        "ts": ts,
+                        "name": f"{self.prefix}_{name}",
+                        "type": "counter",
+                        "labels": dict(labels),
+                        "value": value,
+                    }
+                )
+            for (name, labels), h in sorted(
+                self._histograms.items(), key=lambda kv: kv[0]
+            ):
+                records.append(
+                    {
+                        "ts": ts,
+                        "name": f"{self.prefix}_{name}",
+                        "type": "histogram",
+                        "labels": dict(labels),
+                        "buckets": dict(h.cumulative()),
+                        "sum": h.sum,
+                        "count": h.count,
+                    }
+                )
+        return "".join(json.dumps(r) + "\n" for r in records)
+
+    def write_json_lines(self, path: Path):
+        """Appends a snapshot, so repeated calls build a time series."""
+        with open(path, "a") as f:
+            f.write(self.to_json_lines())
+
+
+# The registry the tagger, the server and src.training.model record into.
+METRICS = MetricsRegistry()
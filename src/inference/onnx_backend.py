@@ -0,0 +1,103 @@
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+from transformers import PreTrainedModel, PreTrainedTokenizerFast
+from transformers.modeling_outputs import TokenClassifierOutput
+from wasabi import msg
+
+try:
+    import onnxruntime as ort
+except ImportError as e:
+    raise ImportError(
+        "The ONNX backend needs onnx and onnxruntime, from the `onnx` extra: "
+        "pip install 'legal-citation-bert[onnx]'"
+    ) from e
+
+ONNX_MODEL_NAME = "model.onnx"
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def export_onnx(
+    model: PreTrainedModel,
+    tokenizer: PreTrainedTokenizerFast,
+    output_dir: Path,
+    opset: int = 17,
+) -> Path:
+    """
+    Exports the token classifier to ONNX with dynamic batch and sequence axes.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / ONNX_MODEL_NAME
+
+    model = model.to("cpu").eval()  # pyright: ignore
+    dummy = tokenizer(
+        ["Fux, 76 F.3d at 89.", "See 21 U.S.C. § 79."],
+        padding=True,
+        return_tensors="pt",
+    )
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic_axes["logits"] = {0: "batch", 1: "sequence"}
+
+    torch.onnx.export(
+        model,
+        tuple(dummy[name] for name in INPUT_NAMES),
+        str(path),
+        input_names=INPUT_NAMES,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset,
+        dynamo=False,
+    )
+    model.config.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+
+    msg.good(f"Exported ONNX model to {path}")
+    return path
+
+
+class OnnxTokenClassifier:
+    """
+    Runs an exported token classifier through onnxruntime on CPU.
+
+    Quacks like the PyTorch model as far as get_labels and CitationTagger are
+    concerned: .to()/.eval() are no-ops and calling it with tokenizer outputs
+    returns an object with a .logits tensor.
+    """
+
+    # Keeps its predictions apart from the PyTorch model's in the cache.
+    variant = "onnx"
+
+    def __init__(self, path: Path, intra_op_threads: Optional[int] = None):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        # Mirrors PreTrainedModel.name_or_path, e.g. for cache keys.
+        self.name_or_path = str(path)
+        if path.is_dir():
+            path = path / ONNX_MODEL_NAME
+
+        self.session = ort.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def eval(self):
+        return self
+
+    def __call__(self, **inputs) -> TokenClassifierOutput:
+        feed = {
+            k: np.asarray(v.cpu() if isinstance(v, torch.Tensor) else v, dtype=np.int64)
+            for k, v in inputs.items()
+            if k in self.input_names
+        }
+        (logits,) = self.session.run(["logits"], feed)
+        return TokenClassifierOutput(logits=torch.from_numpy(logits))  # pyright: ignore
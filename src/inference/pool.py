@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from wasabi import msg
+
+from src.inference.tagger import CitationTagger
+from src.inference.threads import ThreadConfig, available_cpus, plan_layout
+from src.inference.types import EntitySpan
+
+# The tagger the workers run. Set in the parent right before forking, so each
+# worker inherits it (and the model weights) instead of loading its own copy.
+_worker_tagger: Optional[CitationTagger] = None
+
+
+def _init_worker(configs: List[ThreadConfig], counter):
+    # Workers take configs in start order; a replacement for a worker that
+    # died wraps around to the start of the list.
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    configs[index % len(configs)].apply()
+
+
+def _tag_document(item: Tuple[int, str]) -> Tuple[int, List[EntitySpan]]:
+    index, text = item
+    assert _worker_tagger is not None
+    return index, _worker_tagger.tag_document(text)
+
+
+class TaggerPool:
+    """
+    Runs document-mode tagging over a corpus in forked worker processes.
+
+    The model is loaded once in the parent. Its weights are moved to shared
+    memory (unless they are memory-mapped already) and the workers are forked
+    from the parent, so N workers map the same pages rather than holding N
+    copies of the model. Each worker pins its intra-op thread count so that
+    workers x threads does not oversubscribe the machine; with pin=True each
+    worker is also bound to its own cores, within one NUMA node (see
+    src.inference.threads.plan_layout).
+
+        tagger = CitationTagger.from_checkpoint(device=torch.device("cpu"))
+        with TaggerPool(tagger, n_workers=16) as pool:
+            for i, spans in pool.map(texts, ordered=False):
+                ...
+    """
+
+    def __init__(
+        self,
+        tagger: CitationTagger,
+        n_workers: Optional[int] = None,
+        threads_per_worker: int = 1,
+        chunksize: int = 1,
+        pin: bool = False,
+    ):
+        if tagger.device.type != "cpu":
+            raise ValueError("TaggerPool forks CPU workers; load the tagger on CPU.")
+
+        self.tagger = tagger
+        self.threads_per_worker = threads_per_worker
+        self.n_workers = n_workers or max(
+            1, len(available_cpus()) // threads_per_worker
+        )
+        self.chunksize = chunksize
+        self.thread_configs = (
+            plan_layout(self.n_workers, threads_per_worker)
+            if pin
+            else [ThreadConfig(intra_op_threads=threads_per_worker, inter_op_threads=1)]
+        )
+        self._pool = None
+
+    def __enter__(self) -> TaggerPool:
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        global _worker_tagger
+
+        model = self.tagger.model
+        # Memory-mapped weights are file-backed pages that forked workers
+        # already share; share_memory() would copy them into shared memory.
+        if hasattr(model, "share_memory") and not getattr(
+            model, "memory_mapped", False
+        ):
+            model.share_memory()
+        _worker_tagger = self.tagger
+        # Each worker tokenizes one document at a time; the tokenizer's own
+        # thread pool would only fight the workers (and warns after a fork).
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+        msg.info(
+            f"Forking {self.n_workers} workers with "
+            f"{self.threads_per_worker} thread(s) each"
+        )
+        ctx = multiprocessing.get_context("fork")
+        self._pool = ctx.Pool(
+            self.n_workers,
+            initializer=_init_worker,
+            initargs=(self.thread_configs, ctx.Value("i", 0)),
+        )
+
+    def close(self):
+        global _worker_tagger
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        _worker_tagger = None
+
+    def map(
+        self, texts: Iterable[str], ordered: bool = True
+    ) -> Iterator[Tuple[int, List[EntitySpan]]]:
+        """
+        Streams documents to the workers and yields (index, spans) per
+        document. ordered=False yields each document as soon as it is done,
+        which keeps the workers busy when document lengths vary a lot.
+        """
+        if self._pool is None:
+            raise RuntimeError(
+                "TaggerPool is not started; use it as a context manager."
+            )
+
+        imap = self._pool.imap if ordered else self._pool.imap_unordered
+        return imap(_tag_document, enumerate(texts), chunksize=self.chunksize)
@@ -0,0 +1,94 @@
+import copy
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+import torch
+from wasabi import msg
+
+from src.inference.compare import ComparisonReport, compare_taggers
+from src.inference.tagger import CitationTagger
+
+CPUINFO_PATH = Path("/proc/cpuinfo")
+
+# CPU flags for native bf16 matmuls: AVX512-BF16 (Cooper Lake, Zen 4) and
+# AMX (Sapphire Rapids). Without them bf16 is emulated and slower than fp32.
+BF16_CPU_FLAGS = {"avx512_bf16", "amx_bf16"}
+
+# Share of test-split tokens whose bf16 label must match fp32.
+MIN_BF16_AGREEMENT = 0.999
+
+
+def cpu_flags() -> Set[str]:
+    if not CPUINFO_PATH.exists():
+        return set()
+    for line in CPUINFO_PATH.read_text().splitlines():
+        if line.startswith("flags"):
+            return set(line.split(":", 1)[1].split())
+    return set()
+
+
+def cpu_supports_bf16() -> bool:
+    return bool(cpu_flags() & BF16_CPU_FLAGS)
+
+
+def bf16_tagger(tagger: CitationTagger) -> CitationTagger:
+    """
+    A bf16 copy of a tagger, without its cache; the original keeps its fp32
+    weights.
+    """
+    model = copy.deepcopy(tagger.model)
+    # Casting copies the weights out of a memory-mapped checkpoint.
+    model.memory_mapped = False  # pyright: ignore
+    return CitationTagger(
+        model,
+        tokenizer=tagger.tokenizer,
+        device=tagger.device,
+        segmenter=tagger._segmenter,
+        max_tokens_per_batch=tagger.max_tokens_per_batch,
+        prefilter=tagger.prefilter,
+        dtype=torch.bfloat16,
+    )
+
+
+def enable_bf16(
+    tagger: CitationTagger,
+    sentences: List[str],
+    min_agreement: float = MIN_BF16_AGREEMENT,
+    force: bool = False,
+) -> Tuple[CitationTagger, Optional[ComparisonReport]]:
+    """
+    Switches an fp32 CPU tagger to bf16 if it is worth it and safe: the CPU
+    has native bf16 support (unless force=True), and the bf16 labels agree
+    with fp32 on at least min_agreement of the tokens of `sentences` (the
+    held-out split). Returns the tagger to use, which is the original one if
+    either check fails, and the comparison if one was run.
+    """
+    if tagger.device.type != "cpu":
+        raise ValueError("enable_bf16 is for CPU taggers")
+
+    if not force and not cpu_supports_bf16():
+        msg.warn(
+            "CPU has no native bf16 support "
+            f"({' / '.join(sorted(BF16_CPU_FLAGS))}); staying in fp32"
+        )
+        return tagger, None
+
+    # Both sides run the model on every sentence: cache hits would skew the
+    # timings, and the bf16 side has to be checked on its own predictions.
+    reference = copy.copy(tagger)
+    reference.cache = None
+    candidate = bf16_tagger(tagger)
+    report = compare_taggers(reference, candidate, sentences)
+    if report.agreement < min_agreement:
+        msg.warn(
+            f"bf16 agrees with fp32 on {100 * report.agreement:.3f}% of tokens "
+            f"(< {100 * min_agreement:.3f}%); staying in fp32"
+        )
+        return tagger, report
+
+    msg.good(
+        f"bf16 enabled: {100 * report.agreement:.3f}% token agreement, "
+        f"{report.speedup:.2f}x speedup"
+    )
+    candidate.set_cache(tagger.cache)
+    return candidate, report
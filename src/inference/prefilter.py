@@ -0,0 +1,154 @@
+import re
+from typing import List, Sequence
+
+from pydantic import BaseModel
+
+# Reporter, code and court-rule abbreviations that rarely show up outside a
+# citation. Matched as whole tokens, with or without internal spaces.
+REPORTER_ABBREVIATIONS = [
+    "U.S.",
+    "S. Ct.",
+    "L. Ed.",
+    "F.",
+    "F.2d",
+    "F.3d",
+    "F.4th",
+    "F. Supp.",
+    "F. App'x",
+    "B.R.",
+    "A.2d",
+    "A.3d",
+    "P.2d",
+    "P.3d",
+    "N.E.",
+    "N.W.",
+    "S.E.",
+    "S.W.",
+    "So.",
+    "Cal.",
+    "N.Y.S.",
+    "A.D.",
+    "Misc.",
+    "WL",
+    "LEXIS",
+    "U.S.C.",
+    "C.F.R.",
+    "Stat.",
+    "Fed. R.",
+    "Fed.R.",
+]
+
+KEYWORDS = [
+    "§",
+    "¶",
+    r"\bId\.",
+    r"\bid\.",
+    r"\bIbid\b",
+    r"\bsupra\b",
+    r"\binfra\b",
+    r"\bv\.",
+    r"\bvs\.",
+    r"\bIn re\b",
+    r"\bex rel\.",
+    r"\bVS\.",
+    r"\bRules?\s+\d",
+    r"(?i:\b(?:sub)?sect?(?:ion|\.)\s*\d)",
+    r"\b[Aa]rt(?:icle|\.)\s+[\dIVX]",
+    r"\b[Cc]hapter\s+\d",
+    r"\b[Pp]aragraphs?\s+\d",
+    r"\bORDINANCE\b",
+    r"\bCode\b",
+    r"\bAct\b",
+    r"\bCiv\.",
+    r"\bDkt\.",
+    r"\bNo\.\s+\d",
+    r"\bPage\s+ID\b",
+    r"\bat\s+\*?\d",
+    r"\$\s?\d+-\d",
+    # Statutory section numbers such as "40:55D-15".
+    r"\b\d+:\d+[A-Z]?-\d",
+    # Dotted abbreviations such as "N.J.S.A." or "P.C.".
+    r"\b(?:[A-Z]{1,4}\.\s?){2,}",
+    r"\bConst\.",
+    r"\bAmend(?:ment)?\.?\b",
+    r"\bCir\.",
+    r"\bCt\.",
+    r"\bApp\.",
+    r"\bDist\.",
+    r"\bD\.\s?[A-Z]",
+    r"\b[A-Z]\.\s+\d",
+]
+
+# Volume, reporter, page: "240 U.S. 403", "76 F.3d at 89", "2019 WL 918982".
+VOLUME_REPORTER_PAGE = (
+    r"\b\d{1,4}\s+[A-Z][A-Za-z0-9.' ]{0,24}?\s+(?:at\s+)?\*?\d{1,6}\b"
+)
+
+
+def _abbreviation_pattern(abbreviation: str) -> str:
+    # Let "F. Supp." also match "F.Supp." and "S. Ct." match "S.Ct.".
+    escaped = r"\s?".join(re.escape(part) for part in abbreviation.split(" "))
+    return rf"(?<![A-Za-z]){escaped}(?![A-Za-z])"
+
+
+CITATION_PATTERN = re.compile(
+    "|".join(
+        [_abbreviation_pattern(a) for a in REPORTER_ABBREVIATIONS]
+        + KEYWORDS
+        + [VOLUME_REPORTER_PAGE]
+    )
+)
+
+
+def may_contain_citation(text: str) -> bool:
+    """
+    Cheap check for whether a sentence could contain a citation.
+
+    Tuned for recall rather than precision: a False here means the model is
+    skipped for the sentence, so it must (nearly) never be wrong.
+    """
+    return CITATION_PATTERN.search(text) is not None
+
+
+def flag_candidates(sentences: Sequence[str]) -> List[int]:
+    """Indices of the sentences that should go through the model."""
+    return [i for i, s in enumerate(sentences) if may_contain_citation(s)]
+
+
+class PrefilterReport(BaseModel):
+    n_sentences: int
+    n_with_citations: int
+    n_flagged: int
+    n_missed: int
+    missed: List[str]
+
+    @property
+    def recall(self) -> float:
+        if self.n_with_citations == 0:
+            return 1.0
+        return 1 - self.n_missed / self.n_with_citations
+
+    @property
+    def skip_rate(self) -> float:
+        if self.n_sentences == 0:
+            return 0.0
+        return 1 - self.n_flagged / self.n_sentences
+
+
+def evaluate_prefilter(
+    sentences: Sequence[str], has_citation: Sequence[bool]
+) -> PrefilterReport:
+    """
+    Measures the prefilter against gold labels: how many citation-bearing
+    sentences it would wrongly skip, and how many model calls it saves.
+    """
+    flagged = [may_contain_citation(s) for s in sentences]
+    missed = [s for s, f, h in zip(sentences, flagged, has_citation) if h and not f]
+
+    return PrefilterReport(
+        n_sentences=len(sentences),
+        n_with_citations=sum(has_citation),
+        n_flagged=sum(flagged),
+        n_missed=len(missed),
+        missed=missed,
+    )
@@ -0,0 +1,84 @@
+import io
+from pathlib import Path
+from typing import Optional
+
+import torch
+from transformers import AutoConfig, AutoModelForTokenClassification, PreTrainedModel
+from wasabi import msg
+
+from src.training.constants import ALL_LABELS
+from src.training.model import resolve_checkpoint
+
+QUANTIZED_DIR_NAME = "quantized"
+QUANTIZED_WEIGHTS_NAME = "quantized_model.pt"
+
+
+def quantize_model(model: PreTrainedModel) -> PreTrainedModel:
+    """
+    Applies dynamic int8 quantization to every nn.Linear in the model.
+
+    Weights are stored as int8 and activations are quantized on the fly, so
+    no calibration data is needed. Quantized models only run on CPU.
+    """
+    model = model.to("cpu").eval()  # pyright: ignore
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def save_quantized(model: PreTrainedModel, path: Path):
+    path.mkdir(parents=True, exist_ok=True)
+    model.config.save_pretrained(path)
+    torch.save(model.state_dict(), path / QUANTIZED_WEIGHTS_NAME)
+
+
+def load_quantized(path: Path) -> PreTrainedModel:
+    """
+    Rebuilds the fp32 architecture from the saved config, quantizes it so the
+    module structure matches, then loads the saved int8 weights into it.
+    """
+    config = AutoConfig.from_pretrained(path, num_labels=len(ALL_LABELS))
+    model = quantize_model(AutoModelForTokenClassification.from_config(config))
+
+    # The packed int8 params are saved as quantized tensors, which the
+    # weights-only unpickler accepts: no arbitrary objects are loaded.
+    state_dict = torch.load(
+        path / QUANTIZED_WEIGHTS_NAME, map_location="cpu", weights_only=True
+    )
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+
+def load_quantized_model_from_checkpoint(
+    version: Optional[str] = None,
+) -> PreTrainedModel:
+    """
+    Loads the int8 variant of a checkpoint, quantizing and saving it next to
+    the checkpoint the first time it is asked for.
+    """
+    checkpoint_path = resolve_checkpoint(version)
+    quantized_path = checkpoint_path / QUANTIZED_DIR_NAME
+
+    if (quantized_path / QUANTIZED_WEIGHTS_NAME).exists():
+        return load_quantized(quantized_path)
+
+    msg.info(f"No quantized weights found; quantizing {checkpoint_path}")
+    config = AutoConfig.from_pretrained(checkpoint_path, num_labels=len(ALL_LABELS))
+    model = AutoModelForTokenClassification.from_pretrained(
+        checkpoint_path, config=config
+    )
+    model = quantize_model(model)  # pyright: ignore
+    save_quantized(model, quantized_path)
+    # Identified by its saved weights, like the reloaded copy, rather than
+    # by the fp32 checkpoint's.
+    model.name_or_path = model.config._name_or_path = str(quantized_path)
+    msg.good(f"Saved quantized weights to {quantized_path}")
+
+    return model
+
+
+def model_size_bytes(model: torch.nn.Module) -> int:
+    """Size of the serialized state dict, i.e. what the weights cost in memory."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
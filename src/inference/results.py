@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+from transformers import PreTrainedTokenizerFast
+
+from src.inference.decoding import decode_batch_spans
+from src.inference.metrics import METRICS
+from src.inference.types import EntitySpan
+from src.training.constants import ALL_LABELS
+
+LABEL_ARRAY = np.array(ALL_LABELS)
+
+
+class TaggedBatch:
+    """
+    Token-level predictions for a batch of sequences.
+
+    Rows are stored back to back in flat arrays (no padding); row i occupies
+    [row_splits[i], row_splits[i + 1]). Token strings and label strings are
+    only built when asked for.
+    """
+
+    def __init__(
+        self,
+        texts: List[str],
+        input_ids: np.ndarray,
+        label_ids: np.ndarray,
+        confidences: np.ndarray,
+        offsets: np.ndarray,
+        row_splits: np.ndarray,
+        tokenizer: Optional[PreTrainedTokenizerFast] = None,
+        entropies: Optional[np.ndarray] = None,
+    ):
+        self.texts = texts
+        self.input_ids = input_ids
+        self.label_ids = label_ids
+        self.confidences = confidences
+        self.offsets = offsets
+        self.row_splits = row_splits
+        self.tokenizer = tokenizer
+        # Entropy of each token's label distribution, when the producer had
+        # the full distribution to compute it from.
+        self.entropies = entropies
+
+    @classmethod
+    def empty(cls, tokenizer: Optional[PreTrainedTokenizerFast] = None) -> TaggedBatch:
+        """A batch of no rows, e.g. for a document with no sentences."""
+        return cls(
+            texts=[],
+            input_ids=np.empty(0, dtype=np.int32),
+            label_ids=np.empty(0, dtype=np.int8),
+            confidences=np.empty(0, dtype=np.float32),
+            offsets=np.empty((0, 2), dtype=np.int32),
+            row_splits=np.zeros(1, dtype=np.int64),
+            tokenizer=tokenizer,
+            entropies=np.empty(0, dtype=np.float32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def row(self, i: int) -> slice:
+        return slice(int(self.row_splits[i]), int(self.row_splits[i + 1]))
+
+    def tokens(self, i: int) -> List[str]:
+        if self.tokenizer is None:
+            raise ValueError("TaggedBatch was built without a tokenizer")
+        return self.tokenizer.convert_ids_to_tokens(
+            self.input_ids[self.row(i)].tolist()
+        )
+
+    def labels(self, i: int) -> List[str]:
+        return LABEL_ARRAY[self.label_ids[self.row(i)]].tolist()
+
+    def spans(self, i: int) -> List[EntitySpan]:
+        sl = self.row(i)
+        with METRICS.time("decode"):
+            return decode_batch_spans(
+                [self.texts[i]],
+                self.label_ids[sl],
+                self.offsets[sl],
+                np.array([0, sl.stop - sl.start]),
+            )[0]
+
+    def all_spans(self) -> List[List[EntitySpan]]:
+        """Entity spans for every row, decoded in one vectorized pass."""
+        with METRICS.time("decode"):
+            return decode_batch_spans(
+                self.texts, self.label_ids, self.offsets, self.row_splits
+            )
+
+    def take(self, indices: Sequence[int]) -> TaggedBatch:
+        """
+        Returns a new batch made of the given rows, in the given order.
+        """
+        slices = [self.row(i) for i in indices]
+        lengths = [s.stop - s.start for s in slices]
+        index = (
+            np.concatenate([np.arange(s.start, s.stop) for s in slices])
+            if slices
+            else np.empty(0, dtype=np.int64)
+        )
+
+        return TaggedBatch(
+            texts=[self.texts[i] for i in indices],
+            input_ids=self.input_ids[index],
+            label_ids=self.label_ids[index],
+            confidences=self.confidences[index],
+            offsets=self.offsets[index],
+            row_splits=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            tokenizer=self.tokenizer,
+            entropies=None if self.entropies is None else self.entropies[index],
+        )
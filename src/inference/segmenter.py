@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple, Type
+
+if TYPE_CHECKING:
+    from spacy.language import Language
+
+SPACY_MODEL = "en_core_web_sm"
+
+# Sentence boundaries as (start, end) character offsets into the text.
+Spans = List[Tuple[int, int]]
+
+
+class Segmenter(ABC):
+    """
+    Splits text into sentences. Backends implement spans(); split() returns
+    the corresponding sentence strings.
+    """
+
+    name: str
+
+    @abstractmethod
+    def spans(self, text: str) -> Spans: ...
+
+    def split(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.spans(text)]
+
+
+def _strip(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Narrows a span to exclude leading and trailing whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+class _SpacySegmenter(Segmenter):
+    def __init__(self):
+        self.nlp = self._load()
+
+    @abstractmethod
+    def _load(self) -> Language: ...
+
+    def spans(self, text: str) -> Spans:
+        spans = [_strip(text, s.start_char, s.end_char) for s in self.nlp(text).sents]
+        return [(start, end) for start, end in spans if start < end]
+
+
+class SpacySentencizer(_SpacySegmenter):
+    """spaCy's rule-based sentencizer on a blank English tokenizer."""
+
+    name = "sentencizer"
+
+    def _load(self) -> Language:
+        import spacy
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        return nlp
+
+
+class SpacySenter(_SpacySegmenter):
+    """
+    en_core_web_sm with only its statistical sentence recognizer: the
+    tagger, parser and NER are not even loaded.
+    """
+
+    name = "senter"
+
+    def _load(self) -> Language:
+        import spacy
+
+        nlp = spacy.load(
+            SPACY_MODEL,
+            exclude=["tagger", "parser", "ner", "attribute_ruler", "lemmatizer"],
+        )
+        nlp.enable_pipe("senter")
+        return nlp
+
+
+class SpacyParser(_SpacySegmenter):
+    """
+    The full en_core_web_sm pipeline, sentences from the dependency parse.
+    What split_text has always run, and the reference for benchmarks.
+    """
+
+    name = "parser"
+
+    def _load(self) -> Language:
+        import spacy
+
+        return spacy.load(SPACY_MODEL)
+
+
+# Words that end in a period without ending the sentence, as they appear in
+# case names, reporters, codes and court names.
+ABBREVIATIONS = {
+    "v", "vs", "Inc", "Co", "Corp", "Ltd", "Bros", "Ass'n", "Ins",
+    "Nat'l", "Int'l", "Dep't", "Gov't", "Comm'n", "Sec'y", "Auth", "Dist",
+    "No", "Nos", "Cir", "Ct", "Supp", "App", "Fed", "Cal", "Stat", "Stats",
+    "Civ", "Crim", "Proc", "Evid", "Bankr", "Admin", "Rev", "Ann", "Gen",
+    "Bus", "Prof", "Pen", "Gov", "Ed", "Cong", "Sess", "Pub", "Reg", "Art",
+    "Const", "Amend", "Ch", "ch", "Tit", "tit", "Subd", "subd", "Sec", "sec",
+    "Para", "para", "Cl", "cl", "Pt", "pt", "Rptr", "Mr", "Mrs", "Ms", "Dr",
+    "Jr", "Sr", "St", "Hon", "Mass", "Conn", "Ill", "Wash", "Pa", "Fla", "Ga",
+    "Mich", "Minn", "Tex", "Va", "Wis", "Ariz", "Colo", "Md", "Mo", "Ohio",
+    "Okla", "Or", "Tenn", "Ky", "La", "Ala", "Miss", "Neb", "Nev", "Kan",
+    "Del", "Haw", "Iowa", "Me", "Mont", "Vt", "Wyo", "Cf", "cf", "e.g", "i.e",
+    "al", "Jan", "Feb", "Mar", "Apr", "Jun", "Jul", "Aug", "Sept", "Sep",
+    "Oct", "Nov", "Dec",
+}  # fmt: skip
+
+# A run of terminal punctuation, any closing quotes/brackets, then whitespace.
+CANDIDATE_BOUNDARY = re.compile(r"[.!?]+[\"'”’)\]]*(?=\s)")
+
+# Dotted abbreviations ("U.S.C.", "N.Y.", "F.") and initials.
+DOTTED = re.compile(r"^(?:[A-Za-z]\.)*[A-Za-z]$")
+
+
+class RegexSegmenter(Segmenter):
+    """
+    Citation-aware rule-based segmenter.
+
+    Splits after terminal punctuation followed by whitespace and a capital
+    letter, opening quote or bracket, unless the word before the period is a
+    legal abbreviation ("v.", "Cir.", "Supp."), a dotted abbreviation or an
+    initial ("U.S.C.", "F."), or the next word starts with a digit, a
+    lowercase letter or "§" ("F. 3d", "Id. at 5", "U.S.C. § 1961"). Blank
+    lines always split.
+    """
+
+    name = "regex"
+
+    def spans(self, text: str) -> Spans:
+        cuts = [0]
+        for m in CANDIDATE_BOUNDARY.finditer(text):
+            if self._is_boundary(text, m):
+                cuts.append(m.end())
+        for m in re.finditer(r"\n\s*\n", text):
+            cuts.append(m.start())
+        cuts.append(len(text))
+        cuts = sorted(set(cuts))
+
+        spans = [_strip(text, start, end) for start, end in zip(cuts, cuts[1:])]
+        return [(start, end) for start, end in spans if start < end]
+
+    def _is_boundary(self, text: str, m: re.Match) -> bool:
+        # The next sentence has to start with a capital, possibly quoted.
+        first = text[m.end() :].lstrip().lstrip("\"'“‘([")[:1]
+        if not first.isupper():
+            return False
+
+        if text[m.start()] != ".":
+            return True
+
+        word = re.search(r"\S*$", text[: m.start()]).group()  # pyright: ignore
+        word = word.lstrip("\"'“‘([")
+        if word in ABBREVIATIONS or DOTTED.match(word):
+            return False
+        return True
+
+
+SEGMENTERS: Dict[str, Type[Segmenter]] = {
+    s.name: s for s in (SpacySentencizer, SpacySenter, SpacyParser, RegexSegmenter)
+}
+
+DEFAULT_SEGMENTER = "parser"
+
+
+@lru_cache(maxsize=None)
+def get_segmenter(name: str = DEFAULT_SEGMENTER) -> Segmenter:
+    if name not in SEGMENTERS:
+        raise ValueError(
+            f"Unknown segmenter {name!r}; choose one of {', '.join(SEGMENTERS)}"
+        )
+    return SEGMENTERS[name]()
+
+
+def boundary_agreement(
+    reference: Sequence[Spans], candidate: Sequence[Spans]
+) -> Tuple[float, float, float]:
+    """
+    Precision, recall and F1 of the candidate's sentence boundaries (the end
+    offsets of all but the last sentence of each text) against a reference.
+    """
+    tp = fp = fn = 0
+    for ref, cand in zip(reference, candidate):
+        ref_ends = {end for _, end in ref[:-1]}
+        cand_ends = {end for _, end in cand[:-1]}
+        tp += len(ref_ends & cand_ends)
+        fp += len(cand_ends - ref_ends)
+        fn += len(ref_ends - cand_ends)
+
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+from wasabi import msg
+
+from src.inference.metrics import METRICS
+from src.inference.results import TaggedBatch
+from src.inference.tagger import CitationTagger
+
+MAX_BATCH_SIZE = 32
+MAX_WAIT_MS = 10.0
+MAX_QUEUE_SIZE = 256
+
+# Upper bounds of the requests-per-micro-batch histogram.
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# How long a request handler waits for its batch before giving up.
+REQUEST_TIMEOUT_S = 60.0
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent tagging requests into micro-batches.
+
+    Requests are queued; a single background thread takes the first waiting
+    request, then keeps collecting until the batch holds max_batch_size
+    sentences or max_wait_ms has passed since that first request, and serves
+    them all with one tag_sentences call. The queue is bounded: submit raises
+    queue.Full rather than letting latency grow without limit.
+    """
+
+    def __init__(
+        self,
+        tagger: CitationTagger,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+    ):
+        self.tagger = tagger
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.queue: queue.Queue[Tuple[List[str], Future]] = queue.Queue(max_queue_size)
+        self.n_batches = 0
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def submit(self, sentences: List[str]) -> Future:
+        """
+        Queues one request's sentences. The returned future resolves to a
+        TaggedBatch with one row per sentence.
+        """
+        future: Future = Future()
+        self.queue.put_nowait((sentences, future))
+        return future
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+        try:
+            first = self.queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        requests = [first]
+        n_sentences = len(first[0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+
+        while n_sentences < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            requests.append(request)
+            n_sentences += len(request[0])
+
+        return requests
+
+    def _run(self):
+        while not self._stopped.is_set():
+            requests = self._collect()
+            if not requests:
+                continue
+
+            flat = [s for sentences, _ in requests for s in sentences]
+            METRICS.observe("batch_requests", len(requests), BATCH_SIZE_BUCKETS)
+            try:
+                tagged = self.tagger.tag_sentences(flat)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            self.n_batches += 1
+
+            start = 0
+            for sentences, future in requests:
+                future.set_result(tagged.take(range(start, start + len(sentences))))
+                start += len(sentences)
+
+
+def _response_body(tagged: TaggedBatch) -> dict:
+    return {
+        "sentences": [
+            {"text": text, "spans": [span.model_dump() for span in spans]}
+            for text, spans in zip(tagged.texts, tagged.all_spans())
+        ]
+    }
+
+
+class TaggerRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /tag with {"text": "..."} (split into sentences server-side) or
+    {"sentences": [...]} returns the entity spans of each sentence.
+    GET /health reports queue depth and prediction cache counters, and
+    GET /metrics the per-stage timings in Prometheus text format.
+    """
+
+    server: TaggerServer
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            data = METRICS.to_prometheus().encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        if self.path != "/health":
+            self._send(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+
+        batcher = self.server.batcher
+        health = {
+            "status": "ok",
+            "queue_depth": batcher.queue.qsize(),
+            "max_queue_size": batcher.queue.maxsize,
+            "batches_served": batcher.n_batches,
+        }
+        cache = batcher.tagger.cache
+        if cache is not None:
+            health["cache"] = {
+                **cache.stats.model_dump(),
+                "hit_rate": cache.stats.hit_rate,
+            }
+        self._send(HTTPStatus.OK, health)
+
+    def do_POST(self):
+        if self.path != "/tag":
+            self._send(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length))
+            if "sentences" in body:
+                sentences = [str(s) for s in body["sentences"]]
+            else:
+                sentences = self.server.batcher.tagger.split(str(body["text"]))
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": f"bad request: {e}"})
+            return
+
+        if not sentences:
+            self._send(HTTPStatus.OK, {"sentences": []})
+            return
+
+        try:
+            future = self.server.batcher.submit(sentences)
+        except queue.Full:
+            self._send(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"error": "server busy, retry later"},
+                headers={"Retry-After": "1"},
+            )
+            return
+
+        try:
+            tagged = future.result(timeout=REQUEST_TIMEOUT_S)
+        except TimeoutError:
+            self._send(HTTPStatus.GATEWAY_TIMEOUT, {"error": "timed out"})
+            return
+        except Exception as e:
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+            return
+
+        self._send(HTTPStatus.OK, _response_body(tagged))
+
+    def _send(self, status: HTTPStatus, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # The default handler logs every request to stderr.
+        pass
+
+
+class TaggerServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], batcher: MicroBatcher):
+        super().__init__(address, TaggerRequestHandler)
+        self.batcher = batcher
+
+
+def serve(
+    tagger: CitationTagger,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_batch_size: int = MAX_BATCH_SIZE,
+    max_wait_ms: float = MAX_WAIT_MS,
+    max_queue_size: int = MAX_QUEUE_SIZE,
+):
+    batcher = MicroBatcher(tagger, max_batch_size, max_wait_ms, max_queue_size)
+    batcher.start()
+    server = TaggerServer((host, port), batcher)
+
+    msg.good(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
@@ -0,0 +1,546 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+import torch
+from transformers import (
+    AutoModelForTokenClassification,
+    BatchEncoding,
+    PreTrainedModel,
+    PreTrainedTokenizerFast,
+)
+from wasabi import msg
+
+from src.inference.batching import bucket_by_length, pack_windows
+from src.inference.cache import PredictionCache
+from src.inference.decoding import decode_spans
+from src.inference.metrics import METRICS, TOKEN_BUCKETS, length_bucket
+from src.inference.prefilter import flag_candidates
+from src.inference.quantize import load_quantized_model_from_checkpoint
+from src.inference.results import TaggedBatch
+from src.inference.segmenter import Segmenter, get_segmenter
+from src.inference.types import EntitySpan
+from src.training.constants import LABEL_MAP
+from src.training.model import (
+    checkpoint_id,
+    get_device,
+    get_tokenizer,
+    load_model_from_checkpoint,
+)
+
+# Upper bound on padded tokens (batch size x longest sequence) per forward pass.
+MAX_TOKENS_PER_BATCH = 4096
+
+# Tokens shared between consecutive windows in document mode.
+DOCUMENT_STRIDE = 128
+
+
+def model_variant(model) -> Optional[str]:
+    """
+    What sets a model apart from the plain fp32 weights its name_or_path
+    points at: another backend (e.g. "onnx") or int8 quantization. Such
+    variants predict slightly differently, so they get their own cache keys.
+    """
+    variant = getattr(model, "variant", None)
+    if variant is not None:
+        return variant
+    if any(
+        isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in model.modules()
+    ):
+        return "int8"
+    return None
+
+
+class CitationTagger:
+    """
+    Long-lived inference engine.
+
+    Owns the tokenizer, the model (already moved to its device and put in eval
+    mode) and the sentence segmenter, so that a worker pays the load cost once
+    and every subsequent call only pays for tokenization and the forward pass.
+    """
+
+    model: PreTrainedModel
+    tokenizer: PreTrainedTokenizerFast
+    device: torch.device
+
+    def __init__(
+        self,
+        model: PreTrainedModel,
+        tokenizer: Optional[PreTrainedTokenizerFast] = None,
+        device: Optional[torch.device] = None,
+        segmenter: Optional[Segmenter] = None,
+        max_tokens_per_batch: int = MAX_TOKENS_PER_BATCH,
+        prefilter: bool = False,
+        cache: Optional[PredictionCache] = None,
+        dtype: Optional[torch.dtype] = None,
+    ):
+        """
+        dtype=torch.bfloat16 casts the weights and runs the forward pass under
+        autocast; see src.inference.precision.enable_bf16, which only does so
+        after checking the labels against fp32.
+
+        prefilter=True skips the forward pass for sentences that the regex
+        prefilter (src.inference.prefilter) finds no sign of a citation in;
+        those sentences come back labelled all-O with confidence 1.
+
+        With a cache, sentences seen before (by this checkpoint) are served
+        from it, and repeats within one call only go through the model once.
+        The cache is bound to the model's checkpoint id here.
+        """
+        self.device = device or get_device()
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.prefilter = prefilter
+        self.tokenizer = tokenizer or get_tokenizer()
+        self._segmenter = segmenter
+
+        self.dtype = dtype
+        self.model = model.to(self.device, dtype=dtype)  # pyright: ignore
+        self.model.eval()
+        self.set_cache(cache)
+
+    def set_cache(self, cache: Optional[PredictionCache]):
+        self.cache = cache
+        if cache is not None:
+            # Predictions differ slightly between backends and precisions.
+            variant = model_variant(self.model)
+            key = checkpoint_id(self.model.name_or_path)
+            for suffix in (variant, self.dtype):
+                if suffix is not None:
+                    key += f":{suffix}"
+            cache.bind(key)
+
+    @classmethod
+    def from_checkpoint(
+        cls, version: Optional[str] = None, quantized: bool = False, **kwargs
+    ) -> CitationTagger:
+        """
+        quantized=True loads the dynamic int8 variant of the checkpoint, which
+        only runs on CPU.
+        """
+        if quantized:
+            model = load_quantized_model_from_checkpoint(version)
+            kwargs["device"] = torch.device("cpu")
+        else:
+            model = load_model_from_checkpoint(version)
+        return cls(model, **kwargs)  # pyright: ignore
+
+    @classmethod
+    def from_pretrained(cls, name_or_path: str, **kwargs) -> CitationTagger:
+        msg.info(f"Loading model from {name_or_path}")
+        model = AutoModelForTokenClassification.from_pretrained(name_or_path)
+        return cls(model, **kwargs)  # pyright: ignore
+
+    @property
+    def segmenter(self) -> Segmenter:
+        # Loaded on first use; document mode never needs it.
+        if self._segmenter is None:
+            self._segmenter = get_segmenter()
+        return self._segmenter
+
+    def split(self, text: str) -> List[str]:
+        with METRICS.time("split"):
+            return self.segmenter.split(text)
+
+    def tag_sentence(self, sentence: str) -> TaggedBatch:
+        return self.tag_sentences([sentence])
+
+    def tag_sentences(self, sentences: List[str]) -> TaggedBatch:
+        """
+        Tags a list of sentences with as few forward passes as possible.
+
+        Sentences are bucketed by token length, each bucket is padded only to
+        its own longest sentence, and rows come back in the original order.
+        """
+        if not sentences:
+            return TaggedBatch.empty(self.tokenizer)
+
+        with METRICS.time("tokenize"):
+            encoding = self.tokenizer(
+                sentences, truncation=True, return_offsets_mapping=True
+            )
+        lengths = [len(ids) for ids in encoding["input_ids"]]  # pyright: ignore
+        METRICS.inc("sentences_total", len(sentences))
+        METRICS.inc("tokens_total", sum(lengths))
+        METRICS.observe_many("sentence_tokens", lengths, TOKEN_BUCKETS)
+        row_splits = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+        # Rows skipped by the prefilter stay O, with full confidence.
+        label_ids = np.full(row_splits[-1], LABEL_MAP["O"], dtype=np.int8)
+        confidences = np.ones(row_splits[-1], dtype=np.float32)
+        entropies = np.zeros(row_splits[-1], dtype=np.float32)
+        outputs = (label_ids, confidences, entropies)
+
+        if self.prefilter:
+            with METRICS.time("prefilter"):
+                flagged = flag_candidates(sentences)
+            METRICS.inc("prefiltered_sentences_total", len(sentences) - len(flagged))
+        else:
+            flagged = list(range(len(sentences)))
+
+        if self.cache is not None:
+            with METRICS.time("cache"):
+                flagged, keys, repeats = self._read_cache(
+                    sentences, flagged, lengths, row_splits, outputs
+                )
+
+        buckets = bucket_by_length(
+            [lengths[i] for i in flagged], self.max_tokens_per_batch
+        )
+        for bucket in ([flagged[j] for j in b] for b in buckets):
+            with METRICS.time("collate"):
+                batch = self._collate(encoding, bucket, lengths)
+            predicted = self._predict(batch)
+
+            for row, i in enumerate(bucket):
+                sl = _row(row_splits, i)
+                for out, values in zip(outputs, predicted):
+                    out[sl] = values[row, : lengths[i]]
+
+        if self.cache is not None:
+            self.cache.put_many(
+                (keys[i], tuple(out[_row(row_splits, i)] for out in outputs))
+                for i in flagged
+            )
+            for i, first in repeats:
+                for out in outputs:
+                    out[_row(row_splits, i)] = out[_row(row_splits, first)]
+
+        flat = [x for ids in encoding["input_ids"] for x in ids]  # pyright: ignore
+        offsets = [o for row in encoding["offset_mapping"] for o in row]  # pyright: ignore
+
+        return TaggedBatch(
+            texts=sentences,
+            input_ids=np.array(flat, dtype=np.int32),
+            label_ids=label_ids,
+            confidences=confidences,
+            offsets=np.array(offsets, dtype=np.int32).reshape(-1, 2),
+            row_splits=row_splits,
+            tokenizer=self.tokenizer,
+            entropies=entropies,
+        )
+
+    def _read_cache(
+        self,
+        sentences: List[str],
+        flagged: List[int],
+        lengths: List[int],
+        row_splits: np.ndarray,
+        outputs: tuple[np.ndarray, ...],
+    ) -> tuple[List[int], dict[int, str], List[tuple[int, int]]]:
+        """
+        Fills in cached rows and returns what still has to be predicted: the
+        first occurrence of each uncached sentence, the cache key of each of
+        those rows, and (row, first occurrence) pairs for the repeats.
+        """
+        assert self.cache is not None
+        keys = {i: self.cache.key(sentences[i]) for i in flagged}
+        cached = self.cache.get_many([keys[i] for i in flagged])
+
+        misses: List[int] = []
+        repeats: List[tuple[int, int]] = []
+        first_by_key: dict[str, int] = {}
+        for i, hit in zip(flagged, cached):
+            # Normalization only touches whitespace, which the tokenizer
+            # ignores, but check the token count before trusting an entry.
+            if hit is not None and len(hit[0]) == lengths[i]:
+                for out, values in zip(outputs, hit):
+                    out[_row(row_splits, i)] = values
+            elif keys[i] in first_by_key:
+                repeats.append((i, first_by_key[keys[i]]))
+            else:
+                first_by_key[keys[i]] = i
+                misses.append(i)
+
+        return misses, keys, repeats
+
+    def _collate(
+        self, encoding: BatchEncoding, bucket: List[int], lengths: List[int]
+    ) -> dict[str, torch.Tensor]:
+        """
+        Pads the rows of one bucket to the bucket's longest row.
+        """
+        width = max(lengths[i] for i in bucket)
+        batch = {
+            k: torch.full(
+                (len(bucket), width),
+                self.tokenizer.pad_token_id if k == "input_ids" else 0,  # pyright: ignore
+                dtype=torch.long,
+            )
+            for k in self.tokenizer.model_input_names
+            if k in encoding
+        }
+
+        for row, i in enumerate(bucket):
+            for k, v in batch.items():
+                v[row, : lengths[i]] = torch.tensor(encoding[k][i])
+
+        return batch
+
+    def _predict(
+        self, batch: dict[str, torch.Tensor]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the argmax label ids, their softmax probabilities and the
+        entropy (in nats) of each token's label distribution.
+        """
+        length = length_bucket(batch["input_ids"].shape[1])
+        METRICS.inc("forward_passes_total")
+
+        with METRICS.time("transfer", length=length):
+            inputs = {k: v.to(self.device) for k, v in batch.items()}
+        autocast = torch.autocast(
+            self.device.type, dtype=self.dtype, enabled=self.dtype is not None
+        )
+
+        with torch.inference_mode():
+            with METRICS.time("forward", length=length), autocast:
+                logits = self.model(**inputs).logits
+            with METRICS.time("argmax", length=length):
+                logits = logits.float()
+                probs = torch.softmax(logits, dim=-1)
+                scores, predictions = probs.max(dim=-1)
+                entropies = -(probs * torch.log_softmax(logits, dim=-1)).sum(dim=-1)
+                # Copying back waits for the device, so this includes any
+                # forward pass work still queued on a GPU.
+                result = (
+                    predictions.cpu().numpy(),
+                    scores.cpu().numpy(),
+                    entropies.cpu().numpy(),
+                )
+
+        return result
+
+    def tag(self, text: str, pack: bool = False) -> TaggedBatch:
+        """
+        Splits a document into sentences and tags them in batches.
+
+        pack=True runs the sentences packed into shared windows instead of
+        one sequence each; see tag_packed.
+        """
+        if pack:
+            return self.tag_packed([text])[0]
+        return self.tag_sentences(self.split(text))
+
+    def tag_many(self, texts: Iterable[str], pack: bool = False) -> List[TaggedBatch]:
+        """
+        Tags several documents, batching sentences across document boundaries.
+        """
+        if pack:
+            return self.tag_packed(list(texts))
+
+        sentences_per_text = [self.split(t) for t in texts]
+        flat = [s for sentences in sentences_per_text for s in sentences]
+        tagged = self.tag_sentences(flat)
+
+        results: List[TaggedBatch] = []
+        start = 0
+        for sentences in sentences_per_text:
+            results.append(tagged.take(range(start, start + len(sentences))))
+            start += len(sentences)
+
+        return results
+
+    def tag_packed(
+        self, texts: List[str], max_length: Optional[int] = None
+    ) -> List[TaggedBatch]:
+        """
+        Tags documents sentence by sentence, packing consecutive sentences of
+        a document into shared windows of up to max_length tokens.
+
+        Each document is tokenized once; its tokens are assigned to sentences
+        by character offset, consecutive sentences are packed greedily (see
+        pack_windows) and each window gets a single [CLS]/[SEP] pair. Windows
+        from all documents are bucketed and run together, and predictions are
+        split back to the sentences, so the result has one row per sentence
+        like tag(), minus the special tokens. A sentence longer than a window
+        is cut across windows rather than truncated.
+
+        Labels can differ slightly from tag() because each sentence sees its
+        neighbours as context. Skipped by the prefilter means labelled O, as
+        in tag_sentences; the prediction cache is not used, since a sentence's
+        labels now depend on its window.
+        """
+        budget = (max_length or self.tokenizer.model_max_length) - 2
+        documents = [self._pack_document(text, budget) for text in texts]
+
+        windows = [
+            (d, start, end)
+            for d, doc in enumerate(documents)
+            for start, end in doc.windows
+        ]
+        lengths = [end - start + 2 for _, start, end in windows]
+        encoding = {
+            "input_ids": [
+                [self.tokenizer.cls_token_id]
+                + documents[d].input_ids[start:end].tolist()
+                + [self.tokenizer.sep_token_id]
+                for d, start, end in windows
+            ],
+            "attention_mask": [[1] * n for n in lengths],
+            "token_type_ids": [[0] * n for n in lengths],
+        }
+
+        for bucket in bucket_by_length(lengths, self.max_tokens_per_batch):
+            predicted = self._predict(
+                self._collate(encoding, bucket, lengths)  # pyright: ignore
+            )
+            for row, w in enumerate(bucket):
+                d, start, end = windows[w]
+                for out, values in zip(documents[d].outputs, predicted):
+                    out[start:end] = values[row, 1 : end - start + 1]
+
+        return [doc.result(self.tokenizer) for doc in documents]
+
+    def _pack_document(self, text: str, budget: int) -> _PackedDocument:
+        with METRICS.time("split"):
+            spans = self.segmenter.spans(text)
+        with METRICS.time("tokenize"):
+            encoding = self.tokenizer(
+                text,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                verbose=False,
+            )
+        doc = _PackedDocument(
+            text,
+            spans,
+            np.array(encoding["input_ids"], dtype=np.int32),
+            np.array(encoding["offset_mapping"], dtype=np.int32).reshape(-1, 2),
+        )
+
+        sentences = [text[start:end] for start, end in spans]
+        flagged = set(
+            flag_candidates(sentences) if self.prefilter else range(len(spans))
+        )
+
+        # Pack each run of consecutive flagged sentences separately, so that
+        # a window is always one contiguous range of the document's tokens.
+        counts = np.diff(doc.row_splits)
+        run: List[int] = []
+        for i in range(len(spans) + 1):
+            if i < len(spans) and i in flagged:
+                run.append(i)
+                continue
+            if run:
+                offset = int(doc.row_splits[run[0]])
+                for start, end in pack_windows(counts[run].tolist(), budget):
+                    doc.windows.append((offset + start, offset + end))
+                run = []
+
+        return doc
+
+    def tag_document(
+        self,
+        text: str,
+        stride: int = DOCUMENT_STRIDE,
+        max_length: Optional[int] = None,
+    ) -> List[EntitySpan]:
+        """
+        Tags a whole document without sentence splitting or truncation.
+
+        The document is tokenized once into overlapping windows of max_length
+        tokens sharing `stride` tokens with their neighbour. All windows are
+        run as one batch (split only if it exceeds max_tokens_per_batch), and
+        where windows overlap each token keeps the prediction from the window
+        in which it sits furthest from the edge, i.e. with the most context.
+        """
+        with METRICS.time("tokenize"):
+            encoding = self.tokenizer(
+                text,
+                truncation=True,
+                max_length=max_length or self.tokenizer.model_max_length,
+                stride=stride,
+                return_overflowing_tokens=True,
+                return_offsets_mapping=True,
+                padding=True,
+                return_tensors="pt",
+            )
+        offsets = encoding.pop("offset_mapping").numpy()
+        encoding.pop("overflow_to_sample_mapping", None)
+
+        n_windows, width = encoding["input_ids"].shape
+        predictions = np.empty((n_windows, width), dtype=np.int64)
+        for bucket in bucket_by_length([width] * n_windows, self.max_tokens_per_batch):
+            batch = {k: v[bucket] for k, v in encoding.items()}
+            predictions[bucket] = self._predict(batch)[0]
+
+        with METRICS.time("decode"):
+            return self._merge_windows(text, predictions, offsets)
+
+    def _merge_windows(
+        self, text: str, predictions: np.ndarray, offsets: np.ndarray
+    ) -> List[EntitySpan]:
+        # Special and padding tokens have empty offsets.
+        is_content = offsets[:, :, 1] > offsets[:, :, 0]
+        position = np.cumsum(is_content, axis=1) - 1
+        n_content = is_content.sum(axis=1, keepdims=True)
+        context = np.minimum(position, n_content - 1 - position)
+
+        rows, cols = np.nonzero(is_content)
+        starts = offsets[rows, cols, 0]
+        order = np.lexsort((-context[rows, cols], starts))
+        _, first = np.unique(starts[order], return_index=True)
+        keep = order[first]
+
+        return decode_spans(
+            text,
+            predictions[rows[keep], cols[keep]].tolist(),
+            starts[keep].tolist(),
+            offsets[rows[keep], cols[keep], 1].tolist(),
+        )
+
+
+class _PackedDocument:
+    """
+    A document's tokens grouped by sentence, and the windows they are run in.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        spans: List[tuple[int, int]],
+        input_ids: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.text = text
+        self.spans = spans
+
+        # Assign each token to the sentence containing its first character;
+        # tokens outside every sentence (there should be none) are dropped.
+        starts = np.array([s for s, _ in spans], dtype=np.int64)
+        ends = np.array([e for _, e in spans], dtype=np.int64)
+        sentence = np.searchsorted(starts, offsets[:, 0], side="right") - 1
+        inside = sentence >= 0
+        inside[inside] &= offsets[inside, 0] < ends[sentence[inside]]
+
+        self.sentence = sentence[inside]
+        self.input_ids = input_ids[inside]
+        self.offsets = offsets[inside]
+        self.row_splits = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.sentence, minlength=len(spans)))]
+        ).astype(np.int64)
+
+        self.label_ids = np.full(len(self.input_ids), LABEL_MAP["O"], dtype=np.int8)
+        self.confidences = np.ones(len(self.input_ids), dtype=np.float32)
+        self.entropies = np.zeros(len(self.input_ids), dtype=np.float32)
+        self.outputs = (self.label_ids, self.confidences, self.entropies)
+        self.windows: List[tuple[int, int]] = []
+
+    def result(self, tokenizer: PreTrainedTokenizerFast) -> TaggedBatch:
+        sentence_starts = np.array([s for s, _ in self.spans], dtype=np.int32)
+        return TaggedBatch(
+            texts=[self.text[start:end] for start, end in self.spans],
+            input_ids=self.input_ids,
+            label_ids=self.label_ids,
+            confidences=self.confidences,
+            offsets=self.offsets - sentence_starts[self.sentence][:, None],
+            row_splits=self.row_splits,
+            tokenizer=tokenizer,
+            entropies=self.entropies,
+        )
+
+
+def _row(row_splits: np.ndarray, i: int) -> slice:
+    return slice(int(row_splits[i]), int(row_splits[i + 1]))
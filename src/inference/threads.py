@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import torch
+from pydantic import BaseModel
+from wasabi import msg
+
+NODE_DIR = Path("/sys/devices/system/node")
+
+
+class ThreadConfig(BaseModel):
+    """
+    CPU threading for one inference process: intra-op threads (the ones a
+    single matmul is split across), inter-op threads, and the cores the
+    process is pinned to. None leaves torch's or the OS's default.
+    """
+
+    intra_op_threads: Optional[int] = None
+    inter_op_threads: Optional[int] = None
+    cpus: Optional[List[int]] = None
+
+    def apply(self):
+        if self.cpus is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cpus)
+        if self.intra_op_threads is not None:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads is not None:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError:
+                # Only settable before the first parallel op in the process
+                # (including one run by the parent before a fork). Inference
+                # does not use the inter-op pool, so this is not fatal.
+                msg.warn("Inter-op threads already started; leaving them as is")
+
+
+def available_cpus() -> List[int]:
+    """The cores this process may run on (respects cgroups and taskset)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpulist(cpulist: str) -> List[int]:
+    """Parses the kernel's cpulist format, e.g. "0-3,8-11,16"."""
+    cpus = []
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def numa_nodes() -> List[List[int]]:
+    """
+    The available cores grouped by NUMA node, from sysfs. Machines without
+    NUMA information (or other OSes) are treated as a single node.
+    """
+    available = set(available_cpus())
+    nodes = []
+    for cpulist in sorted(NODE_DIR.glob("node[0-9]*/cpulist")):
+        cpus = [c for c in parse_cpulist(cpulist.read_text()) if c in available]
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(available)]
+
+
+def plan_layout(
+    n_workers: int,
+    threads_per_worker: int,
+    nodes: Optional[List[List[int]]] = None,
+) -> List[ThreadConfig]:
+    """
+    Pins n_workers workers to threads_per_worker cores each. Each worker
+    goes to the NUMA node with the most free cores, so workers spread evenly
+    over the sockets and a worker's threads share one memory controller and
+    last-level cache. Raises ValueError if a worker does not fit on any node.
+    """
+    nodes = nodes or numa_nodes()
+    free = [list(cpus) for cpus in nodes]
+    configs = []
+    for _ in range(n_workers):
+        node = max(free, key=len)
+        if len(node) < threads_per_worker:
+            raise ValueError(
+                f"{n_workers} workers x {threads_per_worker} threads does not fit "
+                f"on NUMA nodes of {', '.join(str(len(n)) for n in nodes)} cores"
+            )
+        cpus = node[:threads_per_worker]
+        del node[:threads_per_worker]
+        configs.append(
+            ThreadConfig(
+                intra_op_threads=threads_per_worker, inter_op_threads=1, cpus=cpus
+            )
+        )
+    return configs
+
+
+def candidate_layouts(n_cpus: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    (workers, threads per worker) pairs that use every core exactly once,
+    one per divisor of the core count: for 6 cores, 6x1, 3x2, 2x3 and 1x6.
+    """
+    n_cpus = n_cpus or len(available_cpus())
+    return [
+        (n_cpus // threads, threads)
+        for threads in range(1, n_cpus + 1)
+        if n_cpus % threads == 0
+    ]
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class EntitySpan(BaseModel):
+    """
+    A labelled entity located by character offsets in the source text.
+    """
+
+    label: str
+    start: int
+    end: int
+    text: str
@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+import pytest
+import torch
+import transformers
+
+from src.inference.segmenter import RegexSegmenter
+from src.inference.tagger import CitationTagger
+from src.training.constants import ALL_LABELS
+
+CANDIDATE_PATH = (
+    Path(__file__).resolve().parent.parent.parent
+    / "prepared_data"
+    / "v1"
+    / "candidate.jsonl"
+)
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+@pytest.fixture(scope="session")
+def candidate_rows():
+    with open(CANDIDATE_PATH) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture(scope="session")
+def tokenizer(candidate_rows, tmp_path_factory):
+    # The candidate rows carry the base model's wordpieces, which is enough
+    # vocabulary to tokenize them without downloading anything.
+    vocab = set(t for row in candidate_rows for t in row["tokens"]) - set(
+        SPECIAL_TOKENS
+    )
+    vocab_file = tmp_path_factory.mktemp("vocab") / "vocab.txt"
+    vocab_file.write_text("\n".join(SPECIAL_TOKENS + sorted(vocab)) + "\n")
+
+    return transformers.BertTokenizerFast(
+        str(vocab_file), do_lower_case=False, model_max_length=512
+    )
+
+
+@pytest.fixture(scope="session")
+def model(tokenizer):
+    # A tiny randomly initialised BERT: enough to exercise the inference code
+    # paths, not to produce meaningful labels.
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=128,
+        num_labels=len(ALL_LABELS),
+    )
+    return transformers.BertForTokenClassification(config).eval()
+
+
+@pytest.fixture
+def make_tagger(tokenizer, model):
+    """
+    Builds CitationTaggers on the tiny model, on CPU and with the regex
+    segmenter (no spaCy model needed). Keyword arguments override those,
+    e.g. make_tagger(cache=PredictionCache()) or make_tagger(model=other).
+    """
+
+    def make(**kwargs) -> CitationTagger:
+        kwargs = {
+            "model": model,
+            "tokenizer": tokenizer,
+            "device": torch.device("cpu"),
+            "segmenter": RegexSegmenter(),
+            **kwargs,
+        }
+        return CitationTagger(**kwargs)
+
+    return make
+
+
+@pytest.fixture
+def tagger(make_tagger) -> CitationTagger:
+    return make_tagger()
@@ -0,0 +1,110 @@
+from typing import List, Tuple
+
+from src.inference.assembly import assemble_citations
+from src.inference.types import EntitySpan
+
+
+def _spans(text: str, labelled: List[Tuple[str, str]]) -> List[EntitySpan]:
+    """Locates each (label, text) pair in order in the document."""
+    spans = []
+    position = 0
+    for label, fragment in labelled:
+        start = text.index(fragment, position)
+        end = start + len(fragment)
+        spans.append(EntitySpan(label=label, start=start, end=end, text=fragment))
+        position = end
+    return spans
+
+
+def test_resolves_short_forms_id_and_supra():
+    text = (
+        "Gonzalez v. City of Anaheim, 747 F.3d 789, 795 (9th Cir. 2014). "
+        "See 18 U.S.C. § 1961(1). Gonzalez, 747 F.3d at 796. Id. at 797. "
+        "Gonzalez, supra, at 798."
+    )
+    spans = _spans(
+        text,
+        [
+            ("CASE_NAME", "Gonzalez v. City of Anaheim"),
+            ("VOLUME", "747"),
+            ("REPORTER", "F.3d"),
+            ("PAGE", "789"),
+            ("PIN", "795"),
+            ("COURT", "9th Cir."),
+            ("YEAR", "2014"),
+            ("TITLE", "18"),
+            ("CODE", "U.S.C."),
+            ("SECTION", "1961(1)"),
+            ("CASE_NAME", "Gonzalez"),
+            ("VOLUME", "747"),
+            ("REPORTER", "F.3d"),
+            ("PIN", "796"),
+            ("ID", "Id."),
+            ("PIN", "797"),
+            ("CASE_NAME", "Gonzalez"),
+            ("SUPRA", "supra"),
+            ("PIN", "798"),
+        ],
+    )
+
+    authorities = assemble_citations(spans)
+
+    assert authorities.unresolved == []
+    ((case, case_refs),) = authorities.caselaw.items()
+    assert case.full_text == (
+        "Gonzalez v. City of Anaheim, 747 F.3d 789, 795 (9th Cir. 2014)"
+    )
+    assert [(r.form, r.pin) for r in case_refs] == [
+        ("full", "795"),
+        ("short", "796"),
+        ("id", "797"),
+        ("supra", "798"),
+    ]
+
+    ((statute, statute_refs),) = authorities.statutes.items()
+    assert statute.full_text == "18 U.S.C. § 1961(1)"
+    assert len(statute_refs) == 1
+
+
+def test_id_after_statute_and_unresolved_short_form():
+    text = "Fux, 76 F.3d at 89. 21 U.S.C. § 79. Id."
+    spans = _spans(
+        text,
+        [
+            ("CASE_NAME", "Fux"),
+            ("VOLUME", "76"),
+            ("REPORTER", "F.3d"),
+            ("PIN", "89"),
+            ("TITLE", "21"),
+            ("CODE", "U.S.C."),
+            ("SECTION", "79"),
+            ("ID", "Id."),
+        ],
+    )
+
+    authorities = assemble_citations(spans)
+
+    assert [r.form for r in authorities.unresolved] == ["short"]
+    ((statute, refs),) = authorities.statutes.items()
+    assert statute.section == "79"
+    assert [r.form for r in refs] == ["full", "id"]
+
+
+def test_multiple_sections_share_title_and_code():
+    text = "18 U.S.C. §§ 1961, 1962"
+    spans = _spans(
+        text,
+        [
+            ("TITLE", "18"),
+            ("CODE", "U.S.C."),
+            ("SECTION", "1961"),
+            ("SECTION", "1962"),
+        ],
+    )
+
+    authorities = assemble_citations(spans)
+
+    assert sorted(s.full_text for s in authorities.statutes) == [
+        "18 U.S.C. § 1961",
+        "18 U.S.C. § 1962",
+    ]
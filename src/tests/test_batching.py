@@ -0,0 +1,40 @@
+import pytest
+
+from src.inference.batching import bucket_by_length, pack_windows
+
+
+@pytest.mark.parametrize(
+    ["lengths", "max_tokens", "expected"],
+    [
+        ([], 100, []),
+        ([5, 3, 4], 100, [[1, 2, 0]]),
+        ([10, 2, 9, 3], 20, [[1, 3], [2, 0]]),
+        # An item over the budget still gets scheduled, on its own.
+        ([50, 2], 20, [[1], [0]]),
+    ],
+)
+def test_bucket_by_length(lengths, max_tokens, expected):
+    assert bucket_by_length(lengths, max_tokens) == expected
+
+
+def test_buckets_respect_budget():
+    lengths = [7, 31, 12, 12, 5, 64, 40, 3, 3, 18]
+    buckets = bucket_by_length(lengths, 64)
+
+    assert sorted(i for b in buckets for i in b) == list(range(len(lengths)))
+    for b in buckets:
+        assert len(b) == 1 or len(b) * max(lengths[i] for i in b) <= 64
+
+
+@pytest.mark.parametrize(
+    ["lengths", "budget", "expected"],
+    [
+        ([], 10, []),
+        ([3, 4, 2], 10, [(0, 9)]),
+        ([6, 5, 4], 10, [(0, 6), (6, 15)]),
+        # An item over the budget is cut; its tail packs with what follows.
+        ([2, 23, 3], 10, [(0, 2), (2, 12), (12, 22), (22, 28)]),
+    ],
+)
+def test_pack_windows(lengths, budget, expected):
+    assert pack_windows(lengths, budget) == expected
@@ -0,0 +1,93 @@
+import copy
+
+import numpy as np
+import pytest
+
+from src.inference.cache import PredictionCache, normalize_sentence
+
+
+def _prediction(n: int, label: int = 0):
+    return (
+        np.full(n, label, dtype=np.int8),
+        np.ones(n, dtype=np.float32),
+        np.zeros(n, dtype=np.float32),
+    )
+
+
+@pytest.mark.parametrize(
+    ["a", "b"],
+    [
+        ("See Rule 12(b)(6).", "See  Rule 12(b)(6).\n"),
+        ("\tFux v. Hock, 1 U.S. 2", "Fux v. Hock,\n1 U.S. 2"),
+    ],
+)
+def test_whitespace_variants_share_a_key(a: str, b: str):
+    cache = PredictionCache()
+    cache.bind("v1/checkpoint-1")
+    assert normalize_sentence(a) == normalize_sentence(b)
+    assert cache.key(a) == cache.key(b)
+
+
+def test_lru_evicts_by_size():
+    # Each entry is 10 int8 labels + 2 x 10 float32 = 90 bytes.
+    cache = PredictionCache(max_bytes=200)
+    cache.bind("v1/checkpoint-1")
+    keys = [cache.key(f"sentence {i}") for i in range(3)]
+
+    cache.put_many([(keys[0], _prediction(10)), (keys[1], _prediction(10))])
+    cache.get_many([keys[0]])  # keys[1] is now least recently used
+    cache.put_many([(keys[2], _prediction(10))])
+
+    assert [r is not None for r in cache.get_many(keys)] == [True, False, True]
+    assert cache.stats.evictions == 1
+    assert cache.size <= 200
+
+
+def test_disk_tier_survives_restart_and_drops_old_checkpoints(tmp_path):
+    path = tmp_path / "cache.sqlite"
+
+    cache = PredictionCache(path=path)
+    cache.bind("v1/checkpoint-1")
+    key = cache.key("Id. at 460.")
+    cache.put_many([(key, _prediction(5, label=3))])
+
+    reopened = PredictionCache(path=path)
+    reopened.bind("v1/checkpoint-1")
+    (hit,) = reopened.get_many([key])
+    assert hit is not None and hit[0].tolist() == [3] * 5
+    assert reopened.stats.disk_hits == 1
+
+    reopened.bind("v2/checkpoint-9")
+    assert reopened.key("Id. at 460.") != key
+    assert reopened.get_many([key]) == [None]
+
+
+def test_tagger_serves_repeats_from_cache(candidate_rows, make_tagger):
+    sentences = [row["text"] for row in candidate_rows[:8]]
+    batch = sentences + sentences[:4]
+
+    plain = make_tagger()
+    cache = PredictionCache()
+    cached = make_tagger(cache=cache)
+
+    expected = plain.tag_sentences(batch)
+    first = cached.tag_sentences(batch)
+    second = cached.tag_sentences(batch)
+
+    for result in (first, second):
+        assert (result.label_ids == expected.label_ids).all()
+        assert np.allclose(result.confidences, expected.confidences, atol=1e-6)
+        assert np.allclose(result.entropies, expected.entropies, atol=1e-6)
+    assert cache.stats.misses == len(batch)
+    assert cache.stats.hits == len(batch)
+
+
+def test_int8_model_gets_its_own_cache_namespace(make_tagger, model):
+    from src.inference.quantize import quantize_model
+
+    cache = PredictionCache()
+    make_tagger(cache=cache)
+    fp32 = cache.checkpoint
+    # Quantized in-process, so same name_or_path as the fp32 model.
+    make_tagger(model=quantize_model(copy.deepcopy(model)), cache=cache)
+    assert cache.checkpoint == f"{fp32}:int8"
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from src.benchmarking.cascade import (
+    CONTEXT_SENTENCES,
+    CascadeStats,
+    CascadeThresholds,
+    cascade_extract,
+    score_chunk,
+    tune_thresholds,
+)
+from src.benchmarking.types import CitationExtractionResult
+
+NEVER = CascadeThresholds(
+    min_span_confidence=0.0, max_span_entropy=float("inf"), min_o_confidence=0.0
+)
+ALWAYS = CascadeThresholds(
+    min_span_confidence=1.1, max_span_entropy=-1.0, min_o_confidence=1.1
+)
+
+
+@pytest.fixture
+def document(candidate_rows):
+    return " ".join(row["text"] for row in candidate_rows[:6])
+
+
+class StubLLM:
+    def __init__(self):
+        self.chunks = []
+        self.contexts = []
+
+    async def __call__(self, text: str, context: str) -> CitationExtractionResult:
+        self.chunks.append(text)
+        self.contexts.append(context)
+        return CitationExtractionResult(cases={"1 U.S. 1": 1}, statutes={})
+
+
+def test_scores_agree_with_tagged_batch(tagger, document):
+    tagged = tagger.tag_sentences(tagger.split(document))
+    for i in range(len(tagged)):
+        score = score_chunk(tagged, i)
+        confidences = tagged.confidences[tagged.row(i)]
+        assert len(score.spans) == len(tagged.spans(i))
+        for s in score.spans:
+            assert confidences.min() <= s.confidence <= 1.0
+            assert s.entropy >= 0.0
+
+
+@pytest.mark.parametrize("thresholds", [NEVER, ALWAYS])
+def test_only_uncertain_chunks_reach_the_llm(tagger, document, thresholds):
+    llm = StubLLM()
+    stats = CascadeStats()
+    res = asyncio.run(cascade_extract(document, tagger, thresholds, llm, stats))
+
+    sentences = tagger.split(document)
+    assert stats.n_chunks == len(sentences)
+    if thresholds is NEVER:
+        assert llm.chunks == []
+        assert stats.n_escalated == 0
+    else:
+        assert llm.chunks == sentences
+        # Nothing is left for the model; every citation is the stub's.
+        assert res.cases == {"1 U.S. 1": len(sentences)}
+        assert res.statutes == {}
+
+
+def test_tuning_calls_llm_once_per_sentence(tagger, document):
+    llm = StubLLM()
+    items = [(document, CitationExtractionResult(cases={"1 U.S. 1": 1}, statutes={}))]
+    results = asyncio.run(tune_thresholds(tagger, items, [NEVER, ALWAYS, ALWAYS], llm))
+
+    assert len(llm.chunks) == len(set(tagger.split(document)))
+    assert [r.escalation_rate for r in results] == [0.0, 1.0, 1.0]
+
+
+def test_escalated_sentences_come_with_preceding_context(tagger):
+    first = "See Niz-Chavez v. Garland, 141 S. Ct. 1474, 1478 (2021)."
+    document = f"{first} Id. at 1480."
+    llm = StubLLM()
+    asyncio.run(cascade_extract(document, tagger, ALWAYS, llm))
+
+    assert llm.chunks == [first, "Id. at 1480."]
+    assert llm.contexts == ["", first]
+
+
+def test_context_is_limited_to_recent_sentences(tagger):
+    sentences = [f"Sentence number {i} is here." for i in range(CONTEXT_SENTENCES + 2)]
+    llm = StubLLM()
+    asyncio.run(cascade_extract(" ".join(sentences), tagger, ALWAYS, llm))
+
+    assert llm.contexts[-1] == " ".join(sentences[-CONTEXT_SENTENCES - 1 : -1])
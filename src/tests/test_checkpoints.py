@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+import torch
+
+from src.training import model as model_module
+
+
+@pytest.fixture
+def training_output(tmp_path, monkeypatch, model):
+    monkeypatch.setattr(model_module, "TRAINING_OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(model_module, "MANIFEST_PATH", tmp_path / "manifest.json")
+    # v1 as the Trainer saves it today, v2 as older checkpoints were saved.
+    model.save_pretrained(tmp_path / "v1" / "checkpoint-10")
+    model.save_pretrained(tmp_path / "v2" / "checkpoint-10", safe_serialization=False)
+    return tmp_path
+
+
+def _mapped_regions(name: str):
+    with open("/proc/self/maps") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 6 and parts[5].endswith(name):
+                start, end = parts[0].split("-")
+                yield int(start, 16), int(end, 16)
+
+
+@pytest.mark.skipif(not Path("/proc/self/maps").exists(), reason="needs procfs")
+def test_safetensors_weights_are_memory_mapped(training_output):
+    loaded = model_module.load_model_from_checkpoint("1")
+    assert loaded.memory_mapped  # pyright: ignore
+
+    regions = list(_mapped_regions(model_module.SAFETENSORS_NAME))
+    for p in loaded.parameters():  # pyright: ignore
+        assert any(start <= p.data_ptr() < end for start, end in regions)
+
+
+def test_activate_converts_to_safetensors(training_output, model):
+    checkpoint = training_output / "v2" / "checkpoint-10"
+    assert not model_module.load_model_from_checkpoint("2").memory_mapped  # pyright: ignore
+
+    model_module.activate_checkpoint("2")
+    assert (checkpoint / model_module.SAFETENSORS_NAME).exists()
+
+    loaded = model_module.load_model_from_checkpoint()
+    assert loaded.memory_mapped  # pyright: ignore
+    input_ids = torch.randint(5, model.config.vocab_size, (2, 12))
+    with torch.no_grad():
+        assert torch.equal(
+            loaded(input_ids=input_ids).logits,  # pyright: ignore
+            model(input_ids=input_ids).logits,
+        )
+
+
+def test_manifest_decides_the_default_checkpoint(training_output):
+    manifest = model_module.activate_checkpoint("1")
+    assert manifest.version == "v1"
+    assert model_module.read_manifest() == manifest
+
+    # The manifest wins over the most recently modified version directory.
+    (training_output / "v2").touch()
+    assert model_module.resolve_checkpoint() == training_output / "v1/checkpoint-10"
+    assert model_module.resolve_checkpoint("2") == training_output / "v2/checkpoint-10"
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.inference.decoding import decode_batch_spans, decode_spans
+from src.training.constants import LABEL_MAP
+
+
+def _ids(*labels: str) -> list:
+    return [LABEL_MAP[label] for label in labels]
+
+
+def test_decode_batch_spans_keeps_rows_apart():
+    texts = ["Fux, 76 F.3d", "Id. at 4"]
+    # [CLS] Fux , 76 F.3d [SEP] | [CLS] Id. at 4 [SEP]
+    label_ids = np.array(
+        _ids("O", "B-CASE_NAME", "O", "B-VOLUME", "B-REPORTER", "I-CASE_NAME")
+        + _ids("I-REPORTER", "B-ID", "O", "B-PIN", "O")
+    )
+    offsets = np.array(
+        [[0, 0], [0, 3], [3, 4], [5, 7], [8, 12], [0, 0]]
+        + [[0, 0], [0, 3], [4, 6], [7, 8], [0, 0]]
+    )
+    row_splits = np.array([0, 6, 11])
+
+    spans = decode_batch_spans(texts, label_ids, offsets, row_splits)
+
+    assert [(s.label, s.text) for s in spans[0]] == [
+        ("CASE_NAME", "Fux"),
+        ("VOLUME", "76"),
+        ("REPORTER", "F.3d"),
+    ]
+    # The I-REPORTER on the next row's [CLS] is ignored, not glued to F.3d.
+    assert [(s.label, s.text) for s in spans[1]] == [("ID", "Id."), ("PIN", "4")]
+
+
+def test_decode_batch_spans_merges_inside_tags():
+    texts = ["Leegin Creative"]
+    label_ids = np.array(_ids("B-CASE_NAME", "I-CASE_NAME", "I-CASE_NAME"))
+    offsets = np.array([[0, 3], [3, 6], [7, 15]])
+
+    (spans,) = decode_batch_spans(texts, label_ids, offsets, np.array([0, 3]))
+
+    assert [(s.label, s.start, s.end, s.text) for s in spans] == [
+        ("CASE_NAME", 0, 15, "Leegin Creative")
+    ]
+
+
+def test_decode_spans_of_nothing():
+    assert decode_spans("", [], [], []) == []
@@ -0,0 +1,47 @@
+import pytest
+import torch
+import transformers
+
+from src.training.distill import alternating_layers
+
+
+@pytest.mark.parametrize(
+    ["n_teacher", "n_student", "expected"],
+    [
+        (12, 6, [0, 2, 4, 6, 8, 10]),
+        (12, 4, [0, 3, 6, 9]),
+        (12, 12, list(range(12))),
+    ],
+)
+def test_alternating_layers(n_teacher, n_student, expected):
+    assert alternating_layers(n_teacher, n_student) == expected
+
+
+def test_student_trains_on_all_labels(candidate_rows, tokenizer, model, tmp_path):
+    from src.data.prepare import encode_for_training
+    from src.training.constants import ALL_LABELS
+    from src.training.distill import DistillationTrainer, build_student
+
+    # Like get_base_model: MODEL_NAME's 9-label config, ALL_LABELS classifier.
+    config = transformers.BertConfig(**{**model.config.to_dict(), "num_labels": 9})
+    base = transformers.BertForTokenClassification(config)
+    base.classifier = torch.nn.Linear(config.hidden_size, len(ALL_LABELS))
+
+    student = build_student(n_layers=1, base=base)
+    assert student.classifier.out_features == len(ALL_LABELS)
+
+    collator = transformers.DataCollatorForTokenClassification(tokenizer)
+    batch = collator(
+        [encode_for_training(row, tokenizer) for row in candidate_rows[:2]]
+    )
+    del batch["length"]
+    assert student(**batch).loss is not None
+
+    trainer = DistillationTrainer(
+        model=student,
+        args=transformers.TrainingArguments(str(tmp_path), report_to=[]),
+        teacher=model,
+    )
+    loss = trainer.compute_loss(student, batch)
+    loss.backward()
+    assert torch.isfinite(loss)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from transformers import (
+    DataCollatorForTokenClassification,
+    Trainer,
+    TrainingArguments,
+)
+
+from src.data.prepare import encode_for_training
+from src.training import train
+from src.training.constants import LABEL_MAP
+from src.training.evaluation import StreamingTokenMetrics, argmax_logits
+
+
+def ids(*labels):
+    return [LABEL_MAP[label] if label else -100 for label in labels]
+
+
+def test_entity_scores():
+    gold = np.array(
+        [
+            ids(None, "B-VOLUME", "B-REPORTER", "I-REPORTER", "B-PAGE", None),
+            ids(None, "B-ID", "O", "B-PAGE", None, None),
+        ]
+    )
+    # The reporter is cut short and the second row's page is missed.
+    pred = np.array(
+        [
+            ids("O", "B-VOLUME", "B-REPORTER", "O", "B-PAGE", "O"),
+            ids("O", "B-ID", "O", "O", "B-PAGE", "B-PAGE"),
+        ]
+    )
+    metrics = StreamingTokenMetrics()
+    metrics.update(pred, gold)
+    result = metrics.compute()
+
+    assert result["total_errors"] == 2
+    assert result["precision"] == 3 / 4
+    assert result["recall"] == 3 / 5
+    assert result["f1_VOLUME"] == 1.0
+    assert result["f1_PAGE"] == 2 / 3
+    assert sorted(metrics.top_confusions()) == [
+        ("B-PAGE", "O", 1),
+        ("I-REPORTER", "O", 1),
+    ]
+
+
+def test_streaming_matches_full_predictions(candidate_rows, tokenizer, model, tmp_path):
+    dataset = [encode_for_training(row, tokenizer) for row in candidate_rows[:24]]
+    args = dict(
+        output_dir=str(tmp_path),
+        per_device_eval_batch_size=4,
+        report_to=[],
+        disable_tqdm=True,
+    )
+    collator = DataCollatorForTokenClassification(tokenizer)
+
+    expected, _ = train.test_predict(
+        Trainer(model=model, args=TrainingArguments(**args), data_collator=collator),
+        dataset,  # pyright: ignore
+    )
+
+    streaming = Trainer(
+        model=model,
+        args=TrainingArguments(**args, batch_eval_metrics=True),
+        data_collator=collator,
+        compute_metrics=StreamingTokenMetrics(),
+        preprocess_logits_for_metrics=argmax_logits,
+    )
+    # Keeping every row's predictions is what streaming avoids.
+    streaming.predict = None  # pyright: ignore
+    metrics, confusions = train.test_predict(streaming, dataset)  # pyright: ignore
+
+    assert metrics["total_errors"] == expected["total_errors"]
+    assert metrics["error_percentage"] == pytest.approx(expected["error_percentage"])
+    assert 0 <= metrics["f1"] <= 1
+    assert sum(n for _, _, n in confusions) <= metrics["total_errors"]
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from src.inference.metrics import METRICS, MetricsRegistry, length_bucket
+
+
+@pytest.mark.parametrize(
+    "n_tokens,expected",
+    [(1, "16"), (16, "16"), (17, "32"), (512, "512"), (513, "+Inf")],
+)
+def test_length_bucket(n_tokens, expected):
+    assert length_bucket(n_tokens) == expected
+
+
+def test_prometheus_export():
+    metrics = MetricsRegistry(prefix="test")
+    metrics.inc("sentences_total", 3)
+    for seconds in (0.002, 0.02, 20.0):
+        metrics.observe("stage_seconds", seconds, stage="forward", length="64")
+
+    text = metrics.to_prometheus()
+    assert "# TYPE test_sentences_total counter\ntest_sentences_total 3\n" in text
+    assert "# TYPE test_stage_seconds histogram" in text
+    # Buckets are cumulative and end at +Inf with the total count.
+    bucket = 'test_stage_seconds_bucket{length="64",stage="forward",le="%s"} %d'
+    assert bucket % ("0.001", 0) in text
+    assert bucket % ("0.0025", 1) in text
+    assert bucket % ("0.025", 2) in text
+    assert bucket % ("10", 2) in text
+    assert bucket % ("+Inf", 3) in text
+    assert 'test_stage_seconds_count{length="64",stage="forward"} 3' in text
+
+
+def test_json_lines_export():
+    metrics = MetricsRegistry()
+    metrics.inc("tokens_total", 10)
+    metrics.observe("sentence_tokens", 12, buckets=(16, 32))
+
+    records = [json.loads(line) for line in metrics.to_json_lines(1.0).splitlines()]
+    assert records == [
+        {
+            "ts": 1.0,
+            "name": "citation_tagger_tokens_total",
+            "type": "counter",
+            "labels": {},
+            "value": 10,
+        },
+        {
+            "ts": 1.0,
+            "name": "citation_tagger_sentence_tokens",
+            "type": "histogram",
+            "labels": {},
+            "buckets": {"16": 1, "32": 1, "+Inf": 1},
+            "sum": 12,
+            "count": 1,
+        },
+    ]
+
+
+def test_tagger_records_each_stage(candidate_rows, tagger):
+    text = " ".join(row["text"] for row in candidate_rows[:8])
+
+    METRICS.reset()
+    tagger.tag(text).all_spans()
+
+    totals = METRICS.stage_totals()
+    assert set(totals) == {
+        "split",
+        "tokenize",
+        "collate",
+        "transfer",
+        "forward",
+        "argmax",
+        "decode",
+    }
+    assert totals["forward"][0] == totals["collate"][0] >= 1
@@ -0,0 +1,29 @@
+import pytest
+import torch
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+from src.inference.onnx_backend import OnnxTokenClassifier, export_onnx
+
+
+def test_onnx_matches_pytorch_on_candidate_dataset(
+    candidate_rows, tokenizer, model, tmp_path
+):
+    export_onnx(model, tokenizer, tmp_path)
+    onnx_model = OnnxTokenClassifier(tmp_path)
+
+    texts = [row["text"] for row in candidate_rows[:64]]
+    for start in range(0, len(texts), 16):
+        inputs = tokenizer(
+            texts[start : start + 16],
+            padding=True,
+            truncation=True,
+            max_length=512,
+            return_tensors="pt",
+        )
+        with torch.no_grad():
+            expected = model(**inputs).logits.argmax(-1)
+        actual = onnx_model(**inputs).logits.argmax(-1)
+
+        mask = inputs["attention_mask"].bool()
+        assert torch.equal(expected[mask], actual[mask])
@@ -0,0 +1,29 @@
+import pytest
+
+
+def test_single_sentence_matches_unpacked(candidate_rows, tagger):
+    texts = [row["text"].strip() for row in candidate_rows[:16]]
+    texts = [t for t in texts if len(tagger.split(t)) == 1]
+
+    packed = tagger.tag_packed(texts)
+    for text, result in zip(texts, packed):
+        expected = tagger.tag_sentences([text])
+        # Same input ([CLS] sentence [SEP]), so the same labels, minus the
+        # special tokens that packed rows leave out.
+        assert result.labels(0) == expected.labels(0)[1:-1]
+        assert result.spans(0) == expected.spans(0)
+
+
+@pytest.mark.parametrize("max_length", [512, 32])
+def test_packed_rows_line_up_with_sentences(candidate_rows, tagger, max_length):
+    document = " ".join(row["text"].strip() for row in candidate_rows[:24])
+    sentences = tagger.split(document)
+
+    (result,) = tagger.tag_packed([document], max_length=max_length)
+    expected = tagger.tag_sentences(sentences)
+
+    assert result.texts == sentences
+    for i in range(len(sentences)):
+        assert result.tokens(i) == expected.tokens(i)[1:-1]
+        for start, end in result.offsets[result.row(i)].tolist():
+            assert 0 <= start < end <= len(sentences[i])
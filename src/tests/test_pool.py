@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from src.inference.pool import TaggerPool
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_pool_matches_serial_tagging(candidate_rows, tagger, ordered):
+    texts = [
+        " ".join(row["text"] for row in candidate_rows[i : i + 8])
+        for i in range(0, 48, 8)
+    ]
+
+    expected = [tagger.tag_document(t) for t in texts]
+
+    with TaggerPool(tagger, n_workers=2) as pool:
+        results = dict(pool.map(texts, ordered=ordered))
+        if ordered:
+            assert list(results) == list(range(len(texts)))
+
+    assert [results[i] for i in range(len(texts))] == expected
+
+
+def test_pinned_workers_run_on_their_cores(tagger):
+    with TaggerPool(tagger, n_workers=1, pin=True) as pool:
+        (config,) = pool.thread_configs
+        affinity = pool._pool.apply(os.sched_getaffinity, (0,))  # pyright: ignore
+
+    assert affinity == set(config.cpus)  # pyright: ignore
@@ -0,0 +1,50 @@
+import pytest
+import torch
+
+from src.inference import precision
+from src.inference.cache import PredictionCache
+
+
+@pytest.fixture
+def tagger(make_tagger):
+    return make_tagger(cache=PredictionCache())
+
+
+@pytest.mark.parametrize(
+    "flags,expected",
+    [("fpu sse2 avx2", False), ("avx512f avx512_bf16", True), ("amx_bf16", True)],
+)
+def test_cpu_flag_detection(tmp_path, monkeypatch, flags, expected):
+    cpuinfo = tmp_path / "cpuinfo"
+    cpuinfo.write_text(f"processor\t: 0\nflags\t\t: {flags}\n\n")
+    monkeypatch.setattr(precision, "CPUINFO_PATH", cpuinfo)
+    assert precision.cpu_supports_bf16() is expected
+
+
+def test_bf16_is_enabled_only_if_it_agrees(candidate_rows, tagger, model):
+    sentences = [row["text"] for row in candidate_rows[:16]]
+
+    enabled, report = precision.enable_bf16(
+        tagger, sentences, min_agreement=0.0, force=True
+    )
+    assert report is not None
+    assert enabled is not tagger
+    assert enabled.dtype == torch.bfloat16
+    assert next(enabled.model.parameters()).dtype == torch.bfloat16
+    # The fp32 tagger and its model are left as they were.
+    assert next(model.parameters()).dtype == torch.float32
+    # The cache moves over, keyed apart from the fp32 predictions.
+    assert enabled.cache is tagger.cache
+    assert enabled.cache.checkpoint.endswith(":torch.bfloat16")  # pyright: ignore
+
+    kept, _ = precision.enable_bf16(tagger, sentences, min_agreement=1.1, force=True)
+    assert kept is tagger
+
+
+def test_bf16_labels_mostly_match_fp32(candidate_rows, tagger):
+    sentences = [row["text"] for row in candidate_rows[:16]]
+    bf16 = precision.bf16_tagger(tagger)
+
+    fp32_ids = tagger.tag_sentences(sentences).label_ids
+    bf16_ids = bf16.tag_sentences(sentences).label_ids
+    assert (fp32_ids == bf16_ids).mean() > 0.9
@@ -0,0 +1,46 @@
+import pytest
+
+from src.inference.prefilter import evaluate_prefilter, may_contain_citation
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Hanover Star Milling Co. v. Metcalf, 240 U.S. 403, 412 (1916).",
+        "May I interest you in a short citation--Fux, 76 F.3d at 89.",
+        "Laws exist 21 U.S.C. § 79",
+        "Id. at 12.",
+        "See Smith, supra, at 4.",
+        "Powe v. Nevada, 2019 WL 918982, at *3 (D. Nev. Feb. 22, 2019).",
+        "12 F.Supp. 10, 19",
+        "Plaintiff moves under Fed. R. Civ. P. 12(b)(6).",
+        "pursuant to N.J.S.A. 40:55D-15",
+        "of the 2003 amendment to section 12940, subdivision (j)",
+    ],
+)
+def test_flags_citations(text: str):
+    assert may_contain_citation(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "We're ready. Are you?",
+        "See above.",
+        "Third, the parties should modify the Discovery Schedules to account "
+        "for the delay in producing audio files.",
+    ],
+)
+def test_skips_plain_prose(text: str):
+    assert not may_contain_citation(text)
+
+
+def test_evaluate_prefilter():
+    report = evaluate_prefilter(
+        ["See above.", "Id. at 4.", "Nothing here."], [False, True, True]
+    )
+
+    assert report.n_flagged == 1
+    assert report.missed == ["Nothing here."]
+    assert report.recall == 0.5
+    assert report.skip_rate == pytest.approx(2 / 3)
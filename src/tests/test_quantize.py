@@ -0,0 +1,45 @@
+import copy
+
+import pytest
+import torch
+
+from src.inference.compare import compare_taggers
+from src.inference.quantize import (
+    load_quantized,
+    quantize_model,
+    save_quantized,
+)
+from src.training.constants import ALL_LABELS
+
+
+@pytest.fixture
+def quantized(model):
+    return quantize_model(copy.deepcopy(model))
+
+
+def test_quantized_weights_roundtrip(tokenizer, quantized, tmp_path):
+    save_quantized(quantized, tmp_path)
+    reloaded = load_quantized(tmp_path)
+
+    inputs = tokenizer(["Fux, 76 F.3d at 89.", "Id. at 5."], padding=True)
+    inputs = {k: torch.tensor(v) for k, v in inputs.items()}
+    with torch.inference_mode():
+        expected = quantized(**inputs).logits
+        actual = reloaded(**inputs).logits
+    assert torch.equal(actual, expected)
+
+
+def test_compare_taggers_report(candidate_rows, make_tagger, quantized):
+    sentences = [row["text"] for row in candidate_rows[:8]]
+    fp32 = make_tagger()
+
+    report = compare_taggers(fp32, make_tagger(model=quantized), sentences)
+    assert report.n_sentences == len(sentences)
+    assert report.n_tokens == len(fp32.tag_sentences(sentences).label_ids)
+    assert 0 <= report.agreement <= 1
+    assert set(report.per_label_agreement) <= set(ALL_LABELS)
+    assert all(0 <= a <= 1 for a in report.per_label_agreement.values())
+
+    same = compare_taggers(fp32, fp32, sentences)
+    assert same.agreement == 1
+    assert set(same.per_label_agreement.values()) == {1}
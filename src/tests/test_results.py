@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.inference.results import TaggedBatch
+from src.training.constants import LABEL_MAP
+
+
+def _batch() -> TaggedBatch:
+    texts = ["Fux, 76 F.3d", "Id. at 4"]
+    # [CLS] Fux , 76 F.3d [SEP] | [CLS] Id. at 4 [SEP]
+    labels = ["O", "B-CASE_NAME", "O", "B-VOLUME", "B-REPORTER", "O"]
+    labels += ["O", "B-ID", "O", "B-PIN", "O"]
+    offsets = [[0, 0], [0, 3], [3, 4], [5, 7], [8, 12], [0, 0]]
+    offsets += [[0, 0], [0, 3], [4, 6], [7, 8], [0, 0]]
+    return TaggedBatch(
+        texts=texts,
+        input_ids=np.arange(11, dtype=np.int32),
+        label_ids=np.array([LABEL_MAP[label] for label in labels], dtype=np.int8),
+        confidences=np.linspace(0.5, 1.0, 11, dtype=np.float32),
+        offsets=np.array(offsets, dtype=np.int32),
+        row_splits=np.array([0, 6, 11]),
+        entropies=np.zeros(11, dtype=np.float32),
+    )
+
+
+def test_labels_and_spans_per_row():
+    batch = _batch()
+
+    assert batch.labels(1) == ["O", "B-ID", "O", "B-PIN", "O"]
+    assert [(s.label, s.text) for s in batch.spans(0)] == [
+        ("CASE_NAME", "Fux"),
+        ("VOLUME", "76"),
+        ("REPORTER", "F.3d"),
+    ]
+    assert batch.all_spans() == [batch.spans(0), batch.spans(1)]
+
+
+def test_take_reorders_rows():
+    batch = _batch()
+    taken = batch.take([1, 0, 1])
+
+    assert taken.texts == ["Id. at 4", "Fux, 76 F.3d", "Id. at 4"]
+    assert taken.row_splits.tolist() == [0, 5, 11, 16]
+    for i, source in enumerate([1, 0, 1]):
+        assert taken.labels(i) == batch.labels(source)
+        assert taken.spans(i) == batch.spans(source)
+        assert (
+            taken.confidences[taken.row(i)] == batch.confidences[batch.row(source)]
+        ).all()
+
+
+def test_empty_batches():
+    for batch in (_batch().take([]), TaggedBatch.empty()):
+        assert len(batch) == 0
+        assert batch.all_spans() == []
+        assert batch.row_splits.tolist() == [0]
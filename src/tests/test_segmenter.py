@@ -0,0 +1,61 @@
+from typing import List
+
+import pytest
+
+from src.inference.segmenter import RegexSegmenter, boundary_agreement
+
+
+@pytest.mark.parametrize(
+    ["text", "sentences"],
+    [
+        (
+            "See Niz-Chavez v. Garland, 141 S. Ct. 1474, 1478 (2021). Id. at 1480.",
+            [
+                "See Niz-Chavez v. Garland, 141 S. Ct. 1474, 1478 (2021).",
+                "Id. at 1480.",
+            ],
+        ),
+        (
+            "Id. The court did not reach the question. See id. It declined to.",
+            [
+                "Id.",
+                "The court did not reach the question.",
+                "See id.",
+                "It declined to.",
+            ],
+        ),
+        (
+            "Smith v. Jones, 123 F. 3d 456 (2d Cir. 1999), held otherwise. It erred.",
+            [
+                "Smith v. Jones, 123 F. 3d 456 (2d Cir. 1999), held otherwise.",
+                "It erred.",
+            ],
+        ),
+        (
+            "See 18 U.S.C. § 1961(1). The statute is broad.",
+            ["See 18 U.S.C. § 1961(1).", "The statute is broad."],
+        ),
+        (
+            'Brown v. Bd. of Educ., 347 U.S. 483 (1954). "Separate is unequal."',
+            ["Brown v. Bd. of Educ., 347 U.S. 483 (1954).", '"Separate is unequal."'],
+        ),
+        (
+            "Fed. R. Civ. P. 12(b)(6) governs.\n\nthe next paragraph",
+            ["Fed. R. Civ. P. 12(b)(6) governs.", "the next paragraph"],
+        ),
+    ],
+)
+def test_regex_segmenter(text: str, sentences: List[str]):
+    segmenter = RegexSegmenter()
+    assert segmenter.split(text) == sentences
+    assert all(
+        text[s:e] == sent for (s, e), sent in zip(segmenter.spans(text), sentences)
+    )
+
+
+def test_boundary_agreement():
+    reference = [[(0, 10), (11, 20), (21, 30)]]
+    candidate = [[(0, 10), (11, 30)]]
+    precision, recall, f1 = boundary_agreement(reference, candidate)
+    assert (precision, recall) == (1.0, 0.5)
+    assert f1 == pytest.approx(2 / 3)
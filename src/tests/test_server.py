@@ -0,0 +1,65 @@
+import json
+import queue
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.inference.server import MicroBatcher, TaggerServer
+
+
+def test_concurrent_requests_share_a_batch(candidate_rows, tagger):
+    requests = [[row["text"]] for row in candidate_rows[:8]]
+
+    batcher = MicroBatcher(tagger, max_batch_size=8, max_wait_ms=500)
+    futures = [batcher.submit(r) for r in requests]
+    batcher.start()
+    results = [f.result(timeout=30) for f in futures]
+    batcher.stop()
+
+    assert batcher.n_batches == 1
+    for sentences, result in zip(requests, results):
+        expected = tagger.tag_sentences(sentences)
+        assert result.texts == sentences
+        assert (result.label_ids == expected.label_ids).all()
+
+
+def test_full_queue_rejects(tagger):
+    batcher = MicroBatcher(tagger, max_queue_size=1)
+    batcher.submit(["Fexler v. Hock, 123 U.S. 456."])
+    with pytest.raises(queue.Full):
+        batcher.submit(["Id. at 460."])
+
+
+def test_http_roundtrip(candidate_rows, tagger):
+    batcher = MicroBatcher(tagger, max_wait_ms=20)
+    batcher.start()
+    server = TaggerServer(("127.0.0.1", 0), batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def post(sentence):
+        request = urllib.request.Request(
+            f"{url}/tag",
+            data=json.dumps({"sentences": [sentence]}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    try:
+        texts = [row["text"] for row in candidate_rows[:16]]
+        with ThreadPoolExecutor(8) as pool:
+            bodies = list(pool.map(post, texts))
+
+        with urllib.request.urlopen(f"{url}/health") as response:
+            health = json.loads(response.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.stop()
+
+    assert [b["sentences"][0]["text"] for b in bodies] == texts
+    assert health["status"] == "ok"
+    assert health["batches_served"] < len(texts)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("text", ["", "   \n\t "])
+def test_empty_documents_have_no_rows(tagger, text):
+    result = tagger.tag(text)
+    assert len(result) == 0
+    assert result.all_spans() == []
+
+    assert len(tagger.tag_sentences([])) == 0
+
+
+def test_empty_document_has_no_spans(tagger):
+    assert tagger.tag_document("") == []
+
+
+def test_overlapping_windows_keep_the_most_context(tagger):
+    from src.training.constants import LABEL_MAP
+
+    text = "a b c d e f g"
+    words = [(i, i + 1) for i in range(0, len(text), 2)]
+    # Window 0 holds words 0-4 and window 1 words 3-6, each between [CLS]
+    # and [SEP]; window 1 is padded. Window 0 says VOLUME, window 1 PAGE.
+    offsets = np.array(
+        [
+            [(0, 0)] + words[0:5] + [(0, 0), (0, 0), (0, 0)],
+            [(0, 0)] + words[3:7] + [(0, 0), (0, 0), (0, 0), (0, 0)],
+        ]
+    )
+    predictions = np.array([[LABEL_MAP["B-VOLUME"]] * 8, [LABEL_MAP["B-PAGE"]] * 8])
+
+    spans = tagger._merge_windows(text, predictions, offsets)
+
+    # Every word once, in order.
+    assert [(s.start, s.end) for s in spans] == words
+    # "d" is second to last in window 0 but first in window 1; "e" is last in
+    # window 0 but second in window 1.
+    assert [s.label for s in spans] == ["VOLUME"] * 4 + ["PAGE"] * 3
+
+
+def test_long_document_spans_every_window(candidate_rows, tagger):
+    text = " ".join(row["text"].strip() for row in candidate_rows[:40])
+    assert len(tagger.tokenizer(text)["input_ids"]) > 4 * 64
+
+    spans = tagger.tag_document(text, stride=16, max_length=64)
+    for a, b in zip(spans, spans[1:]):
+        assert a.end <= b.start
+    assert all(text[s.start : s.end] == s.text for s in spans)
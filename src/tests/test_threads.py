@@ -0,0 +1,57 @@
+import pytest
+
+from src.inference.threads import (
+    candidate_layouts,
+    parse_cpulist,
+    plan_layout,
+)
+
+
+@pytest.mark.parametrize(
+    "cpulist,expected",
+    [
+        ("0", [0]),
+        ("0-3", [0, 1, 2, 3]),
+        ("0-1,8-9,16\n", [0, 1, 8, 9, 16]),
+        ("", []),
+    ],
+)
+def test_parse_cpulist(cpulist, expected):
+    assert parse_cpulist(cpulist) == expected
+
+
+def test_layout_spreads_workers_over_numa_nodes():
+    nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    configs = plan_layout(4, 2, nodes)
+
+    assert [c.cpus for c in configs] == [[0, 1], [4, 5], [2, 3], [6, 7]]
+    assert all(c.intra_op_threads == 2 for c in configs)
+
+
+def test_layout_keeps_workers_on_one_node():
+    # 3 threads fit on either node, but a second worker per node would have
+    # to straddle both.
+    with pytest.raises(ValueError):
+        plan_layout(3, 3, [[0, 1, 2, 3], [4, 5, 6, 7]])
+
+
+@pytest.mark.parametrize(
+    "n_cpus,expected",
+    [
+        (8, [(8, 1), (4, 2), (2, 4), (1, 8)]),
+        (6, [(6, 1), (3, 2), (2, 3), (1, 6)]),
+        (1, [(1, 1)]),
+    ],
+)
+def test_candidate_layouts_use_every_core(n_cpus, expected):
+    assert candidate_layouts(n_cpus) == expected
+
+
+def test_training_processes_get_a_node_share():
+    from src.training.train import cpu_worker_threads
+
+    nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert cpu_worker_threads(1, 2, nodes).cpus == [4, 5, 6, 7]
+    # 3 x 2 threads fit on 2 x 3 cores only by straddling a node: unpinned.
+    config = cpu_worker_threads(0, 3, [[0, 1, 2], [3, 4, 5]])
+    assert config.cpus is None and config.intra_op_threads == 2
@@ -0,0 +1,78 @@
+import pytest
+
+from src.data.prepare import encode_for_training
+from src.training import train
+from src.training.constants import LABEL_MAP
+
+
+def test_labels_line_up_with_tokens(candidate_rows, tokenizer):
+    row = max(candidate_rows[:50], key=lambda r: len(r["tags"]))
+    encoded = encode_for_training(row, tokenizer)
+
+    n = len(row["tags"])
+    assert encoded["length"] == len(encoded["input_ids"]) == n + 2
+    assert encoded["labels"] == [-100] + [LABEL_MAP[t] for _, t in row["tags"]] + [-100]
+    assert tokenizer.convert_ids_to_tokens(encoded["input_ids"][1:-1]) == [
+        token for token, _ in row["tags"]
+    ]
+
+
+def test_truncation_keeps_labels_aligned(candidate_rows, tokenizer):
+    row = max(candidate_rows[:50], key=lambda r: len(r["tags"]))
+    encoded = encode_for_training(row, tokenizer, max_length=10)
+
+    assert len(encoded["input_ids"]) == len(encoded["labels"]) == 10
+    assert encoded["input_ids"][-1] == tokenizer.sep_token_id
+    assert encoded["labels"][1:-1] == [LABEL_MAP[t] for _, t in row["tags"][:8]]
+
+
+def test_batches_are_padded_to_their_longest_row(
+    candidate_rows, tokenizer, monkeypatch
+):
+    monkeypatch.setattr(train, "get_tokenizer", lambda: tokenizer)
+    rows = [encode_for_training(row, tokenizer) for row in candidate_rows[:4]]
+    longest = max(len(row["input_ids"]) for row in rows)
+
+    batch = train.get_data_collator()(rows)
+    assert batch["input_ids"].shape[1] == -(-longest // 8) * 8
+    assert batch["labels"].shape == batch["input_ids"].shape
+    assert (batch["labels"][batch["attention_mask"] == 0] == -100).all()
+
+    batch = train.get_data_collator(max_length=512)(rows)
+    assert batch["input_ids"].shape == (4, 512)
+
+
+def test_tokenized_splits_are_cached(candidate_rows, tokenizer, tmp_path, monkeypatch):
+    from datasets import Dataset, DatasetDict
+
+    from src.data import prepare
+
+    monkeypatch.setattr(prepare, "HF_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(prepare, "get_tokenizer", lambda: tokenizer)
+    rows = [{"text": r["text"], "tags": r["tags"]} for r in candidate_rows[:20]]
+    DatasetDict(
+        train=Dataset.from_list(rows[:16]), test=Dataset.from_list(rows[16:])
+    ).save_to_disk(tmp_path / "v1" / "ds")
+
+    built = prepare.load_for_training("v1", num_proc=1)
+    assert (
+        built["train"][3]["labels"] == encode_for_training(rows[3], tokenizer)["labels"]
+    )
+
+    def fail(*args, **kwargs):
+        raise AssertionError("re-tokenized a cached split")
+
+    monkeypatch.setattr(prepare, "encode_batch_for_training", fail)
+    cached = prepare.load_for_training("v1")
+    assert cached["test"]["input_ids"] == built["test"]["input_ids"]
+
+    # A different max length is a different cache entry.
+    with pytest.raises(AssertionError):
+        prepare.load_for_training("v1", max_length=128, num_proc=1)
+
+
+def test_only_version_dirs_can_be_activated(tmp_path):
+    train.check_output_dir(train.OUTPUT_DIR / "v7")
+    for output_dir in (tmp_path / "v7", train.OUTPUT_DIR / "best"):
+        with pytest.raises(ValueError):
+            train.check_output_dir(output_dir)
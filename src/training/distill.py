@@ -0,0 +1,164 @@
+from pathlib import Path
+from typing import List, Optional
+
+import torch
+import torch.nn.functional as F
+from datasets import DatasetDict
+from transformers import (
+    BertForTokenClassification,
+    EarlyStoppingCallback,
+    PreTrainedModel,
+    Trainer,
+    TrainingArguments,
+)
+
+from src.training.constants import ALL_LABELS
+from src.training.evaluation import StreamingTokenMetrics, argmax_logits
+from src.training.model import get_base_model
+from src.training.train import OUTPUT_DIR, get_data_collator
+
+STUDENT_DIR = OUTPUT_DIR / "students"
+STUDENT_MODEL_DIR_NAME = "model"
+
+
+def alternating_layers(n_teacher_layers: int, n_student_layers: int) -> List[int]:
+    """
+    Evenly spaced teacher layers to initialize the student from, e.g. 12 -> 6
+    gives [0, 2, 4, 6, 8, 10] and 12 -> 4 gives [0, 3, 6, 9].
+    """
+    step = n_teacher_layers // n_student_layers
+    return list(range(0, step * n_student_layers, step))
+
+
+def build_student(
+    n_layers: int = 6, base: Optional[PreTrainedModel] = None
+) -> BertForTokenClassification:
+    """
+    A shallower copy of the base model (MODEL_NAME unless given): same
+    embeddings and width, every other encoder layer, and a fresh ALL_LABELS
+    classifier.
+    """
+    base = base or get_base_model()
+    layers = alternating_layers(base.config.num_hidden_layers, n_layers)  # pyright: ignore
+
+    config = base.config.__class__.from_dict(base.config.to_dict())  # pyright: ignore
+    config.num_hidden_layers = n_layers
+    # get_base_model swaps the classifier but leaves MODEL_NAME's own label
+    # set in the config, which would size the student's classifier.
+    config.num_labels = len(ALL_LABELS)
+    config.id2label = dict(enumerate(ALL_LABELS))
+    config.label2id = {label: i for i, label in enumerate(ALL_LABELS)}
+    student = BertForTokenClassification(config)
+
+    student.bert.embeddings.load_state_dict(base.bert.embeddings.state_dict())  # pyright: ignore
+    for i, layer in enumerate(layers):
+        student.bert.encoder.layer[i].load_state_dict(
+            base.bert.encoder.layer[layer].state_dict()  # pyright: ignore
+        )
+
+    return student
+
+
+class DistillationTrainer(Trainer):
+    """
+    Trains the student on a mix of the gold labels (cross-entropy) and the
+    teacher's temperature-softened token distributions (KL divergence):
+
+        loss = alpha * T^2 * KL(teacher_T || student_T) + (1 - alpha) * CE
+
+    Only positions with a gold label (!= -100) count towards the KL term.
+    """
+
+    def __init__(
+        self,
+        *args,
+        teacher: PreTrainedModel,
+        temperature: float = 2.0,
+        alpha: float = 0.5,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher.to(self.args.device).eval()  # pyright: ignore
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        outputs = model(**inputs)
+
+        with torch.no_grad():
+            teacher_logits = self.teacher(**inputs).logits
+
+        mask = inputs["labels"] != -100
+        t = self.temperature
+        kl = F.kl_div(
+            F.log_softmax(outputs.logits[mask] / t, dim=-1),
+            F.softmax(teacher_logits[mask] / t, dim=-1),
+            reduction="batchmean",
+        ) * (t**2)
+
+        loss = self.alpha * kl + (1 - self.alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
+
+
+def get_student_output_dir(n_layers: int) -> Path:
+    STUDENT_DIR.mkdir(parents=True, exist_ok=True)
+    n = len([d for d in STUDENT_DIR.iterdir() if d.is_dir()]) + 1
+    output_dir = STUDENT_DIR / f"v{n}-{n_layers}L"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
+
+def distill_model(
+    ds_dict: DatasetDict,
+    teacher: PreTrainedModel,
+    n_layers: int = 6,
+    temperature: float = 2.0,
+    alpha: float = 0.5,
+    num_train_epochs: int = 20,
+    output_dir: Optional[Path] = None,
+):
+    student = build_student(n_layers)
+    output_dir = output_dir or get_student_output_dir(n_layers)
+
+    print(f"Distillation output directory: {output_dir}")
+
+    training_args = TrainingArguments(
+        output_dir=str(output_dir),
+        num_train_epochs=num_train_epochs,
+        per_device_train_batch_size=8,
+        per_device_eval_batch_size=8,
+        learning_rate=5e-5,
+        warmup_steps=10,
+        weight_decay=0.01,
+        logging_dir=f"{output_dir}/logs",
+        logging_steps=10,
+        do_train=True,
+        do_eval=True,
+        evaluation_strategy="epoch",
+        save_strategy="epoch",
+        load_best_model_at_end=True,
+        save_total_limit=1,
+        fp16=torch.cuda.is_available(),
+        group_by_length=True,
+        batch_eval_metrics=True,
+    )
+
+    trainer = DistillationTrainer(
+        model=student,
+        args=training_args,
+        data_collator=get_data_collator(),
+        train_dataset=ds_dict["train"],
+        eval_dataset=ds_dict["valid"],
+        compute_metrics=StreamingTokenMetrics(),
+        preprocess_logits_for_metrics=argmax_logits,
+        callbacks=[EarlyStoppingCallback(early_stopping_patience=3)],
+        teacher=teacher,
+        temperature=temperature,
+        alpha=alpha,
+    )
+
+    trainer.train()
+    # The best epoch's weights, loadable with CitationTagger.from_pretrained.
+    trainer.save_model(str(output_dir / STUDENT_MODEL_DIR_NAME))
+
+    return student, trainer
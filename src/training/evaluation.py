@@ -0,0 +1,125 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import torch
+from transformers import EvalPrediction
+
+from src.inference.decoding import ENTITY_TYPES, span_boundaries
+from src.training.constants import ALL_LABELS
+
+
+def argmax_logits(logits: torch.Tensor, labels: torch.Tensor) -> torch.Tensor:
+    """
+    preprocess_logits_for_metrics: keeps label ids instead of logits, so the
+    Trainer never holds more than one batch of (tokens x labels) floats.
+    """
+    return logits.argmax(dim=-1)
+
+
+def _to_numpy(array) -> np.ndarray:
+    if isinstance(array, torch.Tensor):
+        return array.cpu().numpy()
+    return np.asarray(array)
+
+
+def _entity_keys(label_ids: np.ndarray, row_starts: np.ndarray) -> np.ndarray:
+    """One int64 per entity, encoding its start, end and type."""
+    starts, ends, types = span_boundaries(label_ids, row_starts)
+    n = len(label_ids) + 1
+    return (starts * n + ends) * len(ENTITY_TYPES) + types
+
+
+class StreamingTokenMetrics:
+    """
+    compute_metrics for Trainer with batch_eval_metrics=True: updated with
+    each evaluation batch of predicted label ids (see argmax_logits), so
+    memory does not grow with the split. Reports token errors as
+    count_errors does, and exact-match entity precision, recall and F1,
+    overall and per entity type.
+
+        TrainingArguments(..., batch_eval_metrics=True)
+        Trainer(
+            ...,
+            compute_metrics=StreamingTokenMetrics(),
+            preprocess_logits_for_metrics=argmax_logits,
+        )
+
+    The confusion matrix of the last finished evaluation stays on
+    `confusion`, indexed [gold label id, predicted label id].
+    """
+
+    def __init__(self):
+        n_labels = len(ALL_LABELS)
+        self.confusion = np.zeros((n_labels, n_labels), dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self._confusion = np.zeros_like(self.confusion)
+        # Per entity type: true positives, predicted, gold.
+        self._entities = np.zeros((3, len(ENTITY_TYPES)), dtype=np.int64)
+
+    def update(self, pred_ids: np.ndarray, label_ids: np.ndarray):
+        """Adds a (rows x tokens) batch; tokens labelled -100 are skipped."""
+        valid = label_ids != -100
+        gold = label_ids[valid]
+        pred = pred_ids[valid]
+
+        n_labels = len(ALL_LABELS)
+        self._confusion += np.bincount(
+            gold * n_labels + pred, minlength=n_labels * n_labels
+        ).reshape(n_labels, n_labels)
+
+        # Entities may not run from one row into the next.
+        row_starts = np.zeros_like(valid)
+        row_starts[np.arange(len(valid)), valid.argmax(axis=1)] = True
+        row_starts = row_starts[valid]
+
+        gold_keys = _entity_keys(gold, row_starts)
+        pred_keys = _entity_keys(pred, row_starts)
+        correct = np.intersect1d(gold_keys, pred_keys)
+
+        n_types = len(ENTITY_TYPES)
+        for i, keys in enumerate((correct, pred_keys, gold_keys)):
+            self._entities[i] += np.bincount(keys % n_types, minlength=n_types)
+
+    def compute(self) -> Dict[str, float]:
+        self.confusion = self._confusion
+        n_tokens = int(self.confusion.sum())
+        n_errors = n_tokens - int(np.trace(self.confusion))
+
+        metrics = {
+            "total_errors": n_errors,
+            "error_percentage": 100 * n_errors / n_tokens if n_tokens else 0.0,
+        }
+        tp, n_pred, n_gold = self._entities.sum(axis=1)
+        metrics.update(_precision_recall_f1(tp, n_pred, n_gold))
+        for name, (tp, n_pred, n_gold) in zip(ENTITY_TYPES, self._entities.T):
+            metrics[f"f1_{name}"] = _precision_recall_f1(tp, n_pred, n_gold)["f1"]
+
+        self.reset()
+        return metrics
+
+    def __call__(
+        self, eval_pred: EvalPrediction, compute_result: bool = True
+    ) -> Dict[str, float]:
+        self.update(_to_numpy(eval_pred.predictions), _to_numpy(eval_pred.label_ids))
+        return self.compute() if compute_result else {}
+
+    def top_confusions(self, n: int = 10) -> List[Tuple[str, str, int]]:
+        """The n most frequent (gold, predicted) label mix-ups."""
+        errors = self.confusion.copy()
+        np.fill_diagonal(errors, 0)
+        order = np.argsort(errors, axis=None)[::-1][:n]
+        gold, pred = np.unravel_index(order, errors.shape)
+        return [
+            (ALL_LABELS[g], ALL_LABELS[p], int(errors[g, p]))
+            for g, p in zip(gold, pred)
+            if errors[g, p]
+        ]
+
+
+def _precision_recall_f1(tp: int, n_pred: int, n_gold: int) -> Dict[str, float]:
+    precision = tp / n_pred if n_pred else 0.0
+    recall = tp / n_gold if n_gold else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if tp else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
@@ -1,7 +1,11 @@
+import hashlib
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 import torch
+from pydantic import BaseModel
 from transformers import (
     AutoConfig,
     AutoModelForTokenClassification,
@@ -9,8 +13,8 @@ from transformers import (
     PreTrainedTokenizerFast,
 )
 from wasabi import msg
+from src.inference.metrics import METRICS
 from src.training.constants import ALL_LABELS, MODEL_NAME
-import spacy
 
 
 def get_base_model():
@@ -27,26 +31,48 @@ def get_base_model():
     return model
 
 
+@lru_cache(maxsize=1)
 def get_tokenizer() -> PreTrainedTokenizerFast:
     tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
     assert isinstance(tokenizer, PreTrainedTokenizerFast)
     return tokenizer
 
 
-def load_model_from_checkpoint(
-    version: Optional[str] = None,
-) -> AutoModelForTokenClassification:
-    training_output_dir = (
-        Path(__file__).resolve().parent.parent.parent / "training_output"
-    )
+TRAINING_OUTPUT_DIR = Path(__file__).resolve().parent.parent.parent / "training_output"
+MANIFEST_PATH = TRAINING_OUTPUT_DIR / "manifest.json"
+SAFETENSORS_NAME = "model.safetensors"
+
+
+class CheckpointManifest(BaseModel):
+    """
+    The checkpoint loaded when no version is given, recorded by
+    activate_checkpoint so that startup does not have to scan
+    training_output. Paths are relative to training_output.
+    """
 
-    if not training_output_dir.exists():
+    version: str
+    checkpoint: str
+    activated_at: float
+
+    @property
+    def path(self) -> Path:
+        return TRAINING_OUTPUT_DIR / self.checkpoint
+
+
+def read_manifest() -> Optional[CheckpointManifest]:
+    if not MANIFEST_PATH.exists():
+        return None
+    return CheckpointManifest.model_validate_json(MANIFEST_PATH.read_text())
+
+
+def _find_checkpoint(version: Optional[str] = None) -> Path:
+    if not TRAINING_OUTPUT_DIR.exists():
         raise FileNotFoundError(
-            f"Training output directory {training_output_dir} not found."
+            f"Training output directory {TRAINING_OUTPUT_DIR} not found."
         )
 
     if version:
-        checkpoint_dir = training_output_dir / f"v{version}"
+        checkpoint_dir = TRAINING_OUTPUT_DIR / f"v{version}"
         if not checkpoint_dir.exists():
             raise FileNotFoundError(
                 f"No checkpoint directory found for version {version}"
@@ -54,7 +80,7 @@ def load_model_from_checkpoint(
 
     else:
         checkpoint_dir = max(
-            training_output_dir.glob("v*"),
+            TRAINING_OUTPUT_DIR.glob("v*"),
             key=lambda x: x.stat().st_mtime,
             default=None,
         )
@@ -63,28 +89,120 @@ def load_model_from_checkpoint(
                 "No checkpoint directories found in the training output directory."
             )
 
-    msg.info(f"Loading model from checkpoint directory {checkpoint_dir}")
-
     # Find the checkpoint within the selected directory
     checkpoint_path = next(checkpoint_dir.glob("checkpoint-*"), None)
     if checkpoint_path is None:
         raise FileNotFoundError("No checkpoint found in the specified directory")
 
+    return checkpoint_path
+
+
+def resolve_checkpoint(version: Optional[str] = None) -> Path:
+    """
+    The checkpoint of the given version, or else the active one from the
+    manifest. Without a manifest, falls back to the most recently modified
+    version directory.
+    """
+    manifest = None if version else read_manifest()
+    if manifest is not None and manifest.path.exists():
+        checkpoint_path = manifest.path
+    else:
+        if manifest is not None:
+            msg.warn(f"Manifest points at missing checkpoint {manifest.path}")
+        elif not version:
+            msg.warn("No checkpoint manifest; run `activate-checkpoint` to write one")
+        checkpoint_path = _find_checkpoint(version)
+
+    msg.info(f"Loading model from checkpoint {checkpoint_path}")
+    return checkpoint_path
+
+
+def convert_to_safetensors(checkpoint_path: Path) -> Path:
+    """
+    Writes model.safetensors next to a checkpoint's pytorch_model.bin, if it
+    does not have one yet (the Trainer has saved safetensors by default since
+    transformers 4.35).
+    """
+    weights_path = checkpoint_path / SAFETENSORS_NAME
+    if weights_path.exists():
+        return weights_path
+
+    msg.info(f"Converting {checkpoint_path} to safetensors")
+    model = AutoModelForTokenClassification.from_pretrained(checkpoint_path)
+    model.save_pretrained(checkpoint_path, safe_serialization=True)
+    return weights_path
+
+
+def activate_checkpoint(version: Optional[str] = None) -> CheckpointManifest:
+    """
+    Makes a version (by default the most recently trained one) the one that
+    loads when no version is given, converting it to safetensors if needed.
+    """
+    checkpoint_path = _find_checkpoint(version)
+    convert_to_safetensors(checkpoint_path)
+
+    manifest = CheckpointManifest(
+        version=checkpoint_path.parent.name,
+        checkpoint=str(checkpoint_path.relative_to(TRAINING_OUTPUT_DIR)),
+        activated_at=time.time(),
+    )
+    MANIFEST_PATH.write_text(manifest.model_dump_json(indent=2))
+    return manifest
+
+
+def checkpoint_id(path: Path | str) -> str:
+    """
+    Identifies the weights a model was loaded from. For a local checkpoint
+    directory this hashes the path together with the size and mtime of its
+    files, so retraining into the same directory also yields a new id; hub
+    names are returned as is.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return str(path)
+
+    digest = hashlib.sha1(str(path.resolve()).encode())
+    for f in sorted(p for p in path.iterdir() if p.is_file()):
+        stat = f.stat()
+        digest.update(f"{f.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return f"{path.parent.name}/{path.name}:{digest.hexdigest()[:12]}"
+
+
+def load_model_from_checkpoint(
+    version: Optional[str] = None, use_safetensors: Optional[bool] = None
+) -> AutoModelForTokenClassification:
+    """
+    safetensors weights are memory-mapped rather than deserialized: loading
+    costs little more than building the modules, pages are read on first
+    touch and processes loading the same checkpoint share them. Checkpoints
+    with only a pytorch_model.bin are read into memory in full; see
+    convert_to_safetensors.
+    """
+    checkpoint_path = resolve_checkpoint(version)
+
     config = AutoConfig.from_pretrained(checkpoint_path, num_labels=len(ALL_LABELS))
 
     # Load the model from the checkpoint directory with the correct configuration
     model = AutoModelForTokenClassification.from_pretrained(
-        checkpoint_path, config=config
+        checkpoint_path, config=config, use_safetensors=use_safetensors
     )
 
+    # TaggerPool checks this: file-backed pages are already shared on fork.
+    weights_path = checkpoint_path / SAFETENSORS_NAME
+    mapped = weights_path.exists() and use_safetensors is not False
+    model.memory_mapped = mapped  # pyright: ignore
+
     return model
 
 
 # Device detection logic
-def _get_device() -> torch.device:
+@lru_cache(maxsize=1)
+def get_device() -> torch.device:
     """
     Detects if CUDA or MPS is available and returns the appropriate device.
     Defaults to CPU if neither is available.
+
+    Probed on first use rather than at import, and cached afterwards.
     """
     if torch.cuda.is_available():
         device = torch.device("cuda")
@@ -98,30 +216,30 @@ def _get_device() -> torch.device:
     return device
 
 
-# Cache the detected device
-DEVICE = _get_device()
-
-
 def tokenize(s: str) -> dict[str, torch.Tensor]:
     """
     Tokenizes the input string and moves the tensors to the appropriate device.
     """
     tokenizer: PreTrainedTokenizerFast = get_tokenizer()
-    tokenized_input = tokenizer(s, return_tensors="pt", padding=True, truncation=True)  # pyright: ignore
-    tokenized_input: dict[str, torch.Tensor] = {
-        k: v.to(DEVICE) for k, v in tokenized_input.items()
-    }
+    with METRICS.time("tokenize"):
+        tokenized_input = tokenizer(  # pyright: ignore
+            s, return_tensors="pt", padding=True, truncation=True
+        )
+    with METRICS.time("transfer"):
+        tokenized_input: dict[str, torch.Tensor] = {
+            k: v.to(get_device()) for k, v in tokenized_input.items()
+        }
     return tokenized_input
 
 
 def split_text(text: str) -> list[str]:
     """
-    Splits the input text into sentences using spaCy.
+    Splits the input text into sentences with the default segmenter.
     """
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp(text)
-    sentences: list[str] = [sent.text for sent in doc.sents]
-    return sentences
+    from src.inference.segmenter import get_segmenter
+
+    with METRICS.time("split"):
+        return get_segmenter().split(text)
 
 
 def get_labels(text: str, model: AutoModelForTokenClassification) -> list[str]:
@@ -131,19 +249,24 @@ def get_labels(text: str, model: AutoModelForTokenClassification) -> list[str]:
     tokenizer: PreTrainedTokenizerFast = get_tokenizer()
     tokenized_input = tokenize(text)
 
-    model.to(DEVICE)  # pyright: ignore
+    # Kept for callers that hand in a freshly loaded model; long-running
+    # callers should use src.inference.tagger.CitationTagger instead.
+    model.to(get_device())  # pyright: ignore
     model.eval()  # pyright: ignore
 
     with torch.no_grad():
-        outputs = model(**tokenized_input)  # pyright: ignore
-        logits = outputs.logits
-        predictions = torch.argmax(logits, dim=-1)
-
-    predicted_labels = [ALL_LABELS[p] for p in predictions[0].tolist()]
-    tokens = tokenizer.convert_ids_to_tokens(tokenized_input["input_ids"][0])  # pyright: ignore
-
-    res = []
-    for token, label in zip(tokens, predicted_labels):
-        res.append(f"Token: {token}, Label: {label}")
+        with METRICS.time("forward"):
+            outputs = model(**tokenized_input)  # pyright: ignore
+            logits = outputs.logits
+        with METRICS.time("argmax"):
+            predictions = torch.argmax(logits, dim=-1)
+
+    with METRICS.time("decode"):
+        predicted_labels = [ALL_LABELS[p] for p in predictions[0].tolist()]
+        tokens = tokenizer.convert_ids_to_tokens(tokenized_input["input_ids"][0])  # pyright: ignore
+
+        res = []
+        for token, label in zip(tokens, predicted_labels):
+            res.append(f"Token: {token}, Label: {label}")
 
     return res
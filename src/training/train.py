@@ -1,11 +1,24 @@
+import os
+import re
+import tempfile
+import time
 from pathlib import Path
+from typing import List, Optional
 
 import numpy as np
 import torch
 from datasets import Dataset, DatasetDict
-from transformers import EarlyStoppingCallback, Trainer, TrainingArguments
+from transformers import (
+    DataCollatorForTokenClassification,
+    EarlyStoppingCallback,
+    PreTrainedModel,
+    Trainer,
+    TrainingArguments,
+)
 
-# from .model import get_base_model
+from src.inference.threads import ThreadConfig, numa_nodes, plan_layout
+from src.training.evaluation import StreamingTokenMetrics, argmax_logits
+from src.training.model import get_base_model, get_tokenizer
 
 OUTPUT_DIR = Path(__file__).resolve().parent.parent.parent / "training_output"
 
@@ -33,19 +46,62 @@ def get_output_dir():
     return output_dir
 
 
-def count_errors(predictions):
-    pred_labels = np.argmax(predictions.predictions, axis=2)
-    error_count = 0
-    valid_tokens_count = 0  # Total number of valid tokens that were compared
-
-    for i in range(len(predictions.label_ids)):
-        relevant_indices = np.where(predictions.label_ids[i] != -100)  # Ignore padding
-        errors = np.sum(
-            pred_labels[i][relevant_indices]
-            != predictions.label_ids[i][relevant_indices]
+def check_output_dir(output_dir: Path):
+    """
+    Raises ValueError unless output_dir is a version directory (v<N>) in
+    OUTPUT_DIR, the only place activate_checkpoint looks for checkpoints.
+    """
+    if output_dir.resolve().parent != OUTPUT_DIR.resolve() or not re.fullmatch(
+        r"v\d+", output_dir.name
+    ):
+        raise ValueError(
+            f"Output directory must be {OUTPUT_DIR}/v<N> to be activated; "
+            f"got {output_dir}"
         )
-        error_count += errors
-        valid_tokens_count += len(predictions.label_ids[i][relevant_indices])
+
+
+def get_data_collator(
+    max_length: Optional[int] = None,
+) -> DataCollatorForTokenClassification:
+    """
+    Pads each batch to its longest row, or to max_length if given (the old
+    fixed-size padding, kept for comparison). Labels are padded with -100.
+    """
+    return DataCollatorForTokenClassification(
+        get_tokenizer(),
+        padding="max_length" if max_length else True,
+        max_length=max_length,
+        # Multiples of 8 keep tensor-core and oneDNN kernels on fast paths.
+        pad_to_multiple_of=None if max_length else 8,
+    )
+
+
+def cpu_worker_threads(
+    local_rank: int, n_procs: int, nodes: Optional[List[List[int]]] = None
+) -> ThreadConfig:
+    """
+    Threads and cores for one of n_procs CPU training processes on this
+    machine: an equal share of the cores, all on one NUMA node if the shares
+    fit (see plan_layout), so each process's gradients stay in its socket's
+    memory. Otherwise the share is left unpinned.
+    """
+    nodes = nodes or numa_nodes()
+    threads = max(1, sum(len(cpus) for cpus in nodes) // n_procs)
+    try:
+        return plan_layout(n_procs, threads, nodes)[local_rank]
+    except ValueError:
+        return ThreadConfig(intra_op_threads=threads)
+
+
+def count_errors(predictions):
+    # Logits, or label ids already reduced by argmax_logits.
+    pred_labels = predictions.predictions
+    if pred_labels.ndim == 3:
+        pred_labels = np.argmax(pred_labels, axis=2)
+
+    relevant = predictions.label_ids != -100  # Ignore padding
+    error_count = int(np.sum(pred_labels[relevant] != predictions.label_ids[relevant]))
+    valid_tokens_count = int(np.sum(relevant))
 
     error_percentage = (
         (error_count / valid_tokens_count) * 100 if valid_tokens_count > 0 else 0
@@ -53,17 +109,46 @@ def count_errors(predictions):
     return {"total_errors": error_count, "error_percentage": error_percentage}
 
 
-def train_model(ds_dict: DatasetDict):
-    if torch.cuda.is_available():
+def train_model(
+    ds_dict: DatasetDict,
+    use_cpu: bool = False,
+    gradient_accumulation_steps: int = 1,
+    bf16: bool = False,
+    output_dir: Optional[Path] = None,
+):
+    """
+    Fine-tunes the base model on ds_dict. Runs on the GPU if there is one and
+    use_cpu is False, otherwise on the CPU, optionally under bf16 autocast.
+
+    Launched with torch.distributed.run (see the `train` command), each
+    process trains a DistributedDataParallel replica, synchronized over gloo
+    on CPU. The effective batch size is 2 x gradient_accumulation_steps x
+    the number of processes. All processes must get the same output_dir.
+    """
+    use_cpu = use_cpu or not torch.cuda.is_available()
+    if bf16 and not use_cpu:
+        raise ValueError(
+            "bf16 autocast is for CPU training (GPU training uses fp16); "
+            "pass use_cpu=True"
+        )
+    world_size = int(os.environ.get("WORLD_SIZE", 1))
+    if not use_cpu:
         device_index = torch.cuda.current_device()  # Get current device index
         torch.cuda.set_device(device_index)  # Set the default CUDA device by index
         print(f"Using GPU: {torch.cuda.get_device_name(device_index)}")
     else:
-        raise EnvironmentError("No GPU found!")
+        local_rank = int(os.environ.get("LOCAL_RANK", 0))
+        local_world_size = int(os.environ.get("LOCAL_WORLD_SIZE", 1))
+        if local_world_size > 1:
+            cpu_worker_threads(local_rank, local_world_size).apply()
+        print(
+            f"Using CPU: {torch.get_num_threads()} threads, "
+            f"process {int(os.environ.get('RANK', 0)) + 1} of {world_size}"
+        )
 
     model = get_base_model()
 
-    output_dir = get_output_dir()
+    output_dir = output_dir or get_output_dir()
 
     print(f"Training output directory: {output_dir}")
 
@@ -83,16 +168,29 @@ def train_model(ds_dict: DatasetDict):
         save_strategy="epoch",
         load_best_model_at_end=True,
         save_total_limit=1,  # Optionally keep all checkpoints from this run
-        fp16=torch.cuda.is_available(),
+        gradient_accumulation_steps=gradient_accumulation_steps,
+        use_cpu=use_cpu,
+        fp16=not use_cpu,
+        bf16=use_cpu and bf16,
+        ddp_backend="gloo" if use_cpu and world_size > 1 else None,
+        # Every parameter gets a gradient; skips a graph walk per step.
+        ddp_find_unused_parameters=False,
+        dataloader_pin_memory=not use_cpu,
+        # Batches of similar length, so little of each batch is padding.
+        group_by_length=True,
+        # Metrics are accumulated batch by batch rather than over all logits.
+        batch_eval_metrics=True,
     )
 
     # Initialize the Trainer
     trainer = Trainer(
         model=model,
         args=training_args,
+        data_collator=get_data_collator(),
         train_dataset=ds_dict["train"],
         eval_dataset=ds_dict["valid"],
-        compute_metrics=None,
+        compute_metrics=StreamingTokenMetrics(),
+        preprocess_logits_for_metrics=argmax_logits,
         callbacks=[EarlyStoppingCallback(early_stopping_patience=3)],
     )
 
@@ -103,11 +201,60 @@ def train_model(ds_dict: DatasetDict):
 
 
 def test_predict(trainer, test_data: Dataset):
-    # Predict on the test dataset
-    predictions = trainer.predict(test_data)
+    """
+    Token errors on the test split, plus entity scores and the most frequent
+    label confusions when the trainer streams its metrics (see train_model).
+    Returns (metrics, confusions); confusions is None otherwise.
+    """
+    if isinstance(trainer.compute_metrics, StreamingTokenMetrics):
+        # evaluate() keeps no predictions, so memory does not grow with the
+        # split; predict() would keep every row's label ids.
+        metrics = trainer.evaluate(test_data, metric_key_prefix="test")
+        error_results = {k.removeprefix("test_"): v for k, v in metrics.items()}
+        confusions = trainer.compute_metrics.top_confusions()
+    else:
+        error_results = count_errors(trainer.predict(test_data))
+        confusions = None
 
-    error_results = count_errors(predictions)
+    # Every process computes the same metrics; one reports them.
+    if trainer.is_world_process_zero():
+        if confusions is not None:
+            print(confusions)
+        print(error_results)
 
-    print(error_results)
+    return error_results, confusions
+
+
+def time_training_steps(
+    model: PreTrainedModel,
+    train_dataset: Dataset,
+    max_steps: int = 20,
+    batch_size: int = 2,
+    dynamic_padding: bool = True,
+) -> float:
+    """
+    Seconds for max_steps optimizer steps on train_dataset, either with
+    per-batch padding and length-grouped batches or padded to 512 like the
+    original pipeline. Nothing is saved; the model's weights are updated.
+    """
+    with tempfile.TemporaryDirectory() as output_dir:
+        args = TrainingArguments(
+            output_dir=output_dir,
+            max_steps=max_steps,
+            per_device_train_batch_size=batch_size,
+            save_strategy="no",
+            report_to=[],
+            disable_tqdm=True,
+            group_by_length=dynamic_padding,
+            fp16=torch.cuda.is_available(),
+        )
+        trainer = Trainer(
+            model=model,
+            args=args,
+            data_collator=get_data_collator(None if dynamic_padding else 512),
+            train_dataset=train_dataset,
+        )
 
-    return predictions.predictions, error_results
+        start = time.perf_counter()
+        trainer.train()
+        return time.perf_counter() - start